@@ -0,0 +1,148 @@
+"""
+Caché en proceso con backend intercambiable.
+
+- InMemoryCache: LRU con TTL y límite de entradas (y opcionalmente de bytes),
+  por worker (por defecto).
+- RedisCache: compartida entre workers; requiere el paquete `redis`.
+
+El backend se elige con CACHE_BACKEND=memory|redis (y REDIS_URL). La interfaz
+es asíncrona en los dos backends: la usan los routers, fuera de las funciones
+que corren en run_sync, así la E/S con Redis no bloquea el event loop.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class InMemoryCache:
+    """
+    Con `max_bytes` los valores tienen que ser bytes/str: se desalojan las
+    entradas menos usadas hasta que la suma de sus tamaños entre en el límite.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 60, max_bytes: int | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    async def set(self, key, value):
+        size = len(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    async def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    async def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+class RedisCache:
+    """
+    Misma interfaz que InMemoryCache pero compartida entre workers, con el
+    cliente asíncrono de redis. Los valores se serializan con `dumps`/`loads`
+    y expiran por TTL en Redis.
+    """
+
+    def __init__(self, namespace: str, ttl: float = 60, client=None, url: str | None = None,
+                 dumps=json.dumps, loads=json.loads):
+        if client is None:
+            import redis.asyncio  # dependencia opcional, solo con CACHE_BACKEND=redis
+            client = redis.asyncio.Redis.from_url(url or os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        self.client = client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key):
+        raw = await self.client.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.loads(raw)
+
+    async def set(self, key, value):
+        await self.client.set(self._key(key), self.dumps(value), ex=max(1, int(self.ttl)))
+
+    async def delete(self, key):
+        await self.client.delete(self._key(key))
+
+    async def clear(self):
+        async for key in self.client.scan_iter(match=f"{self.namespace}:*"):
+            await self.client.delete(key)
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "hits": self.hits, "misses": self.misses}
+
+# Cachés creadas por la app, por nombre (métricas y limpieza en tests)
+REGISTRY: dict[str, object] = {}
+
+def build_cache(namespace: str, max_entries: int, ttl: float, dumps=json.dumps, loads=json.loads,
+                max_bytes: int | None = None):
+    if os.getenv("CACHE_BACKEND", "memory") == "redis":
+        cache = RedisCache(namespace, ttl=ttl, dumps=dumps, loads=loads)
+    else:
+        cache = InMemoryCache(max_entries=max_entries, ttl=ttl, max_bytes=max_bytes)
+    REGISTRY[namespace] = cache
+    return cache
+
+def cache_report() -> dict:
+    return {name: cache.stats() for name, cache in REGISTRY.items()}
+
+async def clear_all():
+    for cache in REGISTRY.values():
+        await cache.clear()
@@ -1,8 +1,16 @@
+import itertools
 import os
+import uuid
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
+from fastapi import Request
+from app import pool_metrics
+from app.pool_metrics import PoolMetrics, instrumented_pool
+from app.utils.read_your_writes import SAFE_METHODS, RecentWriters, client_wrote_recently, consistency_keys
 
 if os.getenv("ENVIRONMENT") != "production":
     load_dotenv()
@@ -20,13 +28,130 @@ else:
     
     DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Drivers asíncronos equivalentes a los síncronos
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    if scheme == "postgres":
+        scheme = "postgresql"
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+
+# Réplicas de lectura, separadas por coma. Sin réplicas todo va al primario.
+REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+
+# Tras una escritura, las lecturas del mismo usuario/playlist van al primario
+# durante esta ventana para no leer datos viejos de una réplica con lag
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+# Pool por worker: size + overflow conexiones como máximo
+POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)
+POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)
+POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+
+# Con PgBouncer en modo transaction pooling cada transacción puede caer en otra
+# conexión del servidor, así que no se pueden usar sentencias preparadas con nombre
+PGBOUNCER_MODE = _env_bool("DB_PGBOUNCER", False)
+
+def engine_options(pool_class, metrics: PoolMetrics, is_async: bool = False) -> dict:
+    options = {
+        "poolclass": instrumented_pool(pool_class, metrics),
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+    if PGBOUNCER_MODE and is_async:
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return options
+
+# Engine síncrono: migraciones y scripts
+engine_metrics = PoolMetrics()
+engine = create_engine(DATABASE_URL, **engine_options(QueuePool, engine_metrics))
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Engine asíncrono: lo usan los routers, así una request esperando a Postgres
+# no ocupa un hilo del threadpool de Starlette
+async_engine_metrics = PoolMetrics()
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options(AsyncAdaptedQueuePool, async_engine_metrics, is_async=True)
+)
+pool_metrics.register("primary", async_engine_metrics, async_engine)
+pool_metrics.register("primary_sync", engine_metrics, engine)
+
+replica_session_makers = []
+for index, replica_url in enumerate(REPLICA_URLS):
+    replica_metrics = PoolMetrics()
+    replica_engine = create_async_engine(
+        to_async_url(replica_url), **engine_options(AsyncAdaptedQueuePool, replica_metrics, is_async=True)
+    )
+    pool_metrics.register(f"replica_{index}", replica_metrics, replica_engine)
+    replica_session_makers.append(async_sessionmaker(
+        replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    ))
+
+_replica_turns = itertools.count()
+recent_writers = RecentWriters(READ_YOUR_WRITES_SECONDS)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_async_db(request: Request):
+    """
+    Sesión asíncrona por request contra el primario. Los repositorios son
+    funciones síncronas que se ejecutan con `await db.run_sync(repo.funcion, ...)`:
+    la E/S va por el driver asíncrono sin bloquear el event loop.
+    """
+    keys = []
+    if request.method not in SAFE_METHODS:
+        keys = consistency_keys(request)
+        # ReadYourWritesMiddleware devuelve la cookie de lectura-de-lo-escrito
+        request.state.wrote = True
+    recent_writers.mark(keys)
+    async with AsyncSessionLocal() as db:
+        yield db
+    # La ventana de lectura-de-lo-escrito se cuenta desde que terminó la escritura
+    recent_writers.mark(keys)
+
+def reads_own_writes(request: Request) -> bool:
+    """
+    True si la request lee algo escrito hace poco: claves marcadas en este
+    worker o cookie de una escritura reciente del cliente (en cualquier worker)
+    """
+    return (
+        recent_writers.is_recent(consistency_keys(request))
+        or client_wrote_recently(request, READ_YOUR_WRITES_SECONDS)
+    )
+
+def read_session_maker(request: Request):
+    """Elige réplica por turnos, salvo que la request lea lo que escribió hace poco"""
+    if not replica_session_makers or reads_own_writes(request):
+        return AsyncSessionLocal
+    return replica_session_makers[next(_replica_turns) % len(replica_session_makers)]
+
+async def get_read_db(request: Request):
+    """Sesión de solo lectura: réplica si hay, primario si no"""
+    async with read_session_maker(request)() as db:
         yield db
-    finally:
-        db.close()
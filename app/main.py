@@ -1,26 +1,47 @@
 from app.instrumentation import initialize_datadog
 initialize_datadog()
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.exceptions import RequestValidationError
-from app.database import Base, engine
-from app.routers import playlist, liked_songs, history
+from app import database
+from app.routers import playlist, liked_songs, history, metrics, export, sync, events
+from app.services import outbox_service, sync_service
 
 from app.utils.error_handlers import (
     http_exception_handler,
     validation_exception_handler,
+    invalid_cursor_exception_handler,
 )
+from app.utils.pagination import InvalidCursorError
+from app.utils.read_your_writes import ReadYourWritesMiddleware
 from app.logger import log
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Relay del outbox: publica los eventos de dominio pendientes
+    relay = outbox_service.start_relay()
+    # Secuenciador del registro de cambios de /sync
+    sequencer = sync_service.start_sequencer()
+    yield
+    await sync_service.stop_sequencer(sequencer)
+    await outbox_service.stop_relay(relay)
 
-app = FastAPI(title="Melodia Playlist Service API", version="1.0.0")
+app = FastAPI(title="Melodia Playlist Service API", version="1.0.0", lifespan=lifespan)
 
 log.info("API starting up...")
 
 app.add_exception_handler(HTTPException, http_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
+app.add_exception_handler(InvalidCursorError, invalid_cursor_exception_handler)
+
+# Cookie de lectura-de-lo-escrito en las respuestas de escritura
+app.add_middleware(ReadYourWritesMiddleware, window=database.READ_YOUR_WRITES_SECONDS)
 
 app.include_router(playlist.router) 
 app.include_router(liked_songs.router)
-app.include_router(history.router)
\ No newline at end of file
+app.include_router(history.router)
+app.include_router(metrics.router)
+app.include_router(export.router)
+app.include_router(sync.router)
+app.include_router(events.router)
\ No newline at end of file
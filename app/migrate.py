@@ -0,0 +1,51 @@
+"""
+Aplica las migraciones pendientes del esquema. Corre como paso separado del
+arranque de la API (release/deploy), así los workers no ejecutan DDL:
+
+    python -m app.migrate
+"""
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from app.database import engine
+from app.logger import log
+from app.models.liked_songs import USER_POSITION_CONSTRAINT
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Primera revisión: el esquema que generaba create_all antes de las migraciones
+BASELINE_REVISION = "0001"
+
+# Restricciones que se crean con DDL propio (solo en Postgres) y no figuran en
+# la metadata: sin este filtro el autogenerate propondría borrarlas
+DDL_ONLY_CONSTRAINTS = {USER_POSITION_CONSTRAINT}
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Filtro de alembic (include_object) para autogenerate, lo usa migrations/env.py"""
+    return not (type_ == "unique_constraint" and name in DDL_ONLY_CONSTRAINTS)
+
+def alembic_config(connection=None) -> Config:
+    config = Config(str(ROOT_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT_DIR / "migrations"))
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+def upgrade(bind: Engine = engine, revision: str = "head"):
+    with bind.connect() as connection:
+        tables = inspect(connection).get_table_names()
+        connection.commit()
+
+        config = alembic_config(connection)
+        if "alembic_version" not in tables and "playlists" in tables:
+            # Bases creadas con create_all: ya tienen el esquema inicial
+            log.info(f"Base sin versionar, se marca en la revisión {BASELINE_REVISION}")
+            command.stamp(config, BASELINE_REVISION)
+
+        log.info(f"Aplicando migraciones hasta {revision}")
+        command.upgrade(config, revision)
+
+if __name__ == "__main__":
+    upgrade()
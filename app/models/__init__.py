@@ -1,11 +1,17 @@
 from .playlist import Playlist
 from .playlist_songs import PlaylistSong
 from .liked_songs import LikedSong
+from .liked_song_counter import LikedSongCounter
 from .history import HistoryEntry
+from .library_change import LibraryChange
+from .outbox_event import OutboxEvent
 
 __all__ = [
     "Playlist",
     "PlaylistSong",
     "LikedSong",
-    "HistoryEntry"
+    "LikedSongCounter",
+    "HistoryEntry",
+    "LibraryChange",
+    "OutboxEvent"
 ]
\ No newline at end of file
@@ -1,17 +1,52 @@
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import Column, DateTime, BigInteger, Sequence, String, Index
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.sql import func
+from sqlalchemy.sql.functions import FunctionElement
 import uuid
 from app.database import Base
 
+# Secuencia del orden del historial (solo Postgres; la crea la migración 0012)
+history_seq = Sequence("history_seq", metadata=Base.metadata)
+
+class next_history_seq(FunctionElement):
+    """
+    Siguiente valor del orden del historial, asignado por la base dentro del
+    INSERT: un único contador para todos los procesos, sin depender del reloj.
+    """
+    type = BigInteger()
+    inherit_cache = True
+
+@compiles(next_history_seq)
+def _compile_next_history_seq(element, compiler, **kw):
+    return compiler.process(history_seq.next_value(), **kw)
+
+@compiles(next_history_seq, "sqlite")
+def _compile_next_history_seq_sqlite(element, compiler, **kw):
+    # SQLite no tiene secuencias, pero serializa las escrituras: max + 1 no se repite
+    return "(SELECT coalesce(max(seq), 0) + 1 FROM history)"
+
 class HistoryEntry(Base):
     __tablename__ = "history"
+    __table_args__ = (
+        Index("ix_history_user_id_seq", "user_id", "seq"),
+        Index("ix_history_user_id_song_id", "user_id", "song_id"),
+        Index("ix_history_song_name_trgm", "song_name",
+              postgresql_using="gin", postgresql_ops={"song_name": "gin_trgm_ops"}),
+        Index("ix_history_artist_name_trgm", "artist_name",
+              postgresql_using="gin", postgresql_ops={"artist_name": "gin_trgm_ops"}),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(String, nullable=False, index=True)
+    user_id = Column(String, nullable=False)
     song_id = Column(String, nullable=False)
     song_name = Column(String, nullable=True)
     artist_name = Column(String, nullable=True)
     minutos = Column(String, nullable=True)
-    position = Column(Integer, nullable=False)
-    played_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    # El historial es append-only: cada reproducción inserta una fila y el orden
+    # sale de `seq`, sin reescribir las entradas anteriores.
+    seq = Column(BigInteger, nullable=False, default=next_history_seq())
+    played_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Posición (1 = más reciente) que expone la API; se calcula al leer
+    position = None
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, DateTime, BigInteger, Integer, String, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.database import Base
+
+class LibraryChange(Base):
+    """
+    Registro append-only de los cambios en la biblioteca de cada usuario
+    (favoritos, playlists y sus canciones), con el que los clientes offline
+    sincronizan solo lo que cambió desde su último token.
+    """
+    __tablename__ = "library_changes"
+    __table_args__ = (
+        Index("ix_library_changes_user_id_sync_seq", "user_id", "sync_seq"),
+        Index("ix_library_changes_sync_seq", "sync_seq", unique=True),
+        # Solo los pendientes de ordenar: el secuenciador los busca sin recorrer el resto
+        Index("ix_library_changes_unsequenced", "seq",
+              postgresql_where=text("sync_seq IS NULL"), sqlite_where=text("sync_seq IS NULL")),
+    )
+
+    # Orden de inserción: se toma al hacer el INSERT, pero la fila recién se ve
+    # al confirmar, así que no sirve como token (una transacción más lenta
+    # puede confirmar un seq menor después de que el cliente pasó de largo)
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    # Orden de sincronización: lo asigna el secuenciador a filas ya confirmadas,
+    # de a una tanda por vez, así que nunca aparece un valor menor al último leído
+    sync_seq = Column(BigInteger, nullable=True)
+    user_id = Column(String, nullable=False)
+    entity = Column(String, nullable=False)  # liked_song, playlist o playlist_song
+    action = Column(String, nullable=False)  # insert, update, delete o move
+    playlist_id = Column(UUID(as_uuid=True), nullable=True)
+    entry_id = Column(UUID(as_uuid=True), nullable=True)
+    song_id = Column(String, nullable=True)
+    position = Column(Integer, nullable=True)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+class LikedSongCounter(Base):
+    """
+    Cantidad de favoritos por usuario. El like toma su posición de esta fila con
+    un UPDATE ... RETURNING, que la deja bloqueada hasta el commit: dos likes del
+    mismo usuario se ordenan ahí y nunca leen el mismo máximo.
+    """
+    __tablename__ = "liked_song_counters"
+
+    user_id = Column(String, primary_key=True)
+    song_count = Column(Integer, nullable=False, default=0, server_default="0")
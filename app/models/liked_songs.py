@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import DDL, Column, DateTime, Integer, String, Index, event
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -6,9 +6,28 @@ from app.database import Base
 
 class LikedSong(Base):
     __tablename__ = "liked_songs"
+    __table_args__ = (
+        Index("uq_liked_songs_user_id_song_id", "user_id", "song_id", unique=True),
+        Index("ix_liked_songs_user_id_position", "user_id", "position"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(String, nullable=False, index=True)
+    user_id = Column(String, nullable=False)
     song_id = Column(String, nullable=False)
     position = Column(Integer, nullable=False)  # Añadido campo position
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Una posición por usuario. Diferida: los corrimientos (position +/- 1) pasan por
+# duplicados transitorios dentro de la sentencia. SQLite no tiene restricciones
+# diferibles, así que solo existe en Postgres (la crea también la migración 0011)
+# y no está en la metadata: el autogenerate de alembic la ignora (app.migrate)
+USER_POSITION_CONSTRAINT = "uq_liked_songs_user_id_position"
+
+event.listen(
+    LikedSong.__table__,
+    "after_create",
+    DDL(
+        f"ALTER TABLE liked_songs ADD CONSTRAINT {USER_POSITION_CONSTRAINT} "
+        "UNIQUE (user_id, position) DEFERRABLE INITIALLY DEFERRED"
+    ).execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, DateTime, BigInteger, Integer, JSON, String, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.database import Base
+
+class OutboxEvent(Base):
+    """
+    Outbox transaccional: los eventos de dominio se insertan en la misma
+    transacción que la escritura que los origina, y un relay los publica
+    después. Así no hay eventos de escrituras que fallaron ni escrituras sin evento.
+    """
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # Solo los pendientes: el relay los busca sin recorrer los ya publicados
+        Index("ix_outbox_events_pending", "id",
+              postgresql_where=text("published_at IS NULL"), sqlite_where=text("published_at IS NULL")),
+        Index("ix_outbox_events_feed_seq", "feed_seq", unique=True),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    event_type = Column(String, nullable=False)
+    user_id = Column(String, nullable=False)
+    payload = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    published_at = Column(DateTime(timezone=True), nullable=True)
+    # Orden del feed: lo asigna el relay al publicar, de a una tanda por vez. El
+    # id se toma al insertar y se ve recién al confirmar, así que no sirve de cursor
+    feed_seq = Column(BigInteger, nullable=True)
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, String, Boolean, DateTime, Index, Integer, BigInteger
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -7,12 +7,32 @@ from app.database import Base
 
 class Playlist(Base):
     __tablename__ = "playlists"
+    __table_args__ = (
+        Index("ix_playlists_owner_id_created_at", "owner_id", "created_at"),
+        Index("ix_playlists_created_at", "created_at"),
+        Index("ix_playlists_name_trgm", "name",
+              postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
     name = Column(String, nullable=False)
     cover_url = Column(String, nullable=True)
-    owner_id = Column(String, nullable=False, index=True)
+    owner_id = Column(String, nullable=False)
     is_public = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Contadores que se mantienen en cada alta/baja de canciones: los listados
+    # no necesitan tocar playlist_songs y agregar al final no hace max(rank).
+    song_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_rank = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # Sube con cada cambio de datos o canciones: es el ETag del detalle
+    version = Column(BigInteger, nullable=False, default=1, server_default="1")
 
-    songs = relationship("PlaylistSong", back_populates="playlist", cascade="all, delete-orphan")
+    songs = relationship("PlaylistSong", back_populates="playlist", cascade="all, delete-orphan", order_by="[PlaylistSong.rank, PlaylistSong.id]")
+
+    # Cursor de la siguiente página de canciones cuando se piden paginadas
+    songs_next_cursor = None
+
+    @property
+    def next_position(self) -> int:
+        """Posición que ocupará la próxima canción agregada al final"""
+        return (self.song_count or 0) + 1
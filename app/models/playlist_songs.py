@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, ForeignKey, Integer, DateTime
+from sqlalchemy import Column, String, ForeignKey, BigInteger, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -7,11 +7,23 @@ from app.database import Base
 
 class PlaylistSong(Base):
     __tablename__ = "playlist_songs"
+    __table_args__ = (
+        Index("ix_playlist_songs_playlist_id_rank", "playlist_id", "rank"),
+        Index("ix_playlist_songs_playlist_id_song_id", "playlist_id", "song_id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     playlist_id = Column(UUID(as_uuid=True), ForeignKey("playlists.id", ondelete="CASCADE"), nullable=False)
     song_id = Column(String, nullable=False)
-    position = Column(Integer, nullable=False)
+    # Clave de orden dispersa: entre dos canciones quedan huecos, así insertar,
+    # mover o borrar escribe una sola fila en lugar de renumerar la playlist.
+    rank = Column(BigInteger, nullable=False)
     added_at = Column(DateTime(timezone=True), server_default=func.now())
     
     playlist = relationship("Playlist", back_populates="songs")
+
+    # Posición densa (1-based) que expone la API; se calcula al leer
+    position = None
+
+    # Versión de la playlist después del alta que creó la fila (no se persiste)
+    playlist_version = None
@@ -0,0 +1,71 @@
+"""
+Métricas del pool de conexiones por worker: conexiones en uso, libres, en
+overflow y cuánto esperan las requests para obtener una conexión.
+"""
+import os
+import threading
+import time
+from sqlalchemy import exc
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_checkout(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            stats = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+        # NullPool/StaticPool (tests) no exponen tamaño ni overflow
+        for name, attr in [("size", "size"), ("checked_out", "checkedout"),
+                           ("idle", "checkedin"), ("overflow", "overflow")]:
+            stats[name] = getattr(pool, attr)() if hasattr(pool, attr) else None
+        return stats
+
+def instrumented_pool(base_class, metrics: PoolMetrics):
+    """
+    Subclase de `base_class` que mide cuánto tarda cada checkout (espera en la
+    cola del pool, apertura de conexión y pre-ping).
+    """
+    class InstrumentedPool(base_class):
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                connection = super().connect()
+            except exc.TimeoutError:
+                metrics.record_checkout(time.perf_counter() - started, timed_out=True)
+                raise
+            metrics.record_checkout(time.perf_counter() - started)
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{base_class.__name__}"
+    return InstrumentedPool
+
+# Pools registrados por nombre: {"primary": (metrics, engine)}
+REGISTRY: dict[str, tuple[PoolMetrics, object]] = {}
+
+def register(name: str, metrics: PoolMetrics, engine):
+    REGISTRY[name] = (metrics, engine)
+
+def pool_report() -> dict:
+    pools = {}
+    for name, (metrics, engine) in REGISTRY.items():
+        # Los engines asíncronos exponen el pool en su engine síncrono
+        pool = getattr(engine, "sync_engine", engine).pool
+        pools[name] = metrics.snapshot(pool)
+    return {"pid": os.getpid(), "pools": pools}
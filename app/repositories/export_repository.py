@@ -0,0 +1,47 @@
+"""
+Consultas de la exportación completa de la biblioteca de un usuario. Devuelven
+select() sin ejecutar: el servicio de exportación los recorre con un cursor del
+lado del servidor, sin cargar todo en memoria.
+"""
+from sqlalchemy import select
+from app import models
+from app.repositories.history_repository import HISTORY_COLUMNS
+from app.repositories.liked_song_repository import LIKED_SONG_COLUMNS
+from app.repositories.playlist_repository import PLAYLIST_SUMMARY_COLUMNS
+
+def playlists(user_id: str):
+    return select(*PLAYLIST_SUMMARY_COLUMNS).where(
+        models.Playlist.owner_id == user_id
+    ).order_by(models.Playlist.created_at, models.Playlist.id)
+
+def playlist_songs(user_id: str):
+    """Canciones de todas las playlists del usuario, agrupadas por playlist y en orden"""
+    return select(
+        models.PlaylistSong.id,
+        models.PlaylistSong.playlist_id,
+        models.PlaylistSong.song_id,
+        models.PlaylistSong.added_at,
+    ).join(
+        models.Playlist, models.Playlist.id == models.PlaylistSong.playlist_id
+    ).where(
+        models.Playlist.owner_id == user_id
+    ).order_by(models.Playlist.created_at, models.Playlist.id, models.PlaylistSong.rank, models.PlaylistSong.id)
+
+def liked_songs(user_id: str):
+    return select(*LIKED_SONG_COLUMNS).where(
+        models.LikedSong.user_id == user_id
+    ).order_by(models.LikedSong.position, models.LikedSong.id)
+
+def history(user_id: str):
+    return select(*HISTORY_COLUMNS).where(
+        models.HistoryEntry.user_id == user_id
+    ).order_by(models.HistoryEntry.seq.desc(), models.HistoryEntry.id.desc())
+
+# (tipo de registro, consulta, columna que agrupa la numeración de `position`).
+# Sin columna, la fila no lleva posición derivada.
+SECTIONS = (
+    ("playlist", playlists, None),
+    ("playlist_song", playlist_songs, "playlist_id"),
+    ("liked_song", liked_songs, None),
+    ("history", history, "user_id"),
+)
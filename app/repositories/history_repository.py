@@ -1,67 +1,97 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, delete, or_, select
 from uuid import UUID
 from app import models, schemas
+from app.utils.positions import number_rows
+from app.utils.projections import count_rows, fetch_rows
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor, seek_after, split_page
+from app.repositories import outbox_repository as outbox
+from app.services import search_service
 import math
 
-def add_history_entry(db: Session, user_id: str, entry: schemas.HistoryEntryCreate):
-    db.query(models.HistoryEntry).filter(
-        models.HistoryEntry.user_id == user_id
-    ).update({models.HistoryEntry.position: models.HistoryEntry.position + 1})
+# Columnas del listado de historial: se proyectan como filas planas
+HISTORY_COLUMNS = (
+    models.HistoryEntry.id,
+    models.HistoryEntry.user_id,
+    models.HistoryEntry.song_id,
+    models.HistoryEntry.song_name,
+    models.HistoryEntry.artist_name,
+    models.HistoryEntry.minutos,
+    models.HistoryEntry.played_at,
+)
 
+def add_history_entry(db: Session, user_id: str, entry: schemas.HistoryEntryCreate):
     new_entry = models.HistoryEntry(
         user_id=user_id,
         song_id=entry.song_id,
         song_name=entry.song_name,  # Nuevo campo
         artist_name=entry.artist_name,  # Nuevo campo
-        minutos=entry.minutos,
-        position=1
+        minutos=entry.minutos
     )
     db.add(new_entry)
+    outbox.record_event(db, outbox.SONG_PLAYED, user_id, song_id=entry.song_id, song_name=entry.song_name,
+                        artist_name=entry.artist_name, minutos=entry.minutos)
+    # played_at vuelve en el RETURNING del INSERT: no hace falta refresh()
     db.commit()
-    db.refresh(new_entry)
+    # La entrada recién insertada siempre es la más reciente
+    new_entry.position = 1
     return new_entry
 
 def get_user_history_paginated(db: Session, user_id: str, page: int = 1, limit: int = 10, 
-                              search: str = None, artist: str = None):
-    """Obtiene el historial con paginación, búsqueda y filtros"""
+                              search: str = None, artist: str = None,
+                              cursor: str = None, with_total: bool = True,
+                              sort: str = search_service.SORT_RECENT):
+    """Obtiene el historial con paginación (por página o por cursor), búsqueda y filtros"""
+    by_relevance = bool(search) and sort == search_service.SORT_RELEVANCE
+    if by_relevance and cursor:
+        raise InvalidCursorError("El cursor solo aplica al orden por fecha")
     
-    query = db.query(models.HistoryEntry).filter(
+    # seq no se expone, pero va en el cursor como clave de orden
+    stmt = select(*HISTORY_COLUMNS, models.HistoryEntry.seq).where(
         models.HistoryEntry.user_id == user_id
     )
     
     if search:
-        query = query.filter(
-            models.HistoryEntry.song_name.ilike(f"%{search}%")
-        )
+        stmt = stmt.where(search_service.text_filter(models.HistoryEntry.song_name, search))
     
     if artist:
-        query = query.filter(
-            models.HistoryEntry.artist_name.ilike(f"%{artist}%")
-        )
+        stmt = stmt.where(search_service.text_filter(models.HistoryEntry.artist_name, artist))
     
-    total = query.count()
+    total = total_pages = None
+    if with_total:
+        total = count_rows(db, stmt)
+        total_pages = math.ceil(total / limit) if total > 0 else 1
     
-    skip = (page - 1) * limit
-    total_pages = math.ceil(total / limit) if total > 0 else 1
+    if by_relevance:
+        stmt = stmt.order_by(search_service.relevance(db, models.HistoryEntry.song_name, search).desc())
+    stmt = stmt.order_by(models.HistoryEntry.seq.desc(), models.HistoryEntry.id.desc())
+    if cursor:
+        # El cursor guarda la última posición entregada para seguir numerando
+        values = decode_cursor(cursor)
+        stmt = seek_after(stmt, models.HistoryEntry, models.HistoryEntry.seq, values)
+        skip = values.get("position", 0)
+    else:
+        skip = (page - 1) * limit
+        stmt = stmt.offset(skip)
     
-    entries = query.order_by(models.HistoryEntry.position).offset(skip).limit(limit).all()
+    entries, has_more = split_page(fetch_rows(db, stmt.limit(limit + 1)), limit)
+    number_rows(entries, start=skip + 1)
+    seqs = [entry.pop("seq") for entry in entries]
+    
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor({"id": entries[-1]["id"], "key": seqs[-1], "position": entries[-1]["position"]})
     
     return {
         "entries": entries,
         "page": page,
         "limit": limit,
         "total": total,
-        "total_pages": total_pages
+        "total_pages": total_pages,
+        "next_cursor": next_cursor
     }
 
-def get_user_history(db: Session, user_id: str, skip: int = 0, limit: int = 100):
-    """Mantener método original para compatibilidad"""
-    return db.query(models.HistoryEntry).filter(
-        models.HistoryEntry.user_id == user_id
-    ).order_by(models.HistoryEntry.position).offset(skip).limit(limit).all()
-
 def clear_history(db: Session, user_id: str):
     result = db.query(models.HistoryEntry).filter(
         models.HistoryEntry.user_id == user_id
@@ -70,24 +100,19 @@ def clear_history(db: Session, user_id: str):
     return result > 0
 
 def remove_history_entry(db: Session, user_id: str, song_id: str):  # Cambiado de UUID a str
-    entry = db.query(models.HistoryEntry).filter(
+    latest = select(models.HistoryEntry.id).where(
         models.HistoryEntry.user_id == user_id,
         models.HistoryEntry.song_id == song_id
-    ).first()
+    ).order_by(models.HistoryEntry.seq.desc()).limit(1).scalar_subquery()
     
-    if not entry:
+    # Las posiciones se derivan al leer, las entradas posteriores no se tocan
+    deleted = db.execute(
+        delete(models.HistoryEntry)
+        .where(models.HistoryEntry.id == latest)
+        .returning(models.HistoryEntry.id)
+    ).first()
+    if deleted is None:
         return False
     
-    # Guardar posición para reordenar
-    deleted_position = entry.position
-    
-    db.delete(entry)
-    
-    # Actualizar posiciones de entradas posteriores
-    db.query(models.HistoryEntry).filter(
-        models.HistoryEntry.user_id == user_id,
-        models.HistoryEntry.position > deleted_position
-    ).update({models.HistoryEntry.position: models.HistoryEntry.position - 1})
-    
     db.commit()
-    return True
\ No newline at end of file
+    return True
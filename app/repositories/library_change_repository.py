@@ -0,0 +1,118 @@
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+from app import models
+from app.utils import dialect
+from app.utils.pagination import InvalidCursorError, split_page
+from app.utils.projections import fetch_rows
+
+# Entidades y acciones del registro de cambios. Las posiciones siguen la
+# semántica de lista: "insert" inserta en `position` (corre las siguientes),
+# "delete" quita la de `position` y "move" saca la entrada y la reinserta en
+# `position`. Aplicados en orden de seq, reproducen la biblioteca.
+#
+# El seq que ven los clientes es sync_seq: lo asigna sequence_changes() a filas
+# ya confirmadas, así una transacción lenta no queda detrás de un token.
+LIKED_SONG = "liked_song"
+PLAYLIST = "playlist"
+PLAYLIST_SONG = "playlist_song"
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+MOVE = "move"
+
+# Clave del advisory lock que serializa al secuenciador entre workers
+SEQUENCER_LOCK_ID = 0x5EC_0024
+
+LIBRARY_CHANGE_COLUMNS = (
+    models.LibraryChange.sync_seq.label("seq"),
+    models.LibraryChange.entity,
+    models.LibraryChange.action,
+    models.LibraryChange.playlist_id,
+    models.LibraryChange.entry_id,
+    models.LibraryChange.song_id,
+    models.LibraryChange.position,
+    models.LibraryChange.changed_at,
+)
+
+def record_change(db: Session, user_id: str, entity: str, action: str, **values):
+    """
+    Agrega un cambio a la transacción en curso: se confirma (o se descarta)
+    junto con la escritura que lo origina. Los valores pueden ser expresiones SQL.
+    """
+    db.execute(insert(models.LibraryChange).values(user_id=user_id, entity=entity, action=action, **values))
+
+def record_changes(db: Session, user_id: str, entity: str, action: str, rows: list[dict]):
+    """Varios cambios del mismo tipo en un único INSERT multi-fila"""
+    if rows:
+        db.execute(
+            insert(models.LibraryChange),
+            [{"user_id": user_id, "entity": entity, "action": action, **row} for row in rows],
+        )
+
+def sequence_changes(db: Session, batch_size: int = 1000) -> int:
+    """
+    Asigna sync_seq, en orden de seq, a una tanda de cambios confirmados que
+    todavía no lo tienen, y devuelve cuántos ordenó. Un solo secuenciador corre
+    a la vez (advisory lock en Postgres): cada tanda continúa donde terminó la
+    anterior y se confirma entera, así los tokens nunca saltean un cambio.
+    """
+    if dialect.is_postgres(db):
+        db.execute(select(func.pg_advisory_xact_lock(SEQUENCER_LOCK_ID)))
+    
+    last = db.scalar(select(func.coalesce(func.max(models.LibraryChange.sync_seq), 0)))
+    batch = select(
+        models.LibraryChange.seq,
+        func.row_number().over(order_by=models.LibraryChange.seq).label("offset")
+    ).where(
+        models.LibraryChange.sync_seq.is_(None)
+    ).order_by(models.LibraryChange.seq).limit(batch_size).subquery()
+    
+    sequenced = db.execute(
+        update(models.LibraryChange)
+        .where(models.LibraryChange.seq == batch.c.seq)
+        .values(sync_seq=last + batch.c.offset)
+    ).rowcount
+    db.commit()
+    return sequenced
+
+def encode_sync_token(seq: int) -> str:
+    return str(seq)
+
+def decode_sync_token(token: str) -> int:
+    try:
+        seq = int(token)
+    except ValueError:
+        raise InvalidCursorError("Token de sincronización inválido")
+    if seq < 0:
+        raise InvalidCursorError("Token de sincronización inválido")
+    return seq
+
+def get_changes(db: Session, user_id: str, since: str | None = None, limit: int = 500):
+    """
+    Cambios del usuario posteriores al token `since`, en orden, con el token
+    para la siguiente llamada. Es un rango sobre el índice (user_id, sync_seq): sin
+    cambios cuesta un solo sondeo. Sin `since` solo se devuelve el token actual,
+    para que el cliente descargue la biblioteca completa y sincronice desde ahí.
+    """
+    if since is None:
+        head = db.scalar(
+            select(models.LibraryChange.sync_seq)
+            .where(models.LibraryChange.user_id == user_id, models.LibraryChange.sync_seq.is_not(None))
+            .order_by(models.LibraryChange.sync_seq.desc())
+            .limit(1)
+        )
+        return {"changes": [], "token": encode_sync_token(head or 0), "has_more": False}
+    
+    since_seq = decode_sync_token(since)
+    stmt = select(*LIBRARY_CHANGE_COLUMNS).where(
+        models.LibraryChange.user_id == user_id,
+        models.LibraryChange.sync_seq > since_seq
+    ).order_by(models.LibraryChange.sync_seq).limit(limit + 1)
+    
+    changes, has_more = split_page(fetch_rows(db, stmt), limit)
+    return {
+        "changes": changes,
+        "token": encode_sync_token(changes[-1]["seq"] if changes else since_seq),
+        "has_more": has_more
+    }
@@ -1,111 +1,219 @@
+import json
+import os
+from sqlalchemy import Integer, String, any_, bindparam, case, column, delete, select, update, values
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
-from sqlalchemy.sql import func
-from uuid import UUID
+from uuid import uuid4
 from app import models, schemas
+from app.cache import build_cache
+from app.repositories import library_change_repository as change_log
+from app.repositories import outbox_repository as outbox
+from app.utils import dialect
+from app.utils.pagination import decode_cursor, encode_cursor, seek_after, split_page
+from app.utils.projections import fetch_rows
+
+# Caché por usuario del conjunto de song_id favoritos (responde is-liked sin ir a la base)
+LIKED_IDS_CACHE_TTL = float(os.getenv("LIKED_CACHE_TTL", 60))
+LIKED_IDS_CACHE_USERS = int(os.getenv("LIKED_CACHE_MAX_USERS", 10_000))
+# Usuarios con más favoritos que esto se consultan directo en la base
+LIKED_IDS_CACHE_MAX_SET = int(os.getenv("LIKED_CACHE_MAX_SET", 5_000))
+
+# Columnas del listado de favoritos: se proyectan como filas planas
+LIKED_SONG_COLUMNS = (
+    models.LikedSong.id,
+    models.LikedSong.user_id,
+    models.LikedSong.song_id,
+    models.LikedSong.position,
+    models.LikedSong.created_at,
+)
+
+# Cada entrada es (generación, conjunto). Una escritura la reemplaza por
+# (generación nueva, None); una recarga solo se guarda si la generación sigue
+# siendo la que vio antes de leer, así no vuelve a dejar un conjunto anterior.
+liked_ids_cache = build_cache(
+    "liked_ids",
+    max_entries=LIKED_IDS_CACHE_USERS,
+    ttl=LIKED_IDS_CACHE_TTL,
+    dumps=lambda entry: json.dumps([entry[0], None if entry[1] is None else sorted(entry[1])]),
+    loads=lambda raw: _liked_ids_entry(*json.loads(raw)),
+)
+
+def _liked_ids_entry(generation: str | None, ids: list | None) -> tuple[str | None, frozenset | None]:
+    return generation, None if ids is None else frozenset(ids)
+
+async def cached_liked_ids(user_id: str) -> tuple[str | None, frozenset | None]:
+    """
+    (generación, conjunto) de la caché. El conjunto es None si no está o si
+    solo queda la marca de una escritura; la generación se pasa a store_liked_ids.
+    """
+    return await liked_ids_cache.get(user_id) or (None, None)
+
+async def store_liked_ids(user_id: str, generation: str | None, liked_ids: frozenset):
+    """Guarda el conjunto salvo que una escritura haya cambiado la generación mientras se leía"""
+    current = await liked_ids_cache.get(user_id)
+    if (current[0] if current else None) == generation:
+        await liked_ids_cache.set(user_id, (generation, liked_ids))
+
+async def invalidate_liked_ids(user_id: str):
+    await liked_ids_cache.set(user_id, (uuid4().hex, None))
+
+def load_liked_ids(db: Session, user_id: str) -> frozenset | None:
+    """
+    Conjunto de favoritos del usuario para guardar en liked_ids_cache (la caché
+    la leen y la cargan los routers). Devuelve None si es demasiado grande
+    para cachearlo.
+    """
+    rows = db.execute(
+        select(models.LikedSong.song_id).where(models.LikedSong.user_id == user_id)
+        .limit(LIKED_IDS_CACHE_MAX_SET + 1)
+    ).all()
+    if len(rows) > LIKED_IDS_CACHE_MAX_SET:
+        return None
+    return frozenset(song_id for (song_id,) in rows)
+
+def _bump_song_count(db: Session, user_id: str, delta: int) -> int:
+    """
+    Suma delta al contador de favoritos del usuario y devuelve el nuevo valor.
+    El UPDATE deja la fila bloqueada hasta el commit, así que las escrituras
+    concurrentes del mismo usuario se serializan acá.
+    """
+    return db.scalar(
+        dialect.insert(db, models.LikedSongCounter).values(
+            user_id=user_id,
+            song_count=max(delta, 0)
+        ).on_conflict_do_update(
+            index_elements=[models.LikedSongCounter.user_id],
+            set_={models.LikedSongCounter.song_count: models.LikedSongCounter.song_count + delta}
+        ).returning(models.LikedSongCounter.song_count)
+    )
 
 def add_liked_song(db: Session, user_id: str, song: schemas.LikedSongCreate):
-    existing = db.query(models.LikedSong).filter(
-        models.LikedSong.user_id == user_id,
-        models.LikedSong.song_id == song.song_id
-    ).first()
-    
-    if existing:
-        return existing
-    
-    max_position = db.query(func.max(models.LikedSong.position)).filter(
-        models.LikedSong.user_id == user_id
-    ).scalar() or 0
+    """
+    Like idempotente: la posición sale del contador del usuario (que queda
+    bloqueado hasta el commit) y la fila se inserta con ON CONFLICT DO NOTHING
+    RETURNING. Si la canción ya estaba en favoritos se deshace el incremento y
+    se devuelve la fila existente.
+    """
+    position = _bump_song_count(db, user_id, 1)
     
-    new_liked = models.LikedSong(
+    stmt = dialect.insert(db, models.LikedSong).values(
         user_id=user_id,
         song_id=song.song_id,
-        position=max_position + 1  
-    )
+        position=position
+    ).on_conflict_do_nothing(
+        index_elements=[models.LikedSong.user_id, models.LikedSong.song_id]
+    ).returning(models.LikedSong)
+    
+    liked = db.scalars(stmt).first()
+    if liked is None:
+        # Ya existía: reintentos y likes concurrentes no duplican la fila
+        db.rollback()
+        return db.query(models.LikedSong).filter(
+            models.LikedSong.user_id == user_id,
+            models.LikedSong.song_id == song.song_id
+        ).first()
+    
+    change_log.record_change(db, user_id, change_log.LIKED_SONG, change_log.INSERT,
+                             entry_id=liked.id, song_id=liked.song_id, position=liked.position)
+    outbox.record_event(db, outbox.SONG_LIKED, user_id, song_id=liked.song_id)
     
-    db.add(new_liked)
     db.commit()
-    db.refresh(new_liked)
-    return new_liked
+    return liked
 
 def remove_liked_song(db: Session, user_id: str, song_id: str):  # Cambiado de UUID a str
-    liked = db.query(models.LikedSong).filter(
-        models.LikedSong.user_id == user_id,
-        models.LikedSong.song_id == song_id
+    # Primero el contador: bloquea al usuario antes de tocar posiciones, así un
+    # like concurrente no inserta detrás del corrimiento
+    _bump_song_count(db, user_id, -1)
+    deleted = db.execute(
+        delete(models.LikedSong).where(
+            models.LikedSong.user_id == user_id,
+            models.LikedSong.song_id == song_id
+        ).returning(models.LikedSong.position)
     ).first()
     
-    if not liked:
+    if deleted is None:
+        db.rollback()
         return False
     
-    # Guardar la posición para reordenar
-    deleted_position = liked.position
-    
-    db.delete(liked)
-    db.commit()
-    
-    # Reordenar las posiciones de las canciones restantes
-    remaining_songs = db.query(models.LikedSong).filter(
+    # Reordenar las posiciones de las canciones restantes, en la misma transacción
+    db.query(models.LikedSong).filter(
         models.LikedSong.user_id == user_id,
-        models.LikedSong.position > deleted_position
-    ).order_by(models.LikedSong.position).all()
-    
-    for song in remaining_songs:
-        song.position -= 1
+        models.LikedSong.position > deleted.position
+    ).update({models.LikedSong.position: models.LikedSong.position - 1})
+    # Tombstone para la sincronización: el resto se corre implícitamente
+    change_log.record_change(db, user_id, change_log.LIKED_SONG, change_log.DELETE,
+                             song_id=song_id, position=deleted.position)
+    outbox.record_event(db, outbox.SONG_UNLIKED, user_id, song_id=song_id)
     
     db.commit()
     return True
 
-def get_user_liked_songs(db: Session, user_id: str, skip: int = 0, limit: int = 100):
-    return db.query(models.LikedSong).filter(
+def get_user_liked_songs_page(db: Session, user_id: str, limit: int = 100, cursor: str = None):
+    """
+    Página de canciones favoritas por keyset sobre (position, id): la página N
+    cuesta lo mismo que la primera.
+    """
+    stmt = select(*LIKED_SONG_COLUMNS).where(
         models.LikedSong.user_id == user_id
-    ).order_by(models.LikedSong.position).offset(skip).limit(limit).all()
-
-def update_position(db: Session, user_id: str, song_id: UUID, new_position: int):
-    liked = db.query(models.LikedSong).filter(
-        models.LikedSong.user_id == user_id,
-        models.LikedSong.song_id == song_id
-    ).first()
-    
-    if not liked:
-        return False
+    ).order_by(models.LikedSong.position, models.LikedSong.id)
     
-    current_position = liked.position
-    
-    if current_position == new_position:
-        return True
+    if cursor:
+        stmt = seek_after(stmt, models.LikedSong, models.LikedSong.position, decode_cursor(cursor),
+                          descending=False, renumbered=True)
     
-    if current_position < new_position:
-        db.query(models.LikedSong).filter(
-            models.LikedSong.user_id == user_id,
-            models.LikedSong.position > current_position,
-            models.LikedSong.position <= new_position
-        ).update({models.LikedSong.position: models.LikedSong.position - 1})
-    else:
-        db.query(models.LikedSong).filter(
-            models.LikedSong.user_id == user_id,
-            models.LikedSong.position >= new_position,
-            models.LikedSong.position < current_position
-        ).update({models.LikedSong.position: models.LikedSong.position + 1})
-    
-    liked.position = new_position
-    db.commit()
-    
-    return True
+    songs, has_more = split_page(fetch_rows(db, stmt.limit(limit + 1)), limit)
+    return {
+        "songs": songs,
+        "next_cursor": encode_cursor({"id": songs[-1]["id"], "key": songs[-1]["position"]}) if has_more else None
+    }
+
+def _dense_order(current: list[str], song_positions: list[schemas.LikedSongPosition]) -> list[str]:
+    """
+    Orden final de favoritos: cada canción pedida queda en su posición (1-based,
+    acotada al final de la lista) y el resto conserva su orden relativo en los huecos.
+    """
+    moved = {song_pos.song_id for song_pos in song_positions}
+    order = [song_id for song_id in current if song_id not in moved]
+    for song_pos in sorted(song_positions, key=lambda song_pos: song_pos.position):
+        order.insert(min(song_pos.position, len(order) + 1) - 1, song_pos.song_id)
+    return order
 
 def reorder_songs(db: Session, user_id: str, song_positions: list[schemas.LikedSongPosition]):
+    """
+    Reordena en dos sentencias sin importar cuántas canciones lleguen: una lectura
+    de (song_id, position) del usuario para validar y calcular el orden denso, y un
+    único UPDATE con las posiciones que cambian.
+    """
+    requested = [song_pos.song_id for song_pos in song_positions]
+    if len(set(requested)) != len(requested) or any(song_pos.position < 1 for song_pos in song_positions):
+        return False
+    
     try:
-        for song_pos in song_positions:
-            liked = db.query(models.LikedSong).filter(
-                models.LikedSong.user_id == user_id,
-                models.LikedSong.song_id == song_pos.song_id
-            ).first()
-            
-            if not liked:
-                return False
-        for song_pos in song_positions:
-            db.query(models.LikedSong).filter(
-                models.LikedSong.user_id == user_id,
-                models.LikedSong.song_id == song_pos.song_id
-            ).update({models.LikedSong.position: song_pos.position})
+        rows = db.execute(
+            select(models.LikedSong.song_id, models.LikedSong.position)
+            .where(models.LikedSong.user_id == user_id)
+            .order_by(models.LikedSong.position, models.LikedSong.id)
+            .with_for_update()
+        ).all()
+        current_positions = {song_id: position for song_id, position in rows}
+        if any(song_id not in current_positions for song_id in requested):
+            db.rollback()
+            return False
+        
+        order = _dense_order([song_id for song_id, _ in rows], song_positions)
+        changes = [
+            (song_id, position)
+            for position, song_id in enumerate(order, start=1)
+            if current_positions[song_id] != position
+        ]
+        if changes:
+            db.execute(_bulk_position_update(db, user_id, changes))
+            # Mover, en orden, cada posición del tramo que cambió reproduce el
+            # orden final en el cliente; fuera del tramo nada se movió
+            first, last = changes[0][1], changes[-1][1]
+            change_log.record_changes(db, user_id, change_log.LIKED_SONG, change_log.MOVE, [
+                {"song_id": order[position - 1], "position": position} for position in range(first, last + 1)
+            ])
         
         db.commit()
         return True
@@ -114,6 +222,25 @@ def reorder_songs(db: Session, user_id: str, song_positions: list[schemas.LikedS
         db.rollback()
         return False
 
+def _bulk_position_update(db: Session, user_id: str, changes: list[tuple[str, int]]):
+    """
+    UPDATE ... FROM (VALUES ...) en Postgres; en otros motores (SQLite en los tests)
+    el mismo UPDATE único con un CASE por song_id.
+    """
+    if dialect.is_postgres(db):
+        new_positions = values(
+            column("song_id", String), column("position", Integer), name="new_positions"
+        ).data(changes)
+        return update(models.LikedSong).where(
+            models.LikedSong.user_id == user_id,
+            models.LikedSong.song_id == new_positions.c.song_id,
+        ).values(position=new_positions.c.position)
+    
+    return update(models.LikedSong).where(
+        models.LikedSong.user_id == user_id,
+        models.LikedSong.song_id.in_([song_id for song_id, _ in changes]),
+    ).values(position=case(dict(changes), value=models.LikedSong.song_id))
+
 def is_song_liked_by_user(db: Session, user_id: str, song_id: str) -> bool:
     """
     Devuelve True si la canción está en los liked_songs del usuario, False si no.
@@ -121,4 +248,20 @@ def is_song_liked_by_user(db: Session, user_id: str, song_id: str) -> bool:
     return db.query(models.LikedSong).filter(
         models.LikedSong.user_id == user_id,
         models.LikedSong.song_id == song_id
-    ).first() is not None
\ No newline at end of file
+    ).first() is not None
+
+def get_liked_song_ids(db: Session, user_id: str, song_ids: list[str]) -> set[str]:
+    """
+    Devuelve cuáles de `song_ids` están en favoritos del usuario, en una sola
+    consulta sobre el índice (user_id, song_id).
+    """
+    if dialect.is_postgres(db):
+        # Un único parámetro array: el plan es el mismo sin importar cuántos IDs lleguen
+        membership = models.LikedSong.song_id == any_(bindparam("song_ids", song_ids, type_=ARRAY(String)))
+    else:
+        membership = models.LikedSong.song_id.in_(song_ids)
+    
+    rows = db.execute(
+        select(models.LikedSong.song_id).where(models.LikedSong.user_id == user_id, membership)
+    )
+    return {song_id for (song_id,) in rows}
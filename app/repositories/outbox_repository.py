@@ -0,0 +1,101 @@
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from uuid import UUID
+from app import models
+from app.utils import dialect
+from app.utils.pagination import InvalidCursorError
+from app.utils.projections import fetch_rows
+
+# Tipos de evento de dominio
+PLAYLIST_CREATED = "playlist.created"
+PLAYLIST_UPDATED = "playlist.updated"
+PLAYLIST_DELETED = "playlist.deleted"
+SONG_ADDED = "playlist.song_added"
+SONG_REMOVED = "playlist.song_removed"
+SONG_MOVED = "playlist.song_moved"
+SONG_LIKED = "song.liked"
+SONG_UNLIKED = "song.unliked"
+SONG_PLAYED = "song.played"
+
+# Clave del advisory lock que serializa al relay entre workers
+RELAY_LOCK_ID = 0x0B0_0025
+
+OUTBOX_EVENT_COLUMNS = (
+    models.OutboxEvent.id,
+    models.OutboxEvent.feed_seq.label("seq"),
+    models.OutboxEvent.event_type,
+    models.OutboxEvent.user_id,
+    models.OutboxEvent.payload,
+    models.OutboxEvent.created_at,
+)
+
+def _jsonable(payload: dict) -> dict:
+    return {key: str(value) if isinstance(value, UUID) else value for key, value in payload.items()}
+
+def record_event(db: Session, event_type: str, user_id: str, **payload):
+    """
+    Agrega un evento a la transacción en curso: se confirma (o se descarta)
+    junto con la escritura que lo origina.
+    """
+    db.execute(insert(models.OutboxEvent).values(event_type=event_type, user_id=user_id, payload=_jsonable(payload)))
+
+def record_events(db: Session, event_type: str, user_id: str, payloads: list[dict]):
+    """Varios eventos del mismo tipo en un único INSERT multi-fila"""
+    if payloads:
+        db.execute(
+            insert(models.OutboxEvent),
+            [{"event_type": event_type, "user_id": user_id, "payload": _jsonable(payload)} for payload in payloads],
+        )
+
+def decode_event_cursor(cursor: str) -> int:
+    try:
+        last_id = int(cursor)
+    except ValueError:
+        raise InvalidCursorError("Cursor de eventos inválido")
+    if last_id < 0:
+        raise InvalidCursorError("Cursor de eventos inválido")
+    return last_id
+
+def get_events(db: Session, cursor: str | None = None, limit: int = 100, event_types: list[str] | None = None):
+    """
+    Eventos publicados posteriores a `cursor`, en el orden en que los publicó
+    el relay (un rango sobre feed_seq), con el cursor para la siguiente
+    llamada. Sin cursor se empieza desde el primer evento.
+    """
+    last_seq = decode_event_cursor(cursor) if cursor else 0
+    stmt = select(*OUTBOX_EVENT_COLUMNS).where(models.OutboxEvent.feed_seq > last_seq)
+    if event_types:
+        stmt = stmt.where(models.OutboxEvent.event_type.in_(event_types))
+    
+    events = fetch_rows(db, stmt.order_by(models.OutboxEvent.feed_seq).limit(limit))
+    return {
+        "events": events,
+        "cursor": str(events[-1]["seq"] if events else last_seq)
+    }
+
+def claim_pending(db: Session, limit: int = 500) -> list[dict]:
+    """
+    Toma una tanda de eventos confirmados y no publicados, en orden de id, y les
+    asigna feed_seq y published_at sin confirmar: el relay confirma después de
+    entregarlos. Un solo relay corre a la vez (advisory lock en Postgres), así
+    cada tanda continúa donde terminó la anterior y el feed no saltea eventos.
+    """
+    if dialect.is_postgres(db):
+        db.execute(select(func.pg_advisory_xact_lock(RELAY_LOCK_ID)))
+    
+    last = db.scalar(select(func.coalesce(func.max(models.OutboxEvent.feed_seq), 0)))
+    batch = select(
+        models.OutboxEvent.id,
+        func.row_number().over(order_by=models.OutboxEvent.id).label("offset")
+    ).where(
+        models.OutboxEvent.published_at.is_(None)
+    ).order_by(models.OutboxEvent.id).limit(limit).subquery()
+    
+    claimed = db.execute(
+        update(models.OutboxEvent)
+        .where(models.OutboxEvent.id == batch.c.id)
+        .values(feed_seq=last + batch.c.offset, published_at=func.now())
+        .returning(*OUTBOX_EVENT_COLUMNS)
+    ).mappings()
+    return sorted((dict(event) for event in claimed), key=lambda event: event["seq"])
@@ -1,211 +1,597 @@
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import func
+from sqlalchemy import case, delete, func, insert, select, tuple_, update
+from sqlalchemy.orm import Session, joinedload, noload
+from sqlalchemy.orm.attributes import set_committed_value
 from uuid import UUID
 from app import models, schemas
+from app.utils.positions import assign_positions
+from app.utils.projections import count_rows, fetch_rows
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor, seek_after, split_page
+from app.cache import build_cache
+from app.repositories import library_change_repository as change_log
+from app.repositories import outbox_repository as outbox
+from app.services import search_service
+from pydantic import TypeAdapter
 import math
+import os
+
+# Separación entre claves de orden consecutivas. Deja lugar para ~10 inserciones
+# en el mismo hueco antes de tener que rebalancear la playlist.
+RANK_GAP = 1024
+
+# Tamaño de página de canciones cuando solo se pide un cursor
+DEFAULT_SONGS_PAGE = 100
+
+# Columnas de los listados: se proyectan como filas planas, sin cargar entidades
+PLAYLIST_SUMMARY_COLUMNS = (
+    models.Playlist.id,
+    models.Playlist.name,
+    models.Playlist.cover_url,
+    models.Playlist.owner_id,
+    models.Playlist.is_public,
+    models.Playlist.created_at,
+    models.Playlist.song_count,
+    (models.Playlist.song_count + 1).label("next_position"),
+    models.Playlist.version,
+)
+
+# Caché read-through del detalle completo de playlist, ya serializado a JSON.
+# La leen, la cargan y la invalidan (después de cada escritura confirmada) los
+# routers, fuera de run_sync: con Redis es E/S de red. Las escrituras devuelven
+# la versión resultante, que queda como piso de la entrada: una recarga que
+# leyó antes de la escritura trae una versión menor y no se guarda.
+PLAYLIST_DETAIL_CACHE_TTL = float(os.getenv("PLAYLIST_CACHE_TTL", 30))
+PLAYLIST_DETAIL_CACHE_MAX_BYTES = int(os.getenv("PLAYLIST_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+playlist_detail_cache = build_cache(
+    "playlist_detail",
+    max_entries=int(os.getenv("PLAYLIST_CACHE_MAX_ENTRIES", 10_000)),
+    ttl=PLAYLIST_DETAIL_CACHE_TTL,
+    max_bytes=PLAYLIST_DETAIL_CACHE_MAX_BYTES,
+    dumps=lambda body: body,
+    loads=lambda body: body,
+)
+_playlist_detail = TypeAdapter(schemas.Playlist)
+
+async def invalidate_playlist_detail(playlist_id: UUID, version: int):
+    """
+    Reemplaza la entrada por un piso sin cuerpo (b"<versión>\n") con la versión
+    que dejó la escritura, en lugar de borrarla
+    """
+    await playlist_detail_cache.set(str(playlist_id), b"%d\n" % version)
 
 def create_playlist(db: Session, playlist: schemas.PlaylistCreate, user_id: str):
-    new_playlist = models.Playlist(**playlist.dict(), owner_id=user_id)
+    new_playlist = models.Playlist(**playlist.model_dump(), owner_id=user_id)
     db.add(new_playlist)
+    # created_at vuelve en el RETURNING del INSERT: no hace falta refresh()
+    db.flush()
+    change_log.record_change(db, user_id, change_log.PLAYLIST, change_log.INSERT, playlist_id=new_playlist.id)
+    outbox.record_event(db, outbox.PLAYLIST_CREATED, user_id,
+                        playlist_id=new_playlist.id, name=new_playlist.name, is_public=new_playlist.is_public)
     db.commit()
-    db.refresh(new_playlist)
+    # Una playlist nueva no tiene canciones: se evita la carga diferida al serializar
+    set_committed_value(new_playlist, "songs", [])
     return new_playlist
 
-def get_playlists(db: Session, user_id: UUID | None = None):
-    query = db.query(models.Playlist)
+def _playlist_cursor(row: dict) -> str:
+    return encode_cursor({"id": row["id"], "key": row["created_at"]})
+
+def get_playlists_page(db: Session, user_id: str | None = None, limit: int = 50, cursor: str | None = None):
+    """
+    Página de playlists (más recientes primero) por keyset sobre (created_at, id),
+    proyectada como filas planas.
+    """
+    stmt = select(*PLAYLIST_SUMMARY_COLUMNS)
     if user_id:
-        query = query.filter(models.Playlist.owner_id == user_id)
-    return query.all()
+        stmt = stmt.where(models.Playlist.owner_id == user_id)
+    stmt = stmt.order_by(models.Playlist.created_at.desc(), models.Playlist.id.desc())
+    if cursor:
+        stmt = seek_after(stmt, models.Playlist, models.Playlist.created_at, decode_cursor(cursor))
+    
+    playlists, has_more = split_page(fetch_rows(db, stmt.limit(limit + 1)), limit)
+    return {
+        "playlists": playlists,
+        "next_cursor": _playlist_cursor(playlists[-1]) if has_more else None
+    }
 
-def get_playlist(db: Session, playlist_id: UUID):
-    return db.query(models.Playlist).filter(models.Playlist.id == playlist_id).first()
+def get_playlist(db: Session, playlist_id: UUID, songs_limit: int | None = None, songs_cursor: str | None = None):
+    """
+    Devuelve la playlist con sus canciones ordenadas. Sin límite se cargan todas
+    en la misma consulta (JOIN); con `songs_limit`/`songs_cursor` se trae solo
+    una página de canciones y el cursor de la siguiente queda en
+    `playlist.songs_next_cursor`.
+    """
+    if songs_limit is None and songs_cursor is None:
+        playlist = db.query(models.Playlist).options(
+            joinedload(models.Playlist.songs)
+        ).filter(models.Playlist.id == playlist_id).populate_existing().first()
+        if playlist:
+            assign_positions(playlist.songs)
+        return playlist
 
-def add_song(db: Session, playlist_id: UUID, song: schemas.PlaylistSongCreate):
-    playlist = get_playlist(db, playlist_id)
+    playlist = db.query(models.Playlist).options(
+        noload(models.Playlist.songs)
+    ).filter(models.Playlist.id == playlist_id).first()
     if not playlist:
         return None
 
-    max_position = db.query(func.max(models.PlaylistSong.position)).filter(
+    limit = songs_limit or DEFAULT_SONGS_PAGE
+    query = db.query(models.PlaylistSong).filter(
         models.PlaylistSong.playlist_id == playlist_id
-    ).scalar() or 0
+    ).order_by(models.PlaylistSong.rank, models.PlaylistSong.id)
+
+    skip = 0
+    if songs_cursor:
+        values = decode_cursor(songs_cursor)
+        query = seek_after(query, models.PlaylistSong, models.PlaylistSong.rank, values, descending=False)
+        skip = values.get("position", 0)
+
+    songs, has_more = split_page(query.limit(limit + 1).all(), limit)
+    assign_positions(songs, start=skip + 1)
+
+    # Página parcial: se fija sin marcar la relación como modificada
+    set_committed_value(playlist, "songs", songs)
+    playlist.songs_next_cursor = None
+    if has_more:
+        last = songs[-1]
+        playlist.songs_next_cursor = encode_cursor({"id": last.id, "key": last.rank, "position": last.position})
+    return playlist
+
+async def _cached_detail(playlist_id: UUID) -> tuple[int, bytes] | None:
+    # La entrada guarda b"<versión>\n<json>" para tener la versión sin parsear el JSON
+    entry = await playlist_detail_cache.get(str(playlist_id))
+    if entry is None:
+        return None
+    version, body = entry.split(b"\n", 1)
+    return int(version), body
+
+async def cached_playlist_detail(playlist_id: UUID, min_version: int = None) -> tuple[int, bytes] | None:
+    """
+    (versión, JSON) del detalle completo desde la caché, o None si no está (o
+    solo queda el piso de una invalidación). Con `min_version` (la versión
+    recién leída de la base) una entrada más vieja se ignora: quien llama la
+    reemplaza con store_playlist_detail.
+    """
+    cached = await _cached_detail(playlist_id)
+    if cached is None or not cached[1] or (min_version is not None and cached[0] < min_version):
+        return None
+    return cached
+
+async def store_playlist_detail(playlist_id: UUID, version: int, body: bytes):
+    """
+    Guarda el detalle en la caché, salvo que la entrada (o el piso que dejó la
+    última escritura) tenga una versión mayor: así una lectura que empezó
+    antes de una escritura no vuelve a guardar el detalle anterior.
+    """
+    cached = await _cached_detail(playlist_id)
+    if cached is None or cached[0] <= version:
+        await playlist_detail_cache.set(str(playlist_id), b"%d\n%s" % (version, body))
+
+def get_playlist_detail_json(db: Session, playlist_id: UUID) -> tuple[int, bytes] | None:
+    """
+    Detalle completo de la playlist como (versión, JSON listo para responder),
+    leído con get_playlist y serializado; es lo que se guarda en
+    playlist_detail_cache. Devuelve None si la playlist no existe.
+    """
+    playlist = get_playlist(db, playlist_id)
+    if playlist is None:
+        return None
+    
+    body = _playlist_detail.dump_json(_playlist_detail.validate_python(playlist))
+    return playlist.version, body
+
+def get_playlist_version(db: Session, playlist_id: UUID) -> int | None:
+    """Versión actual de la playlist, por clave primaria y sin cargar canciones"""
+    return db.scalar(select(models.Playlist.version).where(models.Playlist.id == playlist_id))
+
+def get_playlist_songs(db: Session, playlist_id: UUID):
+    """
+    Devuelve las canciones de la playlist ordenadas y con su posición densa
+    """
+    songs = db.query(models.PlaylistSong).filter(
+        models.PlaylistSong.playlist_id == playlist_id
+    ).order_by(models.PlaylistSong.rank, models.PlaylistSong.id).all()
+    return assign_positions(songs)
+
+def _rank_for_position(db: Session, playlist_id: UUID, position: int, exclude_id: UUID | None = None):
+    """
+    Calcula la clave de orden para que una canción quede en `position` (1-based)
+    entre las demás canciones de la playlist. Devuelve None si no queda hueco
+    entre los vecinos y hay que rebalancear.
+    """
+    query = db.query(models.PlaylistSong.rank).filter(
+        models.PlaylistSong.playlist_id == playlist_id
+    )
+    if exclude_id is not None:
+        query = query.filter(models.PlaylistSong.id != exclude_id)
+
+    if position <= 1:
+        first = query.order_by(models.PlaylistSong.rank, models.PlaylistSong.id).limit(1).scalar()
+        return RANK_GAP if first is None else first - RANK_GAP
+
+    neighbours = [
+        rank for (rank,) in query.order_by(models.PlaylistSong.rank, models.PlaylistSong.id)
+        .offset(position - 2).limit(2).all()
+    ]
+    if not neighbours:
+        return RANK_GAP
+    if len(neighbours) == 1:
+        return neighbours[0] + RANK_GAP
+
+    previous_rank, next_rank = neighbours
+    if next_rank - previous_rank < 2:
+        return None
+    return (previous_rank + next_rank) // 2
+
+def rebalance_playlist(db: Session, playlist_id: UUID):
+    """
+    Vuelve a espaciar las claves de orden de toda la playlist. Es O(n), pero
+    solo ocurre cuando un hueco entre dos canciones se agota.
+    """
+    songs = db.query(models.PlaylistSong).filter(
+        models.PlaylistSong.playlist_id == playlist_id
+    ).order_by(models.PlaylistSong.rank, models.PlaylistSong.id).all()
+
+    for index, song in enumerate(songs, start=1):
+        song.rank = index * RANK_GAP
+
+    db.flush()
+    _raise_last_rank(db, playlist_id, len(songs) * RANK_GAP)
+
+def _reserve_songs(db: Session, playlist_id: UUID, count: int, append: bool):
+    """
+    Suma `count` al contador de la playlist (y, si se agrega al final, reserva
+    las claves de orden) en un único UPDATE ... RETURNING, que además bloquea
+    la fila hasta el commit. Devuelve (song_count, last_rank, owner_id, version)
+    o None si la playlist no existe.
+    """
+    counters = {
+        models.Playlist.song_count: models.Playlist.song_count + count,
+        models.Playlist.version: models.Playlist.version + 1,
+    }
+    if append:
+        counters[models.Playlist.last_rank] = models.Playlist.last_rank + RANK_GAP * count
+    return db.execute(
+        update(models.Playlist)
+        .where(models.Playlist.id == playlist_id)
+        .values(counters)
+        .returning(models.Playlist.song_count, models.Playlist.last_rank, models.Playlist.owner_id,
+                   models.Playlist.version)
+    ).first()
+
+def _raise_last_rank(db: Session, playlist_id: UUID, rank: int):
+    """Mantiene last_rank como cota superior de las claves de la playlist"""
+    db.query(models.Playlist).filter(
+        models.Playlist.id == playlist_id,
+        models.Playlist.last_rank < rank
+    ).update({models.Playlist.last_rank: rank})
+
+def add_song(db: Session, playlist_id: UUID, song: schemas.PlaylistSongCreate):
+    reserved = _reserve_songs(db, playlist_id, 1, append=True)
+    if reserved is None:
+        return None
+    song_count, last_rank, owner_id, version = reserved
     
     new_song = models.PlaylistSong(
         playlist_id=playlist_id,
         song_id=song.song_id,
-        position=max_position + 1
+        rank=last_rank
     )
     
     db.add(new_song)
+    db.flush()
+    new_song.position = song_count
+    new_song.playlist_version = version
+    _record_song_changes(db, owner_id, change_log.INSERT, _song_rows([new_song]))
     db.commit()
-    db.refresh(new_song)
     return new_song
 
+def _song_rows(songs: list) -> list[dict]:
+    return [
+        {"playlist_id": song.playlist_id, "entry_id": song.id, "song_id": song.song_id, "position": song.position}
+        for song in songs
+    ]
+
+# Evento de dominio de cada acción sobre canciones de playlist
+SONG_EVENTS = {
+    change_log.INSERT: outbox.SONG_ADDED,
+    change_log.MOVE: outbox.SONG_MOVED,
+}
+
+def _record_song_changes(db: Session, owner_id: str, action: str, rows: list[dict]):
+    """Registra altas o movimientos de canciones en el registro de cambios y en el outbox"""
+    change_log.record_changes(db, owner_id, change_log.PLAYLIST_SONG, action, rows)
+    outbox.record_events(db, SONG_EVENTS[action], owner_id, rows)
+
+def add_songs(db: Session, playlist_id: UUID, song_ids: list[str], position: int | None = None):
+    """
+    Agrega varias canciones en un único INSERT multi-fila con RETURNING. Sin
+    `position` se agregan al final; con `position` (1-based) quedan a partir de
+    ahí, en el orden recibido. Devuelve None si la playlist no existe.
+    """
+    count = len(song_ids)
+    reserved = _reserve_songs(db, playlist_id, count, append=position is None)
+    if reserved is None:
+        return None
+    song_count, last_rank, owner_id, version = reserved
+    previous_count = song_count - count
+
+    if position is None:
+        first_position = previous_count + 1
+        previous_rank, step = last_rank - RANK_GAP * count, RANK_GAP
+    elif position > previous_count:
+        first_position = previous_count + 1
+        previous_rank, step = last_rank, RANK_GAP
+        _raise_last_rank(db, playlist_id, last_rank + RANK_GAP * count)
+    else:
+        first_position = max(position, 1)
+        previous_rank, step = _open_rank_gap(db, playlist_id, first_position, len(song_ids))
+
+    new_songs = db.scalars(
+        insert(models.PlaylistSong).returning(models.PlaylistSong, sort_by_parameter_order=True),
+        [
+            {
+                "playlist_id": playlist_id,
+                "song_id": song_id,
+                "rank": previous_rank + step * index,
+            }
+            for index, song_id in enumerate(song_ids, start=1)
+        ],
+    ).all()
+    assign_positions(new_songs, start=first_position)
+    for new_song in new_songs:
+        new_song.playlist_version = version
+    _record_song_changes(db, owner_id, change_log.INSERT, _song_rows(new_songs))
+    db.commit()
+    return new_songs
+
+def _open_rank_gap(db: Session, playlist_id: UUID, position: int, count: int):
+    """
+    Deja lugar para `count` canciones antes de la que hoy ocupa `position`.
+    Devuelve la clave previa al hueco y el paso entre claves nuevas. Si el hueco
+    no alcanza, corre las claves siguientes con un único UPDATE.
+    """
+    ranks = db.query(models.PlaylistSong.rank).filter(
+        models.PlaylistSong.playlist_id == playlist_id
+    ).order_by(models.PlaylistSong.rank, models.PlaylistSong.id)
+
+    next_rank = ranks.offset(position - 1).limit(1).scalar()
+    previous_rank = ranks.offset(position - 2).limit(1).scalar() if position > 1 else None
+    if previous_rank is None:
+        previous_rank = next_rank - RANK_GAP * (count + 1)
+
+    step = (next_rank - previous_rank) // (count + 1)
+    if step < 1:
+        shift = RANK_GAP * (count + 1)
+        db.query(models.PlaylistSong).filter(
+            models.PlaylistSong.playlist_id == playlist_id,
+            models.PlaylistSong.rank >= next_rank
+        ).update({models.PlaylistSong.rank: models.PlaylistSong.rank + shift}, synchronize_session=False)
+        db.query(models.Playlist).filter(
+            models.Playlist.id == playlist_id
+        ).update({models.Playlist.last_rank: models.Playlist.last_rank + shift})
+        step = (next_rank + shift - previous_rank) // (count + 1)
+    return previous_rank, step
+
 def remove_song(db: Session, playlist_id: UUID, song_id: str):
-    song = db.query(models.PlaylistSong).filter(
+    """
+    Quita la primera aparición de la canción. Devuelve la versión de la
+    playlist después del cambio, o False si la canción no estaba.
+    """
+    first_match = select(models.PlaylistSong.id).where(
         models.PlaylistSong.playlist_id == playlist_id,
         models.PlaylistSong.song_id == song_id
-    ).first()
+    ).order_by(models.PlaylistSong.rank, models.PlaylistSong.id).limit(1).scalar_subquery()
     
-    if not song:
+    # Las posiciones se derivan del orden, no hace falta renumerar las demás
+    deleted = db.execute(
+        delete(models.PlaylistSong)
+        .where(models.PlaylistSong.id == first_match)
+        .returning(models.PlaylistSong.id, models.PlaylistSong.rank)
+    ).first()
+    if deleted is None:
         return False
     
-    # Guardar posición para reordenar
-    deleted_position = song.position
-    
-    db.delete(song)
-    db.commit()
-    
-    # Reordenar las posiciones de las canciones restantes
-    remaining_songs = db.query(models.PlaylistSong).filter(
+    owner_id, version = db.execute(
+        update(models.Playlist)
+        .where(models.Playlist.id == playlist_id)
+        .values({
+            models.Playlist.song_count: models.Playlist.song_count - 1,
+            models.Playlist.version: models.Playlist.version + 1,
+        })
+        .returning(models.Playlist.owner_id, models.Playlist.version)
+    ).one()
+    # Tombstone con la posición que ocupaba, calculada en el mismo INSERT
+    position = select(func.count() + 1).where(
         models.PlaylistSong.playlist_id == playlist_id,
-        models.PlaylistSong.position > deleted_position
-    ).all()
-    
-    for song in remaining_songs:
-        song.position -= 1
-    
+        tuple_(models.PlaylistSong.rank, models.PlaylistSong.id) < (deleted.rank, deleted.id)
+    ).scalar_subquery()
+    change_log.record_change(db, owner_id, change_log.PLAYLIST_SONG, change_log.DELETE,
+                             playlist_id=playlist_id, entry_id=deleted.id, song_id=song_id, position=position)
+    outbox.record_event(db, outbox.SONG_REMOVED, owner_id, playlist_id=playlist_id, song_id=song_id)
     db.commit()
-    return True
+    return version
 
 def delete_playlist(db: Session, playlist_id: UUID, user_id: str):
-    playlist = db.query(models.Playlist).filter(
+    """
+    Borra la playlist del usuario con sus canciones. Devuelve una versión
+    mayor a la última que tuvo (el piso para la caché del detalle), o False
+    si no existe o no es suya.
+    """
+    owned = select(models.Playlist.id).where(
         models.Playlist.id == playlist_id,
         models.Playlist.owner_id == user_id
+    )
+    db.execute(
+        delete(models.PlaylistSong).where(models.PlaylistSong.playlist_id.in_(owned))
+    )
+    deleted = db.execute(
+        delete(models.Playlist)
+        .where(models.Playlist.id.in_(owned))
+        .returning(models.Playlist.version)
     ).first()
     
-    if not playlist:
+    if deleted is None:
+        db.rollback()
         return False
-    db.query(models.PlaylistSong).filter(
-        models.PlaylistSong.playlist_id == playlist_id
-    ).delete()
-    
-    db.delete(playlist)
+    # Un solo tombstone: el cliente descarta la playlist con sus canciones
+    change_log.record_change(db, user_id, change_log.PLAYLIST, change_log.DELETE, playlist_id=playlist_id)
+    outbox.record_event(db, outbox.PLAYLIST_DELETED, user_id, playlist_id=playlist_id)
     db.commit()
-    return True
+    return deleted.version + 1
 
 def reorder_playlist_songs(db: Session, playlist_id: UUID, song_positions: list[schemas.PlaylistSongPositionUpdate]):
     """
-    Reordena canciones en una playlist, desplazando correctamente las demás canciones.
+    Reordena canciones en una playlist. Cada movimiento reescribe solo la clave
+    de orden de la canción movida; las demás se desplazan implícitamente.
+    Devuelve la versión de la playlist después del cambio, o False si algún
+    movimiento no es válido.
     """
+    # Bloquea la fila de la playlist (como add_song con su UPDATE): las claves
+    # se calculan sin que un alta concurrente tome la misma
     playlist = db.query(models.Playlist).filter(
         models.Playlist.id == playlist_id
-    ).first()
+    ).with_for_update().first()
     
     if not playlist:
         return False
     
     try:
-        all_songs = db.query(models.PlaylistSong).filter(
-            models.PlaylistSong.playlist_id == playlist_id
-        ).order_by(models.PlaylistSong.position).all()
+        total_songs = playlist.song_count
         
-        if not all_songs:
-            return True
+        if not total_songs:
+            return playlist.version
         
-        songs_by_id = {str(song.song_id): song for song in all_songs}
+        moved_songs = db.query(models.PlaylistSong).filter(
+            models.PlaylistSong.playlist_id == playlist_id,
+            models.PlaylistSong.song_id.in_({str(move.song_id) for move in song_positions})
+        ).all()
+        songs_by_id = {str(song.song_id): song for song in moved_songs}
         
-        for update in song_positions:
-            if str(update.song_id) not in songs_by_id:
+        for move in song_positions:
+            if str(move.song_id) not in songs_by_id:
                 return False
             
-            if update.position < 1 or update.position > len(all_songs):
+            if move.position < 1 or move.position > total_songs:
                 return False
         
-        for update in song_positions:
-            song_to_move = songs_by_id[str(update.song_id)]
-            old_position = song_to_move.position
-            new_position = update.position
+        moves = []
+        for move in song_positions:
+            song_to_move = songs_by_id[str(move.song_id)]
             
-            if old_position == new_position:
-                continue
-                
-            if old_position < new_position:
-
-                for song in all_songs:
-                    if old_position < song.position <= new_position:
-                        song.position -= 1
-                        
-            else: 
-                for song in all_songs:
-                    if new_position <= song.position < old_position:
-                        song.position += 1
+            new_rank = _rank_for_position(db, playlist_id, move.position, exclude_id=song_to_move.id)
+            if new_rank is None:
+                rebalance_playlist(db, playlist_id)
+                new_rank = _rank_for_position(db, playlist_id, move.position, exclude_id=song_to_move.id)
             
-            song_to_move.position = new_position
-            
-            all_songs.sort(key=lambda s: s.position)
+            song_to_move.rank = new_rank
+            db.flush()
+            moves.append({"playlist_id": playlist_id, "entry_id": song_to_move.id,
+                          "song_id": song_to_move.song_id, "position": move.position})
         
+        top_rank = max(song.rank for song in moved_songs)
+        version = db.scalar(
+            update(models.Playlist)
+            .where(models.Playlist.id == playlist_id)
+            .values({
+                models.Playlist.version: models.Playlist.version + 1,
+                models.Playlist.last_rank: case(
+                    (models.Playlist.last_rank < top_rank, top_rank), else_=models.Playlist.last_rank
+                ),
+            })
+            .returning(models.Playlist.version)
+        )
+        # Cada movimiento ya es "sacar y reinsertar en position", igual que en el cliente
+        _record_song_changes(db, playlist.owner_id, change_log.MOVE, moves)
         db.commit()
-        return True
+        return version
         
     except Exception as e:
         db.rollback()
         print(f"Error al reordenar canciones: {e}")
         return False
 
-def search_playlists_paginated(db: Session, search: str = None, page: int = 1, limit: int = 10, user_id: str = None):
+def search_playlists_paginated(db: Session, search: str = None, page: int = 1, limit: int = 10, user_id: str = None,
+                               cursor: str = None, with_total: bool = True, sort: str = search_service.SORT_RECENT):
     """
-    Busca playlists por nombre con paginación
+    Busca playlists por nombre con paginación. Con `cursor` la página se busca
+    por keyset sobre (created_at, id) y su costo no depende de la profundidad.
+    Con sort="relevance" los resultados se ordenan por similitud con `search`.
     """
-    query = db.query(models.Playlist)
+    by_relevance = bool(search) and sort == search_service.SORT_RELEVANCE
+    if by_relevance and cursor:
+        raise InvalidCursorError("El cursor solo aplica al orden por fecha")
+
+    stmt = select(*PLAYLIST_SUMMARY_COLUMNS)
     
     if user_id:
-        query = query.filter(models.Playlist.owner_id == user_id)
+        stmt = stmt.where(models.Playlist.owner_id == user_id)
 
     if search:
-        query = query.filter(
-            models.Playlist.name.ilike(f"%{search}%")
-        )
+        stmt = stmt.where(search_service.text_filter(models.Playlist.name, search))
     
-    total = query.count()
+    total = total_pages = None
+    if with_total:
+        total = count_rows(db, stmt)
+        total_pages = math.ceil(total / limit) if total > 0 else 1
 
-    skip = (page - 1) * limit
-    total_pages = math.ceil(total / limit) if total > 0 else 1
+    if by_relevance:
+        stmt = stmt.order_by(search_service.relevance(db, models.Playlist.name, search).desc())
+    stmt = stmt.order_by(models.Playlist.created_at.desc(), models.Playlist.id.desc())
+    if cursor:
+        stmt = seek_after(stmt, models.Playlist, models.Playlist.created_at, decode_cursor(cursor))
+    else:
+        stmt = stmt.offset((page - 1) * limit)
 
-    playlists = query.order_by(models.Playlist.created_at.desc()).offset(skip).limit(limit).all()
+    playlists, has_more = split_page(fetch_rows(db, stmt.limit(limit + 1)), limit)
     
     return {
         "playlists": playlists,
         "page": page,
         "limit": limit,
         "total": total,
-        "total_pages": total_pages
+        "total_pages": total_pages,
+        "next_cursor": _playlist_cursor(playlists[-1]) if has_more else None
     }
 
 def update_playlist_cover(db: Session, playlist_id: UUID, user_id: str, cover_url: str):
     """
     Actualiza el cover_url de una playlist
     """
-    playlist = db.query(models.Playlist).filter(
-        models.Playlist.id == playlist_id,
-        models.Playlist.owner_id == user_id  # Solo el dueño puede actualizar
-    ).first()
-    
-    if not playlist:
-        return None
-    
-    playlist.cover_url = cover_url
-    db.commit()
-    db.refresh(playlist)
-    return playlist
+    return _update_owned_playlist(db, playlist_id, user_id, {"cover_url": cover_url})
 
 def update_playlist(db: Session, playlist_id: UUID, user_id: str, playlist_update: schemas.PlaylistUpdate):
     """
     Actualiza los datos de una playlist (nombre e is_public)
     """
-    playlist = db.query(models.Playlist).filter(
-        models.Playlist.id == playlist_id,
-        models.Playlist.owner_id == user_id
+    changes = playlist_update.model_dump(exclude_none=True)
+    return _update_owned_playlist(db, playlist_id, user_id, changes)
+
+def _update_owned_playlist(db: Session, playlist_id: UUID, user_id: str, changes: dict):
+    """
+    UPDATE ... RETURNING filtrado por dueño: valida, escribe y devuelve la fila
+    actualizada en una sentencia. Devuelve None si no existe o no es del usuario.
+    """
+    changed = sorted(changes)
+    if changed:
+        changes["version"] = models.Playlist.version + 1
+    else:
+        # Sin cambios: el UPDATE nulo igual valida al dueño y devuelve la fila
+        changes = {"name": models.Playlist.name}
+    
+    playlist = db.scalars(
+        update(models.Playlist)
+        .where(models.Playlist.id == playlist_id, models.Playlist.owner_id == user_id)
+        .values(changes)
+        .returning(models.Playlist)
     ).first()
     
-    if not playlist:
+    if playlist is None:
+        db.rollback()
         return None
     
-    if playlist_update.name is not None:
-        playlist.name = playlist_update.name
-    
-    if playlist_update.is_public is not None:
-        playlist.is_public = playlist_update.is_public
-    
+    if changed:
+        change_log.record_change(db, user_id, change_log.PLAYLIST, change_log.UPDATE, playlist_id=playlist_id)
+        outbox.record_event(db, outbox.PLAYLIST_UPDATED, user_id, playlist_id=playlist_id, fields=changed)
     db.commit()
-    db.refresh(playlist)
+    set_committed_value(playlist, "songs", get_playlist_songs(db, playlist_id))
     return playlist
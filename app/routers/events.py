@@ -0,0 +1,39 @@
+import time
+from fastapi import APIRouter, Query, Request
+from app import schemas, database
+from app.repositories import outbox_repository as repo
+from app.services import outbox_service
+from app.utils.responses import FastJSONResponse
+
+router = APIRouter(
+    prefix="/events",
+    tags=["Events"]
+)
+
+# Cada cuánto un long-poll vuelve a mirar la base aunque no lo despierten:
+# los eventos de otros workers no pasan por el relay de este
+FEED_RECHECK_SECONDS = 1.0
+
+@router.get("/", response_model=schemas.EventFeedPage, response_class=FastJSONResponse)
+async def get_events(
+    request: Request,
+    cursor: str = Query(None, description="Cursor devuelto por la llamada anterior"),
+    limit: int = Query(100, ge=1, le=1000, description="Máximo de eventos a devolver"),
+    event_type: list[str] = Query(None, description="Filtrar por tipo de evento"),
+    wait: float = Query(0, ge=0, le=30, description="Segundos a esperar si no hay eventos (long-poll)")
+):
+    """
+    Feed de eventos de dominio (playlists, favoritos y reproducciones) para
+    consumidores externos, en el orden en que los publicó el relay y con
+    cursor. Con `wait` la respuesta se retiene hasta que haya eventos nuevos o
+    se cumpla el plazo. Cada consulta usa una sesión corta: la espera no
+    retiene una conexión del pool.
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        async with database.read_session_maker(request)() as db:
+            result = await db.run_sync(repo.get_events, cursor, limit, event_type)
+        remaining = deadline - time.monotonic()
+        if result["events"] or remaining <= 0:
+            return FastJSONResponse(result)
+        await outbox_service.new_events.wait(min(remaining, FEED_RECHECK_SECONDS))
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+from app import database
+from app.services import export_service
+
+router = APIRouter(
+    prefix="/export",
+    tags=["Export"]
+)
+
+@router.get("/", response_class=StreamingResponse)
+async def export_library(
+    request: Request,
+    user_id: str = Header(..., description="ID del usuario")
+):
+    """
+    Exporta la biblioteca completa del usuario (playlists con sus canciones,
+    favoritos e historial) como NDJSON en streaming. Si el cliente acepta gzip,
+    la respuesta se comprime al vuelo.
+    """
+    # La sesión vive lo que dura el streaming, no lo que dura el endpoint
+    session_maker = database.read_session_maker(request)
+
+    async def body():
+        async with session_maker() as db:
+            async for chunk in export_service.export_library(db, user_id):
+                yield chunk
+
+    chunks = body()
+    headers = {
+        "Content-Disposition": 'attachment; filename="library.ndjson"',
+        "Vary": "Accept-Encoding",
+    }
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        chunks = export_service.gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type="application/x-ndjson", headers=headers)
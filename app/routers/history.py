@@ -1,64 +1,70 @@
 from fastapi import APIRouter, Depends, HTTPException, Header, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 from app import schemas, database
 from app.repositories import history_repository as repo
+from app.services.search_service import SORT_RECENT
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter(
     prefix="/history",
     tags=["History"]
 )
 
-@router.get("/")
-def get_history(
+@router.get("/", response_model=schemas.HistoryPage, response_class=FastJSONResponse)
+async def get_history(
     user_id: str = Header(..., description="ID del usuario"),
     page: int = Query(1, ge=1, description="Número de página"),
     limit: int = Query(10, ge=1, le=100, description="Entradas por página"),
     search: str = Query(None, description="Buscar por nombre de canción"),
     artist: str = Query(None, description="Filtrar por artista"),
-    db: Session = Depends(database.get_db)
+    cursor: str = Query(None, description="Cursor de la página siguiente (reemplaza a page)"),
+    with_total: bool = Query(True, description="Calcular el total exacto de entradas"),
+    sort: str = Query(SORT_RECENT, pattern="^(recent|relevance)$", description="Orden: recent o relevance"),
+    db: AsyncSession = Depends(database.get_read_db)
 ):
     """Obtiene el historial de reproducción del usuario con paginación, búsqueda y filtros"""
-    result = repo.get_user_history_paginated(db, user_id, page, limit, search, artist)
+    result = await db.run_sync(repo.get_user_history_paginated, user_id, page, limit, search, artist, cursor, with_total, sort)
     
-    return {
+    return FastJSONResponse({
         "history": result["entries"],
         "pagination": {
             "page": result["page"],
             "limit": result["limit"],
             "total": result["total"],
-            "total_pages": result["total_pages"]
+            "total_pages": result["total_pages"],
+            "next_cursor": result["next_cursor"]
         }
-    }
+    })
 
 @router.post("/", response_model=schemas.HistoryEntry, status_code=201)
-def add_to_history(
+async def add_to_history(
     entry: schemas.HistoryEntryCreate,
     user_id: str = Header(..., description="ID del usuario"),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Añade una entrada al historial de reproducción"""
-    return repo.add_history_entry(db, user_id, entry)
+    return await db.run_sync(repo.add_history_entry, user_id, entry)
 
 @router.delete("/", status_code=204)
-def clear_history(
+async def clear_history(
     user_id: str = Header(..., description="ID del usuario"),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Borra todo el historial del usuario"""
-    success = repo.clear_history(db, user_id)
+    success = await db.run_sync(repo.clear_history, user_id)
     if not success:
         raise HTTPException(status_code=404, detail="No se encontró historial para este usuario")
     return {}
 
 @router.delete("/{song_id}", status_code=204)
-def remove_from_history(
+async def remove_from_history(
     song_id: str,
     user_id: str = Header(..., description="ID del usuario"),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Elimina una canción específica del historial"""
-    success = repo.remove_history_entry(db, user_id, song_id)
+    success = await db.run_sync(repo.remove_history_entry, user_id, song_id)
     if not success:
         raise HTTPException(status_code=404, detail="Entrada no encontrada en el historial")
     return {}
\ No newline at end of file
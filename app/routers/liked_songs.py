@@ -1,62 +1,114 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from app import schemas, database
 from app.repositories import liked_song_repository as repo
+from app.utils.responses import FastJSONResponse, next_cursor_header
+from app.utils.singleflight import coalesced_read
 
 router = APIRouter(
     prefix="/liked-songs",
     tags=["Liked Songs"]
 )
 
-@router.get("/", response_model=list[schemas.LikedSong])
-def get_liked_songs(
+async def _liked_ids(request: Request, user_id: str) -> frozenset | None:
+    """
+    Conjunto de favoritos del usuario desde la caché, cargándolo si hace falta.
+    La caché se usa acá y no dentro de run_sync: con Redis es E/S de red.
+    Devuelve None si el conjunto es demasiado grande para cachearlo.
+    
+    La recarga lee del primario (una réplica atrasada dejaría en la caché un
+    conjunto viejo para todos) y quien escribió hace poco no usa la caché.
+    """
+    generation, liked_ids = await repo.cached_liked_ids(user_id)
+    if liked_ids is None or database.reads_own_writes(request):
+        liked_ids = await coalesced_read(
+            "liked_ids", (user_id, generation), request, repo.load_liked_ids, user_id, primary=True
+        )
+        if liked_ids is not None:
+            await repo.store_liked_ids(user_id, generation, liked_ids)
+    return liked_ids
+
+@router.get("/", response_model=list[schemas.LikedSong], response_class=FastJSONResponse)
+async def get_liked_songs(
     user_id: str = Header(..., description="ID del usuario"),
-    db: Session = Depends(database.get_db)
+    limit: int = Query(100, ge=1, le=500, description="Canciones por página"),
+    cursor: str = Query(None, description="Cursor de la página siguiente"),
+    db: AsyncSession = Depends(database.get_read_db)
 ):
-    """Obtiene todas las canciones favoritas del usuario"""
-    return repo.get_user_liked_songs(db, user_id)
+    """
+    Obtiene las canciones favoritas del usuario. Si quedan más, el cursor de la
+    página siguiente viaja en el header X-Next-Cursor.
+    """
+    result = await db.run_sync(repo.get_user_liked_songs_page, user_id, limit, cursor)
+    return FastJSONResponse(result["songs"], headers=next_cursor_header(result["next_cursor"]))
 
 @router.post("/", response_model=schemas.LikedSong, status_code=201)
-def add_liked_song(
+async def add_liked_song(
     song: schemas.LikedSongCreate,
     user_id: str = Header(..., description="ID del usuario"),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Añade una canción a favoritos"""
-    return repo.add_liked_song(db, user_id, song)
+    liked = await db.run_sync(repo.add_liked_song, user_id, song)
+    await repo.invalidate_liked_ids(user_id)
+    return liked
 
 @router.delete("/{song_id}", status_code=204)
-def remove_liked_song(
+async def remove_liked_song(
     song_id: str,
     user_id: str = Header(..., description="ID del usuario"),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Elimina una canción de favoritos"""
-    success = repo.remove_liked_song(db, user_id, song_id)
+    success = await db.run_sync(repo.remove_liked_song, user_id, song_id)
     if not success:
         raise HTTPException(status_code=404, detail="Canción no encontrada en favoritos")
+    await repo.invalidate_liked_ids(user_id)
     return {}
 
 # Nuevo endpoint para actualizar posiciones de múltiples canciones
 @router.put("/reorder", status_code=200)
-def reorder_songs(
+async def reorder_songs(
     songs: list[schemas.LikedSongPosition],
     user_id: str = Header(..., description="ID del usuario"),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Actualiza las posiciones de múltiples canciones favoritas"""
-    success = repo.reorder_songs(db, user_id, songs)
+    success = await db.run_sync(repo.reorder_songs, user_id, songs)
     if not success:
         raise HTTPException(status_code=404, detail="Error al reordenar canciones")
     return {"message": "Canciones reordenadas correctamente"}
 
 @router.get("/is-liked", response_model=bool)
-def is_song_liked(
+async def is_song_liked(
+    request: Request,
     user_id: str = Header(..., description="ID del usuario"),
-    song_id: str = Header(..., description="ID de la canción"),
-    db: Session = Depends(database.get_db)
+    song_id: str = Header(..., description="ID de la canción")
 ):
     """
     Devuelve True si la canción está en los liked_songs del usuario, False si no.
+    Consultas idénticas concurrentes comparten una sola lectura.
+    """
+    liked_ids = await _liked_ids(request, user_id)
+    if liked_ids is not None:
+        return song_id in liked_ids
+    return await coalesced_read("is_liked", (user_id, song_id), request, repo.is_song_liked_by_user, user_id, song_id)
+
+@router.post("/is-liked/batch", response_model=schemas.LikedSongBatchResult)
+async def are_songs_liked(
+    request: Request,
+    body: schemas.LikedSongBatchCheck,
+    user_id: str = Header(..., description="ID del usuario")
+):
+    """
+    Devuelve, de una lista de canciones, las que están en favoritos del usuario
+    (en el mismo orden en que se enviaron). Reemplaza llamar a /is-liked por fila.
     """
-    return repo.is_song_liked_by_user(db, user_id, song_id)
\ No newline at end of file
+    liked_ids = await _liked_ids(request, user_id)
+    if liked_ids is not None:
+        liked = liked_ids.intersection(body.song_ids)
+    else:
+        # Demasiados favoritos para la caché: consulta directa, solo por los pedidos
+        async with database.read_session_maker(request)() as db:
+            liked = await db.run_sync(repo.get_liked_song_ids, user_id, body.song_ids)
+    return {"liked": [song_id for song_id in dict.fromkeys(body.song_ids) if song_id in liked]}
@@ -0,0 +1,31 @@
+from fastapi import APIRouter
+from app import cache, pool_metrics
+from app.utils import singleflight
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+@router.get("/db-pool")
+async def db_pool_metrics():
+    """
+    Estado de los pools de conexiones de este worker: conexiones en uso, libres,
+    overflow y tiempos de espera del checkout.
+    """
+    return pool_metrics.pool_report()
+
+@router.get("/caches")
+async def cache_metrics():
+    """
+    Aciertos, fallos y tamaño de las cachés de este worker.
+    """
+    return cache.cache_report()
+
+@router.get("/singleflight")
+async def singleflight_metrics():
+    """
+    Lecturas ejecutadas y requests que se sumaron a una lectura en vuelo
+    (colapsadas), por endpoint, en este worker.
+    """
+    return singleflight.singleflight_report()
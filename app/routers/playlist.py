@@ -1,119 +1,198 @@
-from fastapi import APIRouter, Depends, HTTPException, Header, Query, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 from app import schemas, database
 from app.repositories import playlist_repository as repo
 from app.services.cloudinary_service import upload_playlist_cover, delete_playlist_cover
+from app.services.search_service import SORT_RECENT
+from app.utils.etag import etag_matches, not_modified, rows_etag, version_etag
+from app.utils.read_your_writes import playlist_key
+from app.utils.responses import FastJSONResponse, next_cursor_header
+from app.utils.singleflight import coalesced_read
 
 router = APIRouter(prefix="/playlists", tags=["Playlists"])
 
 
 # Crear playlist (recibe user_id en el body)
 @router.post("/", response_model=schemas.Playlist)
-def create_playlist(
+async def create_playlist(
     playlist: schemas.PlaylistCreate,
     user_id: str,  # viene en el request
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    return repo.create_playlist(db, playlist, user_id)
+    created = await db.run_sync(repo.create_playlist, playlist, user_id)
+    # La ruta no trae playlist_id: se marca la nueva para que el GET que sigue
+    # no caiga en una réplica que todavía no la tiene
+    database.recent_writers.mark([playlist_key(created.id)])
+    return created
 
 # Buscar playlists por nombre con paginación
-@router.get("/search")
-def search_playlists(
+@router.get("/search", response_model=schemas.PlaylistSearchPage, response_class=FastJSONResponse)
+async def search_playlists(
+    request: Request,
     search: str = Query(None, description="Buscar por nombre de playlist"),
     page: int = Query(1, ge=1, description="Número de página"),
     limit: int = Query(10, ge=1, le=100, description="Playlists por página"),
     user_id: str = Query(None, description="Filtrar por usuario (opcional)"),
-    db: Session = Depends(database.get_db)
+    cursor: str = Query(None, description="Cursor de la página siguiente (reemplaza a page)"),
+    with_total: bool = Query(True, description="Calcular el total exacto de resultados"),
+    sort: str = Query(SORT_RECENT, pattern="^(recent|relevance)$", description="Orden: recent o relevance")
 ):
-    """Busca playlists por nombre con paginación"""
-    result = repo.search_playlists_paginated(db, search, page, limit, user_id)
+    """
+    Busca playlists por nombre con paginación. Búsquedas idénticas concurrentes
+    comparten una sola lectura.
+    """
+    params = (search, page, limit, user_id, cursor, with_total, sort)
+    result = await coalesced_read("search_playlists", params, request, repo.search_playlists_paginated, *params)
     
-    return {
-        "playlists": [
-            {
-                "id": playlist.id,
-                "name": playlist.name,
-                "cover_url": playlist.cover_url,
-                "owner_id": playlist.owner_id,
-                "is_public": playlist.is_public,
-                "created_at": playlist.created_at
-            }
-            for playlist in result["playlists"]
-        ],
+    return FastJSONResponse({
+        "playlists": result["playlists"],
         "pagination": {
             "page": result["page"],
             "limit": result["limit"],
             "total": result["total"],
-            "total_pages": result["total_pages"]
+            "total_pages": result["total_pages"],
+            "next_cursor": result["next_cursor"]
         }
-    }
+    })
 
 # Listar playlists (opcional filtrar por user_id)
-@router.get("/", response_model=list[schemas.PlaylistWithoutSongs])
-def list_playlists(user_id: str | None = None, db: Session = Depends(database.get_db)):
-    return repo.get_playlists(db, user_id)
+@router.get("/", response_model=list[schemas.PlaylistWithoutSongs], response_class=FastJSONResponse)
+async def list_playlists(
+    user_id: str | None = None,
+    limit: int = Query(50, ge=1, le=100, description="Playlists por página"),
+    cursor: str = Query(None, description="Cursor de la página siguiente"),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(database.get_read_db)
+):
+    """
+    Lista playlists, las más recientes primero. Si quedan más, el cursor de la
+    página siguiente viaja en el header X-Next-Cursor. Responde 304 si la página
+    no cambió desde el ETag enviado en If-None-Match.
+    """
+    result = await db.run_sync(repo.get_playlists_page, user_id, limit, cursor)
+    etag = rows_etag(result["playlists"], result["next_cursor"])
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    headers = {"ETag": etag, **next_cursor_header(result["next_cursor"])}
+    return FastJSONResponse(result["playlists"], headers=headers)
 
 # Obtener detalle de playlist
 @router.get("/{playlist_id}", response_model=schemas.Playlist)
-def get_playlist(playlist_id: UUID, db: Session = Depends(database.get_db)):
-    playlist = repo.get_playlist(db, playlist_id)
+async def get_playlist(
+    playlist_id: UUID,
+    request: Request,
+    response: Response,
+    songs_limit: int = Query(None, ge=1, le=1000, description="Máximo de canciones a devolver"),
+    songs_cursor: str = Query(None, description="Cursor de la siguiente página de canciones"),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(database.get_read_db)
+):
+    """
+    Detalle de la playlist con sus canciones. El detalle completo (sin paginar
+    canciones) se sirve desde la caché, ya serializado. Con If-None-Match se
+    compara solo la versión de la playlist y, si no cambió, se responde 304.
+    """
+    version = None
+    if if_none_match:
+        version = await db.run_sync(repo.get_playlist_version, playlist_id)
+        if version is not None and etag_matches(if_none_match, version_etag(version)):
+            return not_modified(version_etag(version))
+    
+    if songs_limit is None and songs_cursor is None:
+        # Con la versión ya leída, ni la caché ni una lectura en vuelo que
+        # arrancó sin ella devuelven un detalle anterior. Quien acaba de
+        # escribir lee del primario: la caché podría tener su detalle previo
+        detail = None
+        if not database.reads_own_writes(request):
+            detail = await repo.cached_playlist_detail(playlist_id, version)
+        if detail is None:
+            key = (playlist_id, version)
+            detail = await coalesced_read("playlist_detail", key, request, repo.get_playlist_detail_json, playlist_id)
+            if detail is None:
+                raise HTTPException(status_code=404, detail="Playlist no encontrada")
+            await repo.store_playlist_detail(playlist_id, *detail)
+        version, body = detail
+        return Response(content=body, media_type="application/json", headers={"ETag": version_etag(version)})
+    
+    key = (playlist_id, songs_limit, songs_cursor)
+    playlist = await coalesced_read("playlist_detail", key, request, repo.get_playlist, playlist_id, songs_limit, songs_cursor)
     if not playlist:
         raise HTTPException(status_code=404, detail="Playlist no encontrada")
+    response.headers["ETag"] = version_etag(playlist.version)
     return playlist
 
 # Añadir canción
 @router.post("/{playlist_id}/songs", response_model=schemas.PlaylistSong)
-def add_song(playlist_id: UUID, song: schemas.PlaylistSongCreate, db: Session = Depends(database.get_db)):
-    playlist = repo.get_playlist(db, playlist_id)
-    if not playlist:
+async def add_song(playlist_id: UUID, song: schemas.PlaylistSongCreate, db: AsyncSession = Depends(database.get_async_db)):
+    new_song = await db.run_sync(repo.add_song, playlist_id, song)
+    if not new_song:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    await repo.invalidate_playlist_detail(playlist_id, new_song.playlist_version)
+    return new_song
+
+# Añadir varias canciones (álbum completo, "guardar cola como playlist")
+@router.post("/{playlist_id}/songs/batch", response_model=list[schemas.PlaylistSong], status_code=201)
+async def add_songs(playlist_id: UUID, body: schemas.PlaylistSongBatchCreate, db: AsyncSession = Depends(database.get_async_db)):
+    """
+    Agrega hasta 500 canciones en una sola inserción, al final de la playlist o
+    a partir de `position`, y devuelve las filas creadas en orden.
+    """
+    new_songs = await db.run_sync(repo.add_songs, playlist_id, body.song_ids, body.position)
+    if new_songs is None:
         raise HTTPException(status_code=404, detail="Playlist not found")
-    return repo.add_song(db, playlist_id, song)
+    await repo.invalidate_playlist_detail(playlist_id, new_songs[-1].playlist_version)
+    return new_songs
 
 # Eliminar canción
 @router.delete("/{playlist_id}/songs/{song_id}", status_code=204)
-def remove_song(playlist_id: UUID, song_id: str, db: Session = Depends(database.get_db)):
-    success = repo.remove_song(db, playlist_id, song_id)
-    if not success:
+async def remove_song(playlist_id: UUID, song_id: str, db: AsyncSession = Depends(database.get_async_db)):
+    version = await db.run_sync(repo.remove_song, playlist_id, song_id)
+    if not version:
         raise HTTPException(status_code=404, detail="Canción no encontrada en la playlist")
+    await repo.invalidate_playlist_detail(playlist_id, version)
     return {}
 
 @router.delete("/{playlist_id}", status_code=204)
-def delete_playlist(
+async def delete_playlist(
     playlist_id: UUID,
     user_id: str = Header(..., description="ID del usuario"),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Elimina una playlist y todas sus canciones asociadas"""
-    success = repo.delete_playlist(db, playlist_id, user_id)
-    if not success:
+    version = await db.run_sync(repo.delete_playlist, playlist_id, user_id)
+    if not version:
         raise HTTPException(status_code=404, detail="Playlist no encontrada o no tienes permiso para eliminarla")
+    await repo.invalidate_playlist_detail(playlist_id, version)
     return {}
 
 @router.put("/{playlist_id}/songs/reorder", status_code=200)
-def reorder_playlist_songs(
+async def reorder_playlist_songs(
     playlist_id: UUID,
     song_positions: list[schemas.PlaylistSongPositionUpdate],
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Actualiza las posiciones de canciones en una playlist.
     Solo enviar las canciones que cambiaron de posición.
     """
-    success = repo.reorder_playlist_songs(db, playlist_id, song_positions)
-    if not success:
+    version = await db.run_sync(repo.reorder_playlist_songs, playlist_id, song_positions)
+    if not version:
         raise HTTPException(
             status_code=404, 
             detail="Error al reordenar canciones o playlist no encontrada"
         )
+    await repo.invalidate_playlist_detail(playlist_id, version)
     return {"message": "Canciones reordenadas correctamente"}
 
 @router.put("/{playlist_id}/cover")
-def update_playlist_cover(
+async def update_playlist_cover(
     playlist_id: UUID,
     file: UploadFile = File(...),
     user_id: str = Header(..., description="ID del usuario"),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Actualiza el cover de una playlist subiendo una imagen a Cloudinary
@@ -127,14 +206,15 @@ def update_playlist_cover(
         raise HTTPException(status_code=400, detail="La imagen no puede ser mayor a 5MB")
     
     try:
-        # Subir imagen a Cloudinary
-        cover_url = upload_playlist_cover(file, str(playlist_id))
+        # Subir imagen a Cloudinary (cliente bloqueante, fuera del event loop)
+        cover_url = await run_in_threadpool(upload_playlist_cover, file, str(playlist_id))
         
         # Actualizar en base de datos
-        playlist = repo.update_playlist_cover(db, playlist_id, user_id, cover_url)
+        playlist = await db.run_sync(repo.update_playlist_cover, playlist_id, user_id, cover_url)
         
         if not playlist:
             raise HTTPException(status_code=404, detail="Playlist no encontrada o no tienes permiso")
+        await repo.invalidate_playlist_detail(playlist_id, playlist.version)
         
         return {
             "message": "Cover actualizado exitosamente",
@@ -146,23 +226,24 @@ def update_playlist_cover(
         raise HTTPException(status_code=500, detail=f"Error al actualizar cover: {str(e)}")
 
 @router.patch("/{playlist_id}", response_model=schemas.Playlist)
-def update_playlist(
+async def update_playlist(
     playlist_id: UUID,
     playlist_update: schemas.PlaylistUpdate,
     user_id: str = Header(..., description="ID del usuario"),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Actualiza el nombre y/o visibilidad de una playlist.
     Solo el dueño puede actualizar la playlist.
     """
-    playlist = repo.update_playlist(db, playlist_id, user_id, playlist_update)
+    playlist = await db.run_sync(repo.update_playlist, playlist_id, user_id, playlist_update)
     
     if not playlist:
         raise HTTPException(
             status_code=404, 
             detail="Playlist no encontrada o no tienes permiso para modificarla"
         )
+    await repo.invalidate_playlist_detail(playlist_id, playlist.version)
     
     return playlist
 
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, Header, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import schemas, database
+from app.repositories import library_change_repository as repo
+from app.utils.responses import FastJSONResponse
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sync"]
+)
+
+@router.get("/", response_model=schemas.SyncPage, response_class=FastJSONResponse)
+async def sync_library(
+    user_id: str = Header(..., description="ID del usuario"),
+    since: str = Query(None, description="Token devuelto por la sincronización anterior"),
+    limit: int = Query(500, ge=1, le=5000, description="Máximo de cambios a devolver"),
+    db: AsyncSession = Depends(database.get_read_db)
+):
+    """
+    Cambios en favoritos y playlists del usuario desde el token `since`
+    (altas, bajas y movimientos, en orden), con el token para la próxima
+    llamada. Si `has_more` es true, hay que volver a pedir con el nuevo token.
+    Sin token solo se devuelve el token actual: el cliente descarga la
+    biblioteca completa (/export) y desde ahí sincroniza por deltas.
+    """
+    result = await db.run_sync(repo.get_changes, user_id, since, limit)
+    return FastJSONResponse(result)
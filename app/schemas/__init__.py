@@ -1,7 +1,10 @@
-from .playlist import Playlist, PlaylistCreate, PlaylistBase, PlaylistWithoutSongs, PlaylistUpdate
-from .playlist_songs import PlaylistSong, PlaylistSongCreate, PlaylistSongBase, PlaylistSongPositionUpdate
-from .liked_songs import LikedSong, LikedSongCreate, LikedSongBase, LikedSongPosition
-from .history import HistoryEntry, HistoryEntryCreate, HistoryEntryBase
+from .playlist import Playlist, PlaylistCreate, PlaylistBase, PlaylistWithoutSongs, PlaylistUpdate, PlaylistSearchPage
+from .playlist_songs import PlaylistSong, PlaylistSongCreate, PlaylistSongBase, PlaylistSongPositionUpdate, PlaylistSongBatchCreate
+from .liked_songs import LikedSong, LikedSongCreate, LikedSongBase, LikedSongPosition, LikedSongBatchCheck, LikedSongBatchResult
+from .history import HistoryEntry, HistoryEntryCreate, HistoryEntryBase, HistoryPage
+from .pagination import Pagination
+from .library_change import LibraryChange, SyncPage
+from .outbox_event import OutboxEvent, EventFeedPage
 
 __all__ = [
     "Playlist",
@@ -12,12 +15,22 @@ __all__ = [
     "PlaylistSongCreate",
     "PlaylistSongBase",
     "PlaylistSongPositionUpdate",
+    "PlaylistSongBatchCreate",
     "LikedSong",
     "LikedSongCreate",
     "LikedSongBase",
     "LikedSongPosition",
+    "LikedSongBatchCheck",
+    "LikedSongBatchResult",
     "HistoryEntry",
     "HistoryEntryCreate",
     "HistoryEntryBase",
     "PlaylistUpdate",
+    "PlaylistSearchPage",
+    "HistoryPage",
+    "Pagination",
+    "LibraryChange",
+    "SyncPage",
+    "OutboxEvent",
+    "EventFeedPage",
 ]
\ No newline at end of file
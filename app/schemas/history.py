@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 from uuid import UUID
+from .pagination import Pagination
 
 class HistoryEntryBase(BaseModel):
     song_id: str
@@ -17,5 +18,8 @@ class HistoryEntry(HistoryEntryBase):
     position: int
     played_at: datetime
 
-    class Config:   
-        orm_mode = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class HistoryPage(BaseModel):
+    history: list[HistoryEntry]
+    pagination: Pagination
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from uuid import UUID
+
+class LibraryChange(BaseModel):
+    seq: int
+    entity: str
+    action: str
+    playlist_id: UUID | None = None
+    entry_id: UUID | None = None
+    song_id: str | None = None
+    position: int | None = None
+    changed_at: datetime | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class SyncPage(BaseModel):
+    changes: list[LibraryChange]
+    token: str
+    has_more: bool
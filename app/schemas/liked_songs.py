@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from uuid import UUID
 
@@ -14,9 +14,14 @@ class LikedSong(LikedSongBase):
     position: int  # Añadido campo position
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class LikedSongPosition(BaseModel):
     song_id: str
-    position: int
\ No newline at end of file
+    position: int
+
+class LikedSongBatchCheck(BaseModel):
+    song_ids: list[str] = Field(..., min_length=1, max_length=500)
+
+class LikedSongBatchResult(BaseModel):
+    liked: list[str]
\ No newline at end of file
@@ -0,0 +1,16 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+
+class OutboxEvent(BaseModel):
+    id: int
+    seq: int | None = None
+    event_type: str
+    user_id: str
+    payload: dict
+    created_at: datetime | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class EventFeedPage(BaseModel):
+    events: list[OutboxEvent]
+    cursor: str
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+class Pagination(BaseModel):
+    page: int
+    limit: int
+    total: int | None = None
+    total_pages: int | None = None
+    next_cursor: str | None = None
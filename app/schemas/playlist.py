@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 from uuid import UUID
+from .pagination import Pagination
 from .playlist_songs import PlaylistSong
 
 class PlaylistBase(BaseModel):
@@ -19,15 +20,24 @@ class Playlist(PlaylistBase):
     id: UUID
     owner_id: str
     created_at: datetime
+    song_count: int = 0
+    next_position: int = 1
+    version: int = 1
     songs: list[PlaylistSong] = []
+    songs_next_cursor: str | None = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PlaylistWithoutSongs(PlaylistBase):
     id: UUID
     owner_id: str
     created_at: datetime
+    song_count: int = 0
+    next_position: int = 1
+    version: int = 1
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+class PlaylistSearchPage(BaseModel):
+    playlists: list[PlaylistWithoutSongs]
+    pagination: Pagination
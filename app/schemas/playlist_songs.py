@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from uuid import UUID
 
@@ -8,14 +8,18 @@ class PlaylistSongBase(BaseModel):
 class PlaylistSongCreate(PlaylistSongBase):
     pass
 
+class PlaylistSongBatchCreate(BaseModel):
+    song_ids: list[str] = Field(..., min_length=1, max_length=500)
+    # Posición (1-based) de la primera canción; sin valor se agregan al final
+    position: int | None = Field(None, ge=1)
+
 class PlaylistSong(PlaylistSongBase):
     id: UUID
     playlist_id: UUID
     position: int
     added_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PlaylistSongPositionUpdate(BaseModel):
     song_id: str
@@ -0,0 +1,124 @@
+"""
+Publicación de los eventos del outbox. Un relay toma en tandas los eventos
+pendientes, los marca publicados (con su orden en el feed), los entrega al
+dispatcher configurado y recién entonces confirma: la entrega es
+al-menos-una-vez (si el commit falla después de publicar, la tanda se vuelve a
+publicar). El dispatcher es intercambiable; el de por defecto es un stand-in
+en memoria.
+"""
+import asyncio
+import importlib
+import inspect
+import os
+from collections import deque
+from typing import Protocol
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import database
+from app.logger import log
+from app.repositories import outbox_repository
+
+# Segundos entre pasadas del relay (0 lo desactiva) y eventos por tanda
+OUTBOX_RELAY_INTERVAL = float(os.getenv("OUTBOX_RELAY_INTERVAL", 1))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 500))
+
+class EventDispatcher(Protocol):
+    async def publish(self, events: list[dict]) -> None:
+        """
+        Entrega una tanda de eventos; si falla debe lanzar una excepción. Un
+        publish síncrono (cliente bloqueante) también sirve: se corre en un
+        thread para no frenar el event loop.
+        """
+
+class InMemoryDispatcher:
+    """Stand-in local: guarda los últimos eventos publicados en memoria"""
+
+    def __init__(self, max_events: int = 10_000):
+        self.events = deque(maxlen=max_events)
+        self.published = 0
+
+    async def publish(self, events: list[dict]) -> None:
+        self.events.extend(events)
+        self.published += len(events)
+
+def build_dispatcher() -> EventDispatcher:
+    """
+    OUTBOX_DISPATCHER=memory (por defecto) o "modulo:fabrica" para enchufar otro
+    transporte (Kafka, SNS, Redis Streams...) sin tocar el relay.
+    """
+    target = os.getenv("OUTBOX_DISPATCHER", "memory")
+    if target == "memory":
+        return InMemoryDispatcher()
+    module_name, _, factory = target.partition(":")
+    return getattr(importlib.import_module(module_name), factory)()
+
+dispatcher: EventDispatcher = build_dispatcher()
+
+class EventSignal:
+    """Despierta a los long-polls del feed cuando el relay publica eventos"""
+
+    def __init__(self):
+        self._waiters: set[asyncio.Future] = set()
+
+    async def wait(self, timeout: float):
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.add(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters.discard(future)
+
+    def notify(self):
+        for future in self._waiters:
+            if not future.done():
+                future.set_result(None)
+
+new_events = EventSignal()
+
+async def publish(target: EventDispatcher, events: list[dict]):
+    if inspect.iscoroutinefunction(target.publish):
+        await target.publish(events)
+    else:
+        await asyncio.to_thread(target.publish, events)
+
+async def dispatch_pending(db: AsyncSession, batch_size: int = OUTBOX_BATCH_SIZE,
+                           target: EventDispatcher | None = None) -> int:
+    """Publica una tanda de eventos pendientes y devuelve cuántos publicó"""
+    events = await db.run_sync(outbox_repository.claim_pending, batch_size)
+    if not events:
+        await db.rollback()
+        return 0
+    
+    # La entrega corre fuera de run_sync: no ocupa el event loop mientras espera
+    await publish(target or dispatcher, events)
+    await db.commit()
+    return len(events)
+
+async def relay_loop(interval: float = OUTBOX_RELAY_INTERVAL, batch_size: int = OUTBOX_BATCH_SIZE):
+    """Publica pendientes en tandas; si la tanda vino llena, sigue sin esperar"""
+    while True:
+        published = 0
+        try:
+            async with database.AsyncSessionLocal() as db:
+                published = await dispatch_pending(db, batch_size)
+            if published:
+                new_events.notify()
+        except Exception as e:
+            log.error(f"Error al publicar eventos del outbox: {e}")
+        if published < batch_size:
+            await asyncio.sleep(interval)
+
+def start_relay() -> asyncio.Task | None:
+    if OUTBOX_RELAY_INTERVAL <= 0:
+        return None
+    return asyncio.create_task(relay_loop())
+
+async def stop_relay(task: asyncio.Task | None):
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
@@ -0,0 +1,33 @@
+"""
+Búsqueda por texto sobre nombres de playlists y canciones del historial.
+
+En Postgres los filtros ILIKE '%término%' se resuelven con los índices GIN de
+pg_trgm y la relevancia se calcula con similarity(). En otros motores (SQLite
+en los tests) se usa un ILIKE común y una relevancia aproximada.
+"""
+from sqlalchemy import case, func, literal
+from sqlalchemy.orm import Session
+from app.utils.dialect import is_postgres
+
+SORT_RECENT = "recent"
+SORT_RELEVANCE = "relevance"
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def text_filter(column, term: str):
+    """Coincidencia parcial sin distinguir mayúsculas"""
+    return column.ilike(f"%{_escape_like(term)}%", escape="\\")
+
+def relevance(db: Session, column, term: str):
+    """Expresión de relevancia: mayor es mejor"""
+    if is_postgres(db):
+        return func.similarity(column, term)
+
+    # Aproximación portable: exacta > prefijo > contiene
+    escaped = _escape_like(term)
+    return case(
+        (func.lower(column) == func.lower(literal(term)), 3),
+        (column.ilike(f"{escaped}%", escape="\\"), 2),
+        else_=1,
+    )
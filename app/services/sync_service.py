@@ -0,0 +1,40 @@
+"""
+Secuenciador del registro de cambios: asigna en segundo plano el orden de
+sincronización (sync_seq) a los cambios ya confirmados. Hasta que lo tienen,
+los cambios no aparecen en /sync.
+"""
+import asyncio
+import os
+from app import database
+from app.logger import log
+from app.repositories import library_change_repository
+
+# Segundos entre pasadas del secuenciador (0 lo desactiva) y cambios por tanda
+SYNC_SEQUENCER_INTERVAL = float(os.getenv("SYNC_SEQUENCER_INTERVAL", 1))
+SYNC_SEQUENCER_BATCH_SIZE = int(os.getenv("SYNC_SEQUENCER_BATCH_SIZE", 1000))
+
+async def sequencer_loop(interval: float = SYNC_SEQUENCER_INTERVAL, batch_size: int = SYNC_SEQUENCER_BATCH_SIZE):
+    """Ordena pendientes en tandas; si la tanda vino llena, sigue sin esperar"""
+    while True:
+        sequenced = 0
+        try:
+            async with database.AsyncSessionLocal() as db:
+                sequenced = await db.run_sync(library_change_repository.sequence_changes, batch_size)
+        except Exception as e:
+            log.error(f"Error al ordenar el registro de cambios: {e}")
+        if sequenced < batch_size:
+            await asyncio.sleep(interval)
+
+def start_sequencer() -> asyncio.Task | None:
+    if SYNC_SEQUENCER_INTERVAL <= 0:
+        return None
+    return asyncio.create_task(sequencer_loop())
+
+async def stop_sequencer(task: asyncio.Task | None):
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
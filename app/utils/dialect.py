@@ -0,0 +1,18 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+def dialect_name(db: Session) -> str:
+    """Motor de la sesión: "postgresql" en producción, "sqlite" en los tests"""
+    return db.get_bind().dialect.name
+
+def is_postgres(db: Session) -> bool:
+    return dialect_name(db) == "postgresql"
+
+def insert(db: Session, entity):
+    """
+    INSERT del dialecto de la sesión, con soporte de ON CONFLICT
+    (Postgres en producción, SQLite en los tests)
+    """
+    if is_postgres(db):
+        return postgresql.insert(entity)
+    return sqlite.insert(entity)
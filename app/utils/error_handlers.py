@@ -2,6 +2,7 @@ from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from app.logger import log
+from app.utils.pagination import InvalidCursorError
 
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Handle HTTP exceptions and return JSON response"""
@@ -26,4 +27,16 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
             "details": exc.errors(),
             "status_code": 422
         }
+    )
+
+async def invalid_cursor_exception_handler(request: Request, exc: InvalidCursorError):
+    """Handle malformed pagination cursors as a client error"""
+    log.error(f"Invalid cursor: {exc}")
+    return JSONResponse(
+        status_code=400,
+        content={
+            "error": True,
+            "message": str(exc),
+            "status_code": 400
+        }
     )
\ No newline at end of file
@@ -0,0 +1,29 @@
+import hashlib
+from fastapi import Response
+
+def version_etag(version: int) -> str:
+    """ETag del detalle de una playlist: su versión"""
+    return f'"{version}"'
+
+def rows_etag(rows: list[dict], *extra) -> str:
+    """
+    ETag de un listado de filas con id y version: cambia si se agrega, quita o
+    modifica alguna fila (o cambia algún valor de `extra`, como el cursor).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for row in rows:
+        digest.update(f"{row['id']}:{row['version']};".encode())
+    for value in extra:
+        digest.update(f"|{value}".encode())
+    return f'"{digest.hexdigest()}"'
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Comparación débil de If-None-Match: acepta listas de ETags, W/ y *"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,96 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from sqlalchemy import DateTime, func, literal, select, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+class InvalidCursorError(ValueError):
+    """El cursor recibido no es un token de paginación válido"""
+
+def encode_cursor(values: dict) -> str:
+    """Serializa el estado de la página como un token opaco y seguro para URLs"""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursorError("Cursor de paginación inválido")
+
+    if not isinstance(values, dict) or "id" not in values:
+        raise InvalidCursorError("Cursor de paginación inválido")
+    try:
+        values["id"] = uuid.UUID(str(values["id"]))
+    except ValueError:
+        raise InvalidCursorError("Cursor de paginación inválido")
+    # La posición solo continúa la numeración: debe ser un entero no negativo
+    position = values.get("position", 0)
+    if type(position) is not int or position < 0:
+        raise InvalidCursorError("Cursor de paginación inválido")
+    return values
+
+class comparable_key(FunctionElement):
+    """
+    Clave de orden comparable contra un valor del cursor. En Postgres es la
+    columna tal cual (usa su índice); SQLite guarda las fechas como texto con
+    formatos distintos (CURRENT_TIMESTAMP no lleva microsegundos), así que ahí
+    se comparan como julianday.
+    """
+    inherit_cache = True
+    name = "comparable_key"
+
+    def __init__(self, expression):
+        super().__init__(expression)
+        self.type = expression.type
+
+@compiles(comparable_key)
+def _compile_comparable_key(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+@compiles(comparable_key, "sqlite")
+def _compile_comparable_key_sqlite(element, compiler, **kw):
+    if isinstance(element.type, DateTime):
+        return "julianday(%s)" % compiler.process(element.clauses, **kw)
+    return compiler.process(element.clauses, **kw)
+
+def cursor_key(sort_column, values: dict):
+    """Valor de orden guardado en el cursor, convertido al tipo de la columna"""
+    if "key" not in values:
+        raise InvalidCursorError("Cursor de paginación inválido")
+    try:
+        if sort_column.type.python_type is datetime:
+            return datetime.fromisoformat(values["key"])
+        return sort_column.type.python_type(values["key"])
+    except (TypeError, ValueError):
+        raise InvalidCursorError("Cursor de paginación inválido")
+
+def seek_after(query, model, sort_column, values: dict, descending: bool = True, renumbered: bool = False):
+    """
+    Keyset pagination: filtra las filas que van después de la última entregada
+    en el orden (sort_column, id). El cursor trae esa clave y ese id, así la
+    página siguiente no depende de que la fila ancla siga existiendo.
+
+    Con `renumbered` (posiciones densas únicas que se corren al borrar) se usa
+    la posición actual de la fila ancla si sigue en la base; si se borró, las
+    siguientes bajaron un lugar y se sigue desde la posición anterior a la suya.
+    """
+    last_key = cursor_key(sort_column, values)
+    if renumbered:
+        anchor = select(sort_column).where(model.id == values["id"]).scalar_subquery()
+        return query.filter(sort_column > func.coalesce(anchor, last_key - 1))
+
+    key = comparable_key(sort_column)
+    last = comparable_key(literal(last_key, sort_column.type))
+    last_id = literal(values["id"], model.id.type)
+    if descending:
+        return query.filter(tuple_(key, model.id) < tuple_(last, last_id))
+    return query.filter(tuple_(key, model.id) > tuple_(last, last_id))
+
+def split_page(rows: list, limit: int):
+    """Recibe hasta limit + 1 filas y devuelve (página, hay_más)"""
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,14 @@
+def assign_positions(rows, start: int = 1):
+    """
+    Asigna la posición densa (1-based) a filas que ya vienen ordenadas.
+    La posición no se guarda en la base: se deriva del orden al leer.
+    """
+    for offset, row in enumerate(rows):
+        row.position = start + offset
+    return rows
+
+def number_rows(rows: list[dict], start: int = 1):
+    """Igual que assign_positions, para filas proyectadas como dicts"""
+    for offset, row in enumerate(rows):
+        row["position"] = start + offset
+    return rows
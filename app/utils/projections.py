@@ -0,0 +1,13 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+def fetch_rows(db: Session, stmt) -> list[dict]:
+    """
+    Ejecuta un select() de columnas y devuelve dicts planos: sin instancias ORM
+    ni identity map, listos para validar contra el schema de respuesta.
+    """
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+def count_rows(db: Session, stmt) -> int:
+    """Total de filas que devuelve un select() (se ignoran su orden y límite)"""
+    return db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
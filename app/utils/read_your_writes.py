@@ -0,0 +1,102 @@
+import math
+import threading
+import time
+from fastapi import Request
+
+# Métodos que no modifican datos
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Cookie con la que el cliente lleva su ventana de lectura-de-lo-escrito a
+# cualquier worker: hora (epoch) hasta la que sus lecturas van al primario
+PRIMARY_UNTIL_COOKIE = "read_primary_until"
+
+def playlist_key(playlist_id) -> str:
+    return f"playlist:{playlist_id}"
+
+def consistency_keys(request: Request) -> list[str]:
+    """
+    Claves que identifican los datos que toca una request: el usuario (header
+    user-id o query user_id) y la playlist de la ruta, si hay.
+    """
+    keys = []
+    user_id = request.headers.get("user-id") or request.query_params.get("user_id")
+    if user_id:
+        keys.append(f"user:{user_id}")
+    playlist_id = request.path_params.get("playlist_id")
+    if playlist_id:
+        keys.append(playlist_key(playlist_id))
+    return keys
+
+class RecentWriters:
+    """
+    Recuerda durante `window` segundos qué claves se modificaron en este worker,
+    para que sus lecturas vayan al primario y no a una réplica con lag.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._lock = threading.Lock()
+        self._until: dict[str, float] = {}
+
+    def mark(self, keys: list[str]):
+        if not keys:
+            return
+        until = time.monotonic() + self.window
+        with self._lock:
+            for key in keys:
+                self._until[key] = until
+
+    def is_recent(self, keys: list[str]) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            recent = any(self._until.get(key, 0) > now for key in keys)
+            # Limpieza perezosa para que el diccionario no crezca sin límite
+            if len(self._until) > 10_000:
+                self._until = {key: until for key, until in self._until.items() if until > now}
+        return recent
+
+def client_wrote_recently(request: Request, window: float) -> bool:
+    """
+    True si la request trae la cookie de una escritura reciente. Se ignoran los
+    valores más allá de la ventana, así una cookie adulterada no fija al
+    cliente en el primario.
+    """
+    try:
+        until = float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0))
+    except ValueError:
+        return False
+    now = time.time()
+    return now < until <= now + window
+
+class ReadYourWritesMiddleware:
+    """
+    Middleware ASGI: si la request escribió en el primario (`request.state.wrote`,
+    lo marca get_async_db) y terminó bien, la respuesta lleva la cookie
+    PRIMARY_UNTIL_COOKIE. La marca de RecentWriters vive en un solo worker;
+    la cookie acompaña al cliente aunque su próxima lectura la atienda otro.
+    """
+
+    def __init__(self, app, window: float):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or self.window <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if (
+                message["type"] == "http.response.start"
+                and message["status"] < 400
+                and scope.get("state", {}).get("wrote")
+            ):
+                # Se cuenta desde la respuesta: la escritura ya se confirmó
+                cookie = (
+                    f"{PRIMARY_UNTIL_COOKIE}={time.time() + self.window:.3f}; "
+                    f"Max-Age={math.ceil(self.window)}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,18 @@
+import orjson
+from fastapi.responses import JSONResponse
+
+class FastJSONResponse(JSONResponse):
+    """
+    Respuesta JSON codificada con orjson directo a bytes, sin pasar por
+    response_model. Es opt-in: la usan los listados que ya salen de la base
+    como filas planas (dicts con UUID, datetime, ...), así cada fila se serializa
+    una sola vez y sin una segunda validación. El formato es el mismo que el
+    de FastAPI (fechas ISO 8601 con "Z" en UTC, UUID como texto).
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+def next_cursor_header(next_cursor: str | None) -> dict:
+    """Header X-Next-Cursor de los listados, solo si queda otra página"""
+    return {"X-Next-Cursor": next_cursor} if next_cursor else {}
@@ -0,0 +1,69 @@
+"""
+Single-flight: lecturas idénticas concurrentes (misma clave) esperan una única
+consulta en vuelo y comparten su resultado, en lugar de abrir cada una su
+sesión y repetir las mismas consultas. Es por worker (por event loop).
+"""
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from app import database
+
+class SingleFlight:
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self.executed = 0
+        self.collapsed = 0
+
+    async def do(self, key: Hashable, fetch: Callable[[], Awaitable]):
+        """
+        Ejecuta `fetch()` salvo que ya haya una ejecución en vuelo para `key`;
+        en ese caso espera esa. La consulta corre en su propia tarea: si la
+        request que la inició se cancela, las demás igual reciben el resultado.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.executed += 1
+        else:
+            self.collapsed += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Evita el aviso de excepción no leída si nadie quedó esperando
+            task.exception()
+
+    def stats(self) -> dict:
+        return {"executed": self.executed, "collapsed": self.collapsed, "in_flight": len(self._in_flight)}
+
+# Grupos de single-flight por nombre (métricas)
+REGISTRY: dict[str, SingleFlight] = {}
+
+def flight(name: str) -> SingleFlight:
+    if name not in REGISTRY:
+        REGISTRY[name] = SingleFlight()
+    return REGISTRY[name]
+
+def singleflight_report() -> dict:
+    return {name: group.stats() for name, group in REGISTRY.items()}
+
+async def coalesced_read(name: str, key: Hashable, request, fn, *args, primary: bool = False):
+    """
+    Ejecuta `fn(db, *args)` (un repositorio síncrono) en una sesión de lectura
+    propia, compartida por las requests concurrentes con la misma `key`. Las
+    lecturas de algo escrito hace poco no se agrupan: van al primario y no
+    deben recibir un resultado que arrancó antes de escribir. Con `primary`
+    se lee siempre del primario (p. ej. para recargar una caché compartida).
+    """
+    session_maker = database.AsyncSessionLocal if primary else database.read_session_maker(request)
+
+    async def fetch():
+        async with session_maker() as db:
+            return await db.run_sync(fn, *args)
+
+    if database.reads_own_writes(request):
+        return await fetch()
+    return await flight(name).do(key, fetch)
@@ -0,0 +1,55 @@
+"""
+Serialización de una página de 100 filas: camino de response_model (validar
+contra el schema y luego codificar) contra FastJSONResponse (orjson directo
+sobre las filas proyectadas).
+
+    python -m benchmarks.serialization
+"""
+import json
+import timeit
+import uuid
+from datetime import datetime, timezone
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app import schemas
+from app.utils.responses import FastJSONResponse
+
+ROWS = 100
+ROUNDS = 2000
+
+def history_rows(count: int = ROWS) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "user_id": "user-1",
+            "song_id": f"song-{index}",
+            "song_name": f"Canción {index}",
+            "artist_name": "Artista",
+            "minutos": "3:45",
+            "played_at": now,
+            "position": index,
+        }
+        for index in range(1, count + 1)
+    ]
+
+def main():
+    rows = history_rows()
+    adapter = TypeAdapter(list[schemas.HistoryEntry])
+    response = FastJSONResponse(None)
+
+    paths = {
+        # Dicts armados a mano sin response_model (como estaba /history/)
+        "jsonable_encoder + json.dumps": lambda: json.dumps(jsonable_encoder(rows)).encode(),
+        # response_model: validación + serialización de pydantic
+        "response_model (validate + dump_json)": lambda: adapter.dump_json(adapter.validate_python(rows)),
+        "FastJSONResponse (orjson)": lambda: response.render(rows),
+    }
+    baseline = None
+    for name, render in paths.items():
+        seconds = min(timeit.repeat(render, number=ROUNDS, repeat=3)) / ROUNDS
+        baseline = baseline or seconds
+        print(f"{name:40s} {seconds * 1e6:9.1f} µs/página  x{baseline / seconds:5.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+from alembic import context
+from app import database
+from app import models  # noqa: F401  (registra las tablas en Base.metadata)
+from app.migrate import include_object
+
+target_metadata = database.Base.metadata
+
+def run_migrations_offline():
+    """Genera el SQL de las migraciones sin conectarse (alembic upgrade --sql)"""
+    context.configure(
+        url=database.DATABASE_URL,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    # Los tests pasan su propia conexión; en el resto de los casos se usa el engine de la app
+    connection = context.config.attributes.get("connection")
+    if connection is not None:
+        _run_with_connection(connection)
+        return
+
+    with database.engine.connect() as connection:
+        _run_with_connection(connection)
+
+def _run_with_connection(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
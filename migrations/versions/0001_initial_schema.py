@@ -0,0 +1,76 @@
+"""Esquema inicial: playlists, canciones, favoritos e historial
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "playlists",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("cover_url", sa.String(), nullable=True),
+        sa.Column("owner_id", sa.String(), nullable=False),
+        sa.Column("is_public", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id"),
+    )
+    op.create_index("ix_playlists_owner_id", "playlists", ["owner_id"])
+
+    op.create_table(
+        "playlist_songs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("playlist_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("song_id", sa.String(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("added_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["playlist_id"], ["playlists.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    op.create_table(
+        "liked_songs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("song_id", sa.String(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_liked_songs_user_id", "liked_songs", ["user_id"])
+
+    op.create_table(
+        "history",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("song_id", sa.String(), nullable=False),
+        sa.Column("song_name", sa.String(), nullable=True),
+        sa.Column("artist_name", sa.String(), nullable=True),
+        sa.Column("minutos", sa.String(), nullable=True),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("played_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_history_user_id", "history", ["user_id"])
+
+
+def downgrade():
+    op.drop_index("ix_history_user_id", table_name="history")
+    op.drop_table("history")
+    op.drop_index("ix_liked_songs_user_id", table_name="liked_songs")
+    op.drop_table("liked_songs")
+    op.drop_table("playlist_songs")
+    op.drop_index("ix_playlists_owner_id", table_name="playlists")
+    op.drop_table("playlists")
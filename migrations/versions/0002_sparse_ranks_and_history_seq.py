@@ -0,0 +1,73 @@
+"""Claves de orden dispersas en playlist_songs y secuencia en history
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+RANK_GAP = 1024
+
+
+def upgrade():
+    op.add_column("playlist_songs", sa.Column("rank", sa.BigInteger(), nullable=True))
+    op.execute(f"UPDATE playlist_songs SET rank = position * {RANK_GAP}")
+    with op.batch_alter_table("playlist_songs") as batch:
+        batch.alter_column("rank", existing_type=sa.BigInteger(), nullable=False)
+        batch.drop_column("position")
+
+    # Las entradas existentes quedan por debajo de cualquier secuencia nueva
+    # (basada en el reloj) y conservan su orden: position 1 era la más reciente.
+    op.add_column("history", sa.Column("seq", sa.BigInteger(), nullable=True))
+    op.execute(
+        """
+        UPDATE history SET seq = ranked.seq
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY user_id ORDER BY position DESC) AS seq
+            FROM history
+        ) AS ranked
+        WHERE history.id = ranked.id
+        """
+    )
+    with op.batch_alter_table("history") as batch:
+        batch.alter_column("seq", existing_type=sa.BigInteger(), nullable=False)
+        batch.drop_column("position")
+
+
+def downgrade():
+    op.add_column("history", sa.Column("position", sa.Integer(), nullable=True))
+    op.execute(
+        """
+        UPDATE history SET position = ranked.position
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY user_id ORDER BY seq DESC) AS position
+            FROM history
+        ) AS ranked
+        WHERE history.id = ranked.id
+        """
+    )
+    with op.batch_alter_table("history") as batch:
+        batch.alter_column("position", existing_type=sa.Integer(), nullable=False)
+        batch.drop_column("seq")
+
+    op.add_column("playlist_songs", sa.Column("position", sa.Integer(), nullable=True))
+    op.execute(
+        """
+        UPDATE playlist_songs SET position = ranked.position
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY playlist_id ORDER BY rank) AS position
+            FROM playlist_songs
+        ) AS ranked
+        WHERE playlist_songs.id = ranked.id
+        """
+    )
+    with op.batch_alter_table("playlist_songs") as batch:
+        batch.alter_column("position", existing_type=sa.Integer(), nullable=False)
+        batch.drop_column("rank")
@@ -0,0 +1,82 @@
+"""Índices compuestos para consultas ordenadas y de pertenencia
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, columnas, único)
+INDEXES = [
+    ("ix_playlists_owner_id_created_at", "playlists", ["owner_id", "created_at"], False),
+    ("ix_playlists_created_at", "playlists", ["created_at"], False),
+    ("ix_playlist_songs_playlist_id_rank", "playlist_songs", ["playlist_id", "rank"], False),
+    ("ix_playlist_songs_playlist_id_song_id", "playlist_songs", ["playlist_id", "song_id"], False),
+    ("uq_liked_songs_user_id_song_id", "liked_songs", ["user_id", "song_id"], True),
+    ("ix_liked_songs_user_id_position", "liked_songs", ["user_id", "position"], False),
+    ("ix_history_user_id_seq", "history", ["user_id", "seq"], False),
+    ("ix_history_user_id_song_id", "history", ["user_id", "song_id"], False),
+]
+
+# Índices de una sola columna cubiertos por los compuestos
+OBSOLETE_INDEXES = [
+    ("ix_playlists_owner_id", "playlists", ["owner_id"]),
+    ("ix_liked_songs_user_id", "liked_songs", ["user_id"]),
+    ("ix_history_user_id", "history", ["user_id"]),
+]
+
+
+def upgrade():
+    is_postgres = op.get_bind().dialect.name == "postgresql"
+
+    # CREATE INDEX CONCURRENTLY no bloquea escrituras pero no puede correr en una transacción
+    with op.get_context().autocommit_block():
+        if is_postgres:
+            # El índice único falla si ya hay likes duplicados por carreras
+            op.execute(
+                """
+                DELETE FROM liked_songs a
+                USING liked_songs b
+                WHERE a.user_id = b.user_id
+                  AND a.song_id = b.song_id
+                  AND a.ctid > b.ctid
+                """
+            )
+            # Un CONCURRENTLY interrumpido deja el índice inválido: se reconstruye
+            for name, _, _, _ in INDEXES:
+                op.execute(
+                    f"""
+                    DO $$ BEGIN
+                        IF EXISTS (
+                            SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                            WHERE c.relname = '{name}' AND NOT i.indisvalid
+                        ) THEN
+                            EXECUTE 'DROP INDEX {name}';
+                        END IF;
+                    END $$
+                    """
+                )
+
+        for name, table, columns, unique in INDEXES:
+            op.create_index(
+                name, table, columns, unique=unique,
+                if_not_exists=True, postgresql_concurrently=True,
+            )
+
+        for name, table, _ in OBSOLETE_INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in OBSOLETE_INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
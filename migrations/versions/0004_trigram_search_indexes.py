@@ -0,0 +1,42 @@
+"""Índices de trigramas (pg_trgm) para la búsqueda por texto
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, columna)
+INDEXES = [
+    ("ix_playlists_name_trgm", "playlists", "name"),
+    ("ix_history_song_name_trgm", "history", "song_name"),
+    ("ix_history_artist_name_trgm", "history", "artist_name"),
+]
+
+
+def upgrade():
+    is_postgres = op.get_bind().dialect.name == "postgresql"
+    if is_postgres:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.create_index(
+                name, table, [column],
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
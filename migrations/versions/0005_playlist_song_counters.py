@@ -0,0 +1,32 @@
+"""Contadores song_count y last_rank en playlists
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("playlists", sa.Column("song_count", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("playlists", sa.Column("last_rank", sa.BigInteger(), nullable=False, server_default="0"))
+    op.execute(
+        """
+        UPDATE playlists SET
+            song_count = (SELECT count(*) FROM playlist_songs WHERE playlist_songs.playlist_id = playlists.id),
+            last_rank = COALESCE((SELECT max(rank) FROM playlist_songs WHERE playlist_songs.playlist_id = playlists.id), 0)
+        """
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("playlists") as batch:
+        batch.drop_column("last_rank")
+        batch.drop_column("song_count")
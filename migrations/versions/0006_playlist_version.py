@@ -0,0 +1,23 @@
+"""Columna version en playlists (ETag del detalle)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("playlists", sa.Column("version", sa.BigInteger(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    with op.batch_alter_table("playlists") as batch:
+        batch.drop_column("version")
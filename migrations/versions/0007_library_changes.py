@@ -0,0 +1,37 @@
+"""Tabla library_changes (registro de cambios para sincronización delta)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "library_changes",
+        sa.Column("seq", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("entity", sa.String(), nullable=False),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("playlist_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("entry_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("song_id", sa.String(), nullable=True),
+        sa.Column("position", sa.Integer(), nullable=True),
+        sa.Column("changed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("seq"),
+    )
+    op.create_index("ix_library_changes_user_id_seq", "library_changes", ["user_id", "seq"])
+
+
+def downgrade():
+    op.drop_index("ix_library_changes_user_id_seq", table_name="library_changes")
+    op.drop_table("library_changes")
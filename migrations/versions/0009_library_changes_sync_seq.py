@@ -0,0 +1,36 @@
+"""Columna sync_seq en library_changes (orden asignado tras el commit)
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("library_changes", sa.Column("sync_seq", sa.BigInteger(), nullable=True))
+    # Las filas existentes ya están confirmadas: conservan su orden de inserción
+    op.execute("UPDATE library_changes SET sync_seq = seq")
+    op.drop_index("ix_library_changes_user_id_seq", table_name="library_changes")
+    op.create_index("ix_library_changes_user_id_sync_seq", "library_changes", ["user_id", "sync_seq"])
+    op.create_index("ix_library_changes_sync_seq", "library_changes", ["sync_seq"], unique=True)
+    op.create_index(
+        "ix_library_changes_unsequenced", "library_changes", ["seq"],
+        postgresql_where=sa.text("sync_seq IS NULL"), sqlite_where=sa.text("sync_seq IS NULL"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_library_changes_unsequenced", table_name="library_changes")
+    op.drop_index("ix_library_changes_sync_seq", table_name="library_changes")
+    op.drop_index("ix_library_changes_user_id_sync_seq", table_name="library_changes")
+    op.create_index("ix_library_changes_user_id_seq", "library_changes", ["user_id", "seq"])
+    with op.batch_alter_table("library_changes") as batch:
+        batch.drop_column("sync_seq")
@@ -0,0 +1,27 @@
+"""Columna feed_seq en outbox_events (orden asignado al publicar)
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("outbox_events", sa.Column("feed_seq", sa.BigInteger(), nullable=True))
+    # Los ya publicados conservan su orden de inserción
+    op.execute("UPDATE outbox_events SET feed_seq = id WHERE published_at IS NOT NULL")
+    op.create_index("ix_outbox_events_feed_seq", "outbox_events", ["feed_seq"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_outbox_events_feed_seq", table_name="outbox_events")
+    with op.batch_alter_table("outbox_events") as batch:
+        batch.drop_column("feed_seq")
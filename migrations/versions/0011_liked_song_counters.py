@@ -0,0 +1,51 @@
+"""Contador de favoritos por usuario y posiciones únicas en liked_songs
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "liked_song_counters",
+        sa.Column("user_id", sa.String(), primary_key=True),
+        sa.Column("song_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    # Los likes concurrentes con max(position) + 1 pudieron repetir posiciones:
+    # se renumeran densas antes de contar y de exigir unicidad
+    op.execute(
+        """
+        UPDATE liked_songs SET position = ranked.position
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY user_id ORDER BY position, created_at, id) AS position
+            FROM liked_songs
+        ) AS ranked
+        WHERE liked_songs.id = ranked.id AND liked_songs.position <> ranked.position
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO liked_song_counters (user_id, song_count)
+        SELECT user_id, count(*) FROM liked_songs GROUP BY user_id
+        """
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_unique_constraint(
+            "uq_liked_songs_user_id_position", "liked_songs", ["user_id", "position"],
+            deferrable=True, initially="DEFERRED",
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_constraint("uq_liked_songs_user_id_position", "liked_songs", type_="unique")
+    op.drop_table("liked_song_counters")
@@ -0,0 +1,30 @@
+"""Secuencia de la base para history.seq (reemplaza al reloj de cada proceso)
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # En SQLite el siguiente valor sale de max(seq) + 1 en el mismo INSERT
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE SEQUENCE history_seq OWNED BY history.seq")
+    # Arranca por encima de los valores ya asignados con el reloj
+    op.execute("SELECT setval('history_seq', (SELECT coalesce(max(seq), 0) + 1 FROM history), false)")
+    op.execute("ALTER TABLE history ALTER COLUMN seq SET DEFAULT nextval('history_seq')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("ALTER TABLE history ALTER COLUMN seq DROP DEFAULT")
+    op.execute("DROP SEQUENCE history_seq")
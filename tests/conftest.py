@@ -1,20 +1,34 @@
+import asyncio
+import os
 import pytest
 import sys
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, patch
 
 # 1. Configurar SQLite en Memoria PRIMERO
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# La base en memoria es compartida (cache=shared) para que el engine síncrono de
+# los tests de repositorio y el asíncrono de los routers vean las mismas tablas.
+SQLALCHEMY_DATABASE_URL = "sqlite:///file:melodia_test?mode=memory&cache=shared&uri=true"
+SQLALCHEMY_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///file:melodia_test?mode=memory&cache=shared&uri=true"
 
 test_engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=test_engine)
+
+# NullPool: TestClient corre su propio event loop, no se reutilizan conexiones entre loops.
+# La conexión de test_engine mantiene viva la base en memoria.
+test_async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(
+    test_async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 
 # ==========================================
 # 2. LA LOBOTOMÍA (Monkeypatching)
@@ -26,6 +40,8 @@ from app import database
 # ANTES de que app.main sea importado.
 database.engine = test_engine
 database.SessionLocal = TestingSessionLocal
+database.async_engine = test_async_engine
+database.AsyncSessionLocal = TestingAsyncSessionLocal
 
 # Mockeamos Cloudinary antes de importar servicios
 mock_cloudinary_module = MagicMock()
@@ -33,10 +49,23 @@ mock_cloudinary_module.uploader.upload.return_value = {"secure_url": "http://fak
 sys.modules["cloudinary"] = mock_cloudinary_module
 sys.modules["cloudinary.uploader"] = mock_cloudinary_module.uploader
 
+# Sin relay del outbox ni secuenciador de /sync en segundo plano: los tests los
+# invocan a mano y así no suman sentencias a las que miden
+os.environ["OUTBOX_RELAY_INTERVAL"] = "0"
+os.environ["SYNC_SEQUENCER_INTERVAL"] = "0"
+
 # AHORA SÍ importamos tu app.main
-# Como database.engine ya es SQLite, create_all(bind=engine) funcionará.
+# La app no ejecuta DDL al importar: las tablas las crea el fixture db_session.
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base
+from app import cache
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Las cachés en proceso no deben arrastrar datos entre tests"""
+    asyncio.run(cache.clear_all())
+    yield
+    asyncio.run(cache.clear_all())
 
 @pytest.fixture(scope="function")
 def db_session():
@@ -51,14 +80,34 @@ def db_session():
 
 @pytest.fixture(scope="function")
 def client(db_session):
-    """Cliente HTTP que usa la DB SQLite."""
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass 
-            
-    app.dependency_overrides[get_db] = override_get_db
+    """
+    Cliente HTTP que usa la DB SQLite. Las dependencias de sesión (escritura y
+    lectura) abren sesiones de database.AsyncSessionLocal, ya reemplazado arriba.
+    """
     with TestClient(app) as c:
         yield c
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+@contextmanager
+def count_statements(engine=test_engine):
+    """Registra las sentencias SQL que se ejecutan sobre `engine` dentro del bloque"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+@contextmanager
+def assert_statement_count(expected: int, engine=test_async_engine.sync_engine):
+    """
+    Falla si el bloque no ejecuta exactamente `expected` sentencias SQL. Por
+    defecto mide el engine asíncrono, el que usan los endpoints.
+    """
+    with count_statements(engine) as statements:
+        yield statements
+    assert len(statements) == expected, "\n".join(statements)
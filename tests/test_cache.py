@@ -0,0 +1,87 @@
+import asyncio
+import fnmatch
+from app.cache import InMemoryCache, RedisCache
+
+class FakeRedis:
+    """Imita el cliente de redis.asyncio"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def scan_iter(self, match):
+        for key in [key for key in list(self.data) if fnmatch.fnmatch(key, match)]:
+            yield key
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = InMemoryCache(max_entries=2, ttl=60)
+    
+    async def main():
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")
+        await cache.set("c", 3)
+        return [await cache.get(key) for key in ["b", "a", "c"]]
+    
+    assert asyncio.run(main()) == [None, 1, 3]
+    assert cache.stats()["evictions"] == 1
+
+def test_memory_cache_entries_expire():
+    cache = InMemoryCache(max_entries=10, ttl=0)
+    
+    async def main():
+        await cache.set("a", 1)
+        return await cache.get("a")
+    
+    assert asyncio.run(main()) is None
+    assert cache.stats()["misses"] == 1
+
+def test_redis_cache_round_trip():
+    client = FakeRedis()
+    cache = RedisCache("liked", client=client, dumps=lambda v: ",".join(sorted(v)), loads=lambda s: set(s.split(",")))
+    
+    async def main():
+        await cache.set("u1", {"B", "A"})
+        assert client.data == {"liked:u1": "A,B"}
+        assert await cache.get("u1") == {"A", "B"}
+        await cache.clear()
+        assert await cache.get("u1") is None
+    
+    asyncio.run(main())
+    assert cache.stats() == {"backend": "redis", "hits": 1, "misses": 1}
+
+def test_caches_endpoint(client):
+    response = client.get("/metrics/caches")
+    
+    assert response.status_code == 200
+    assert response.json()["liked_ids"]["backend"] == "memory"
+
+def test_memory_cache_bounded_by_bytes():
+    cache = InMemoryCache(max_entries=100, ttl=60, max_bytes=10)
+    
+    async def main():
+        await cache.set("a", b"12345")
+        await cache.set("b", b"12345")
+        await cache.set("c", b"123")
+        
+        assert await cache.get("a") is None
+        assert await cache.get("b") == b"12345"
+        assert cache.stats()["bytes"] == 8
+        
+        # Un valor más grande que todo el límite no se guarda ni desaloja nada
+        await cache.set("huge", b"x" * 11)
+        assert await cache.get("huge") is None
+        assert await cache.get("c") == b"123"
+        
+        await cache.delete("b")
+        assert cache.stats()["bytes"] == 3
+    
+    asyncio.run(main())
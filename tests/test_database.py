@@ -0,0 +1,17 @@
+import inspect
+from fastapi.routing import APIRoute
+from app.database import to_async_url
+from app.main import app
+
+def test_to_async_url_uses_async_drivers():
+    assert to_async_url("postgresql://u:p@db:5432/melodia") == "postgresql+asyncpg://u:p@db:5432/melodia"
+    assert to_async_url("sqlite:///:memory:") == "sqlite+aiosqlite:///:memory:"
+
+def test_all_routes_are_async():
+    """Ningún endpoint debe ocupar un hilo del threadpool esperando a la base"""
+    sync_routes = [
+        route.path
+        for route in app.routes
+        if isinstance(route, APIRoute) and not inspect.iscoroutinefunction(route.endpoint)
+    ]
+    assert sync_routes == []
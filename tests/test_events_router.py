@@ -0,0 +1,35 @@
+from app.repositories import outbox_repository
+
+PREFIX = "/events"
+
+def test_event_feed_with_cursor(client, db_session):
+    headers = {"user-id": "u1"}
+    client.post("/liked-songs/", json={"song_id": "A"}, headers=headers)
+    client.post("/history/", json={"song_id": "A"}, headers=headers)
+    # Sin publicar todavía no entran al feed
+    assert client.get(f"{PREFIX}/").json()["events"] == []
+    outbox_repository.claim_pending(db_session)
+    db_session.commit()
+    
+    first = client.get(f"{PREFIX}/", params={"limit": 1})
+    assert first.status_code == 200
+    assert [e["event_type"] for e in first.json()["events"]] == ["song.liked"]
+    
+    rest = client.get(f"{PREFIX}/", params={"cursor": first.json()["cursor"]}).json()
+    assert [e["event_type"] for e in rest["events"]] == ["song.played"]
+    assert rest["events"][0]["payload"]["song_id"] == "A"
+    
+    filtered = client.get(f"{PREFIX}/", params={"event_type": "song.played"}).json()
+    assert len(filtered["events"]) == 1
+
+def test_event_feed_long_poll_times_out_empty(client):
+    cursor = client.get(f"{PREFIX}/").json()["cursor"]
+    
+    res = client.get(f"{PREFIX}/", params={"cursor": cursor, "wait": 0.05})
+    
+    assert res.status_code == 200
+    assert res.json() == {"events": [], "cursor": cursor}
+
+def test_event_feed_invalid_cursor(client):
+    assert client.get(f"{PREFIX}/", params={"cursor": "nope"}).status_code == 400
+    assert client.get(f"{PREFIX}/", params={"wait": 60}).status_code == 422
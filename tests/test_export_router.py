@@ -0,0 +1,56 @@
+import gzip
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.services import export_service
+
+PREFIX = "/export"
+
+def parse_ndjson(text: str) -> list[dict]:
+    return [json.loads(line) for line in text.splitlines()]
+
+def seed_library(client, user_id="u1"):
+    headers = {"user-id": user_id}
+    pid = client.post(f"/playlists/?user_id={user_id}", json={"name": "Mix"}).json()["id"]
+    client.post(f"/playlists/{pid}/songs/batch", json={"song_ids": ["A", "B", "C"]})
+    for song_id in ["L1", "L2"]:
+        client.post("/liked-songs/", json={"song_id": song_id}, headers=headers)
+    for song_id in ["H1", "H2", "H3"]:
+        client.post("/history/", json={"song_id": song_id}, headers=headers)
+    return pid
+
+def test_export_library_ndjson(client, monkeypatch):
+    # Tandas chicas para recorrer el cursor en varias partes
+    monkeypatch.setattr(export_service, "EXPORT_BATCH_SIZE", 2)
+    pid = seed_library(client)
+    seed_library(client, user_id="someone-else")
+    
+    response = client.get(f"{PREFIX}/", headers={"user-id": "u1", "Accept-Encoding": "identity"})
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert "content-encoding" not in response.headers
+    records = parse_ndjson(response.text)
+    assert records[0]["type"] == "export"
+    
+    by_type = {}
+    for record in records[1:]:
+        by_type.setdefault(record["type"], []).append(record)
+    assert [p["id"] for p in by_type["playlist"]] == [pid]
+    assert by_type["playlist"][0]["song_count"] == 3
+    assert [(s["song_id"], s["position"]) for s in by_type["playlist_song"]] == [("A", 1), ("B", 2), ("C", 3)]
+    assert [s["song_id"] for s in by_type["liked_song"]] == ["L1", "L2"]
+    assert [(h["song_id"], h["position"]) for h in by_type["history"]] == [("H3", 1), ("H2", 2), ("H1", 3)]
+
+def test_export_library_gzip(client):
+    seed_library(client)
+    
+    with client.stream("GET", f"{PREFIX}/", headers={"user-id": "u1", "Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        raw = b"".join(response.iter_raw())
+    
+    records = parse_ndjson(gzip.decompress(raw).decode())
+    assert len([r for r in records if r["type"] == "history"]) == 3
+
+def test_export_requires_user(client):
+    assert client.get(f"{PREFIX}/").status_code == 422
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from app.repositories import history_repository
 from app.schemas.history import HistoryEntryCreate
 from app import models
+from tests.conftest import count_statements
 
 # --- TEST AGREGAR (Lógica de Pila/Stack) ---
 
@@ -21,22 +22,52 @@ def test_add_history_entry_shifts_positions(db_session: Session):
     
     assert res2.position == 1 # La nueva es la 1
     
-    # Verificar en DB que la vieja ahora es 2
-    old_entry = db_session.query(models.HistoryEntry).filter_by(song_id="A").first()
-    assert old_entry.position == 2
+    # Verificar que la vieja ahora se lee en la posición 2
+    entries = history_repository.get_user_history_paginated(db_session, user_id)["entries"]
+    assert [(e["song_id"], e["position"]) for e in entries] == [("B", 1), ("A", 2)]
+
+def test_add_history_entry_does_not_rewrite_previous_rows(db_session: Session):
+    """El historial es append-only: una reproducción nueva no modifica las anteriores"""
+    user_id = "u1"
+    first = history_repository.add_history_entry(db_session, user_id, HistoryEntryCreate(song_id="A"))
+    first_seq = first.seq
+    
+    history_repository.add_history_entry(db_session, user_id, HistoryEntryCreate(song_id="B"))
+    
+    stored = db_session.query(models.HistoryEntry).filter_by(song_id="A").one()
+    assert stored.seq == first_seq
+
+def test_history_seq_is_assigned_by_the_database(db_session: Session):
+    """seq lo asigna la base en el INSERT (no el reloj de cada proceso) y vuelve en el RETURNING"""
+    with count_statements() as statements:
+        first = history_repository.add_history_entry(db_session, "u1", HistoryEntryCreate(song_id="A"))
+    second = history_repository.add_history_entry(db_session, "u2", HistoryEntryCreate(song_id="B"))
+    
+    insert = next(s for s in statements if s.startswith("INSERT INTO history"))
+    assert "RETURNING seq" in insert
+    assert not any(s.lstrip().upper().startswith("SELECT") for s in statements)
+    assert second.seq == first.seq + 1
+
+def test_get_history_paginated_positions_continue_across_pages(db_session: Session):
+    user_id = "u1"
+    for song_id in ["A", "B", "C"]:
+        history_repository.add_history_entry(db_session, user_id, HistoryEntryCreate(song_id=song_id))
+    
+    page_2 = history_repository.get_user_history_paginated(db_session, user_id, page=2, limit=2)
+    assert [(e["song_id"], e["position"]) for e in page_2["entries"]] == [("A", 3)]
 
 def test_add_history_multiple_users(db_session: Session):
     """Verificar que no se mezclen los historiales de usuarios distintos"""
     history_repository.add_history_entry(db_session, "u1", HistoryEntryCreate(song_id="A"))
     history_repository.add_history_entry(db_session, "u2", HistoryEntryCreate(song_id="B"))
     
-    h1 = history_repository.get_user_history(db_session, "u1")
-    h2 = history_repository.get_user_history(db_session, "u2")
+    h1 = history_repository.get_user_history_paginated(db_session, "u1")["entries"]
+    h2 = history_repository.get_user_history_paginated(db_session, "u2")["entries"]
     
     assert len(h1) == 1
     assert len(h2) == 1
-    assert h1[0].position == 1
-    assert h2[0].position == 1
+    assert h1[0]["position"] == 1
+    assert h2[0]["position"] == 1
 
 # --- TEST BUSQUEDA Y PAGINACION ---
 
@@ -62,7 +93,7 @@ def test_get_history_paginated_filters(db_session: Session):
     # Test Artist "Popper"
     res_artist = history_repository.get_user_history_paginated(db_session, user_id, artist="Popper")
     assert res_artist["total"] == 1
-    assert res_artist["entries"][0].song_name == "Pop Song"
+    assert res_artist["entries"][0]["song_name"] == "Pop Song"
     
     # Test Pagination (Total 3, limit 2 -> Pag 1 tiene 2, Pag 2 tiene 1)
     res_pag = history_repository.get_user_history_paginated(db_session, user_id, page=1, limit=2)
@@ -87,16 +118,16 @@ def test_remove_history_entry_reorder(db_session: Session):
     assert res is True
     
     # Verificar
-    entries = history_repository.get_user_history(db_session, user_id)
+    entries = history_repository.get_user_history_paginated(db_session, user_id)["entries"]
     assert len(entries) == 2
     
     # C sigue siendo 1
-    assert entries[0].song_id == "C"
-    assert entries[0].position == 1
+    assert entries[0]["song_id"] == "C"
+    assert entries[0]["position"] == 1
     
     # A subió de 3 a 2
-    assert entries[1].song_id == "A"
-    assert entries[1].position == 2
+    assert entries[1]["song_id"] == "A"
+    assert entries[1]["position"] == 2
 
 def test_remove_non_existent(db_session: Session):
     assert history_repository.remove_history_entry(db_session, "u1", "ghost") is False
@@ -107,5 +138,31 @@ def test_clear_history(db_session: Session):
     res = history_repository.clear_history(db_session, "u1")
     assert res is True
     
-    entries = history_repository.get_user_history(db_session, "u1")
-    assert len(entries) == 0
\ No newline at end of file
+    entries = history_repository.get_user_history_paginated(db_session, "u1")["entries"]
+    assert len(entries) == 0
+
+def test_get_history_with_cursor_keeps_numbering(db_session: Session):
+    user_id = "u1"
+    for song_id in ["A", "B", "C"]:
+        history_repository.add_history_entry(db_session, user_id, HistoryEntryCreate(song_id=song_id))
+    
+    first = history_repository.get_user_history_paginated(db_session, user_id, limit=2)
+    second = history_repository.get_user_history_paginated(
+        db_session, user_id, limit=2, cursor=first["next_cursor"], with_total=False
+    )
+    
+    assert [(e["song_id"], e["position"]) for e in first["entries"]] == [("C", 1), ("B", 2)]
+    assert [(e["song_id"], e["position"]) for e in second["entries"]] == [("A", 3)]
+    assert second["next_cursor"] is None
+
+def test_history_cursor_survives_deleted_anchor(db_session: Session):
+    for song_id in ["A", "B", "C", "D"]:
+        history_repository.add_history_entry(db_session, "u1", HistoryEntryCreate(song_id=song_id))
+    first = history_repository.get_user_history_paginated(db_session, "u1", limit=2)
+    
+    # Se borra la última entrada mostrada antes de pedir la página siguiente
+    history_repository.remove_history_entry(db_session, "u1", "C")
+    second = history_repository.get_user_history_paginated(db_session, "u1", limit=2, cursor=first["next_cursor"])
+    
+    assert [e["song_id"] for e in second["entries"]] == ["B", "A"]
+    assert "seq" not in second["entries"][0]
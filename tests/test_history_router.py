@@ -1,5 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
+from tests.conftest import assert_statement_count
 
 # Prefijo definido en tu router
 PREFIX = "/history"
@@ -90,4 +91,26 @@ def test_clear_history_empty_fails(client):
     response = client.delete(f"{PREFIX}/", headers=headers)
     
     assert response.status_code == 404
-    assert "No se encontró historial" in response.text
\ No newline at end of file
+    assert "No se encontró historial" in response.text
+
+def test_get_history_relevance_rejects_cursor(client):
+    headers = {"user-id": "u1"}
+    client.post(f"{PREFIX}/", json={"song_id": "A", "song_name": "Queen"}, headers=headers)
+    
+    res = client.get(f"{PREFIX}/?search=Queen&sort=relevance", headers=headers)
+    assert res.status_code == 200
+    
+    res = client.get(f"{PREFIX}/?search=Queen&sort=relevance&cursor=abc", headers=headers)
+    assert res.status_code == 400
+
+def test_write_endpoints_statement_count(client):
+    headers = {"user-id": "u1"}
+    payload = {"song_id": "song_1", "song_name": "Song", "artist_name": "Artist", "minutos": "3:00"}
+    
+    # INSERT + evento song.played en el outbox
+    with assert_statement_count(2):
+        response = client.post(f"{PREFIX}/", json=payload, headers=headers)
+    assert response.json()["played_at"] is not None
+    
+    with assert_statement_count(1):
+        assert client.delete(f"{PREFIX}/song_1", headers=headers).status_code == 204
@@ -0,0 +1,87 @@
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.repositories import history_repository, liked_song_repository, playlist_repository
+from app.schemas.history import HistoryEntryCreate
+from app.schemas.liked_songs import LikedSongCreate
+from app.schemas.playlist import PlaylistCreate
+from app.schemas.playlist_songs import PlaylistSongCreate, PlaylistSongPositionUpdate
+
+TABLES = ("playlists", "playlist_songs", "liked_songs", "history")
+
+@contextmanager
+def captured_selects(db: Session):
+    """Captura los SELECT que emite el repositorio junto con sus parámetros"""
+    statements = []
+    bind = db.get_bind()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
+
+def assert_index_scans(db: Session, statements):
+    assert statements
+    connection = db.connection()
+    for statement, parameters in statements:
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        details = [row[-1] for row in plan]
+        for detail in details:
+            touches_table = any(f" {table}" in detail for table in TABLES)
+            if touches_table and detail.startswith("SCAN"):
+                # Un SCAN sin índice es un recorrido completo de la tabla
+                assert "INDEX" in detail, f"{statement}\n{details}"
+        # Ordenar en memoria solo el desempate (RIGHT PART) es aceptable; ordenar todo no
+        assert "USE TEMP B-TREE FOR ORDER BY" not in details, f"{statement}\n{details}"
+
+@pytest.fixture
+def seeded(db_session: Session):
+    playlist = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Indexed"), "u1")
+    for song_id in ["A", "B", "C"]:
+        playlist_repository.add_song(db_session, playlist.id, PlaylistSongCreate(song_id=song_id))
+        liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id=song_id))
+        history_repository.add_history_entry(db_session, "u1", HistoryEntryCreate(song_id=song_id))
+    return playlist
+
+def test_liked_songs_queries_use_indexes(db_session: Session, seeded):
+    with captured_selects(db_session) as statements:
+        liked_song_repository.is_song_liked_by_user(db_session, "u1", "A")
+        first = liked_song_repository.get_user_liked_songs_page(db_session, "u1", limit=1)
+        liked_song_repository.get_user_liked_songs_page(db_session, "u1", limit=1, cursor=first["next_cursor"])
+    assert_index_scans(db_session, statements)
+
+def test_history_queries_use_indexes(db_session: Session, seeded):
+    with captured_selects(db_session) as statements:
+        first = history_repository.get_user_history_paginated(db_session, "u1", limit=1, with_total=False)
+        history_repository.get_user_history_paginated(
+            db_session, "u1", limit=1, cursor=first["next_cursor"], with_total=False
+        )
+        history_repository.get_user_history_paginated(db_session, "u1", page=2, limit=1)
+        history_repository.remove_history_entry(db_session, "u1", "B")
+    assert_index_scans(db_session, statements)
+
+def test_playlist_song_queries_use_indexes(db_session: Session, seeded):
+    with captured_selects(db_session) as statements:
+        playlist_repository.get_playlist_songs(db_session, seeded.id)
+        updates = [PlaylistSongPositionUpdate(song_id="C", position=2)]
+        playlist_repository.reorder_playlist_songs(db_session, seeded.id, updates)
+        playlist_repository.remove_song(db_session, seeded.id, "A")
+    assert_index_scans(db_session, statements)
+
+def test_playlist_queries_use_indexes(db_session: Session, seeded):
+    playlist_repository.create_playlist(db_session, PlaylistCreate(name="Indexed too"), "u1")
+    with captured_selects(db_session) as statements:
+        first = playlist_repository.get_playlists_page(db_session, "u1", limit=1)
+        playlist_repository.get_playlists_page(db_session, "u1", limit=1, cursor=first["next_cursor"])
+        found = playlist_repository.search_playlists_paginated(db_session, user_id="u1", limit=1, with_total=False)
+        playlist_repository.search_playlists_paginated(
+            db_session, user_id="u1", limit=1, cursor=found["next_cursor"], with_total=False
+        )
+    assert first["next_cursor"] and found["next_cursor"]
+    assert_index_scans(db_session, statements)
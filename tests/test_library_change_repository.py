@@ -0,0 +1,132 @@
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app import models
+from app.repositories import library_change_repository, liked_song_repository, playlist_repository
+from app.schemas.liked_songs import LikedSongCreate, LikedSongPosition
+from app.schemas.playlist import PlaylistCreate, PlaylistUpdate
+from app.schemas.playlist_songs import PlaylistSongCreate, PlaylistSongPositionUpdate
+from app.utils.pagination import InvalidCursorError
+from tests.conftest import count_statements
+
+def changes_since(db: Session, *args, **kwargs):
+    """Ordena lo pendiente (como el secuenciador en segundo plano) y sincroniza"""
+    library_change_repository.sequence_changes(db)
+    return library_change_repository.get_changes(db, *args, **kwargs)
+
+def replay(changes: list[dict], entity: str, items: list[str] | None = None, playlist_id=None) -> list[str]:
+    """Aplica los cambios como lo haría un cliente offline sobre su lista de song_id"""
+    items = list(items or [])
+    for change in changes:
+        if change["entity"] != entity or (playlist_id and change["playlist_id"] != playlist_id):
+            continue
+        index = change["position"] - 1
+        if change["action"] == "insert":
+            items.insert(index, change["song_id"])
+        elif change["action"] == "delete":
+            assert items.pop(index) == change["song_id"]
+        elif change["action"] == "move":
+            items.remove(change["song_id"])
+            items.insert(index, change["song_id"])
+    return items
+
+def test_liked_songs_changes_replay_to_current_order(db_session: Session):
+    for song_id in ["A", "B", "C", "D", "E"]:
+        liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id=song_id))
+    synced = liked_song_repository.get_user_liked_songs_page(db_session, "u1")["songs"]
+    token = changes_since(db_session, "u1", "0")["token"]
+    
+    liked_song_repository.reorder_songs(db_session, "u1", [
+        LikedSongPosition(song_id="E", position=2),
+        LikedSongPosition(song_id="A", position=3),
+    ])
+    liked_song_repository.remove_liked_song(db_session, "u1", "C")
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="F"))
+    # Un like repetido no genera cambios
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="F"))
+    
+    result = changes_since(db_session, "u1", token)
+    
+    current = [s["song_id"] for s in liked_song_repository.get_user_liked_songs_page(db_session, "u1")["songs"]]
+    assert replay(result["changes"], "liked_song", [s["song_id"] for s in synced]) == current
+    assert [c["action"] for c in result["changes"]].count("insert") == 1
+    assert result["has_more"] is False
+
+def test_playlist_changes_replay_to_current_order(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Offline"), "u1")
+    playlist_repository.add_songs(db_session, p.id, ["A", "B", "C"])
+    playlist_repository.add_songs(db_session, p.id, ["X", "Y"], position=2)
+    playlist_repository.add_song(db_session, p.id, PlaylistSongCreate(song_id="Z"))
+    playlist_repository.reorder_playlist_songs(db_session, p.id, [
+        PlaylistSongPositionUpdate(song_id="C", position=1),
+        PlaylistSongPositionUpdate(song_id="X", position=6),
+    ])
+    playlist_repository.remove_song(db_session, p.id, "B")
+    playlist_repository.update_playlist(db_session, p.id, "u1", PlaylistUpdate(name="Renamed"))
+    
+    changes = changes_since(db_session, "u1", "0")["changes"]
+    
+    current = [s.song_id for s in playlist_repository.get_playlist_songs(db_session, p.id)]
+    assert replay(changes, "playlist_song", playlist_id=p.id) == current
+    assert [(c["entity"], c["action"]) for c in changes if c["entity"] == "playlist"] == [
+        ("playlist", "insert"), ("playlist", "update")
+    ]
+
+def test_delete_playlist_leaves_tombstone(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Gone"), "u1")
+    playlist_repository.add_songs(db_session, p.id, ["A", "B"])
+    token = changes_since(db_session, "u1")["token"]
+    
+    playlist_repository.delete_playlist(db_session, p.id, "u1")
+    
+    changes = changes_since(db_session, "u1", token)["changes"]
+    assert [(c["entity"], c["action"], c["playlist_id"]) for c in changes] == [("playlist", "delete", p.id)]
+
+def test_sync_without_changes_is_one_probe(db_session: Session):
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="A"))
+    liked_song_repository.add_liked_song(db_session, "u2", LikedSongCreate(song_id="B"))
+    token = changes_since(db_session, "u1")["token"]
+    
+    with count_statements() as statements:
+        result = library_change_repository.get_changes(db_session, "u1", token)
+    
+    assert len(statements) == 1
+    assert result == {"changes": [], "token": token, "has_more": False}
+
+def test_changes_are_paged(db_session: Session):
+    for song_id in ["A", "B", "C"]:
+        liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id=song_id))
+    
+    first = changes_since(db_session, "u1", "0", limit=2)
+    second = changes_since(db_session, "u1", first["token"], limit=2)
+    
+    assert first["has_more"] is True
+    assert [c["song_id"] for c in first["changes"] + second["changes"]] == ["A", "B", "C"]
+    assert second["has_more"] is False
+
+@pytest.mark.parametrize("token", ["abc", "-1"])
+def test_invalid_sync_token(db_session: Session, token):
+    with pytest.raises(InvalidCursorError):
+        library_change_repository.get_changes(db_session, "u1", token)
+
+def test_late_commit_is_not_skipped(db_session: Session):
+    """Un cambio con seq menor que confirma tarde igual llega a quien ya sincronizó"""
+    late = {"user_id": "u1", "entity": "liked_song", "action": "insert", "song_id": "late", "position": 1}
+    db_session.execute(insert(models.LibraryChange).values(seq=10, user_id="u1", entity="liked_song",
+                                                           action="insert", song_id="early", position=1))
+    db_session.commit()
+    token = changes_since(db_session, "u1", "0")["token"]
+    
+    # La transacción que tomó seq=5 confirma después de la sincronización
+    db_session.execute(insert(models.LibraryChange).values(seq=5, **late))
+    db_session.commit()
+    
+    assert [c["song_id"] for c in changes_since(db_session, "u1", token)["changes"]] == ["late"]
+
+def test_unsequenced_changes_are_not_served(db_session: Session):
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="A"))
+    
+    assert library_change_repository.get_changes(db_session, "u1", "0")["changes"] == []
+    assert library_change_repository.sequence_changes(db_session) == 1
+    assert library_change_repository.sequence_changes(db_session) == 0
+    assert len(library_change_repository.get_changes(db_session, "u1", "0")["changes"]) == 1
@@ -1,8 +1,11 @@
+import asyncio
 import pytest
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.repositories import liked_song_repository
 from app.schemas.liked_songs import LikedSongCreate, LikedSongPosition
 from app import models
+from tests.conftest import count_statements
 
 # --- TEST ADD ---
 
@@ -32,6 +35,54 @@ def test_add_liked_song_already_exists(db_session: Session):
     count = db_session.query(models.LikedSong).count()
     assert count == 1
 
+def test_add_liked_song_takes_position_from_counter(db_session: Session):
+    """La posición sale del contador del usuario (UPSERT ... RETURNING, que bloquea la fila), no de max(position)"""
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="A"))
+    
+    with count_statements() as statements:
+        s2 = liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="B"))
+    
+    assert len(statements) == 4
+    assert statements[0].startswith("INSERT INTO liked_song_counters")
+    assert "ON CONFLICT" in statements[0] and "RETURNING" in statements[0]
+    assert statements[1].startswith("INSERT INTO liked_songs")
+    assert "max(" not in statements[1]
+    assert statements[2].startswith("INSERT INTO library_changes")
+    assert statements[3].startswith("INSERT INTO outbox_events")
+    assert s2.position == 2
+
+def test_liked_positions_stay_unique_and_dense(db_session: Session):
+    """Likes, likes repetidos, unlikes y reordenamientos intercalados no repiten ni saltean posiciones"""
+    def positions():
+        return [s["position"] for s in liked_song_repository.get_user_liked_songs_page(db_session, "u1")["songs"]]
+    
+    def song_count():
+        return db_session.get(models.LikedSongCounter, "u1").song_count
+    
+    for song_id in ["A", "B", "C", "D"]:
+        liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id=song_id))
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="B"))
+    liked_song_repository.remove_liked_song(db_session, "u1", "B")
+    liked_song_repository.remove_liked_song(db_session, "u1", "ghost")
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="E"))
+    liked_song_repository.reorder_songs(db_session, "u1", [LikedSongPosition(song_id="E", position=1)])
+    liked_song_repository.remove_liked_song(db_session, "u1", "A")
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="B"))
+    
+    assert positions() == [1, 2, 3, 4]
+    assert song_count() == 4
+    songs = liked_song_repository.get_user_liked_songs_page(db_session, "u1")["songs"]
+    assert [s["song_id"] for s in songs] == ["E", "C", "D", "B"]
+
+def test_liked_songs_unique_per_user(db_session: Session):
+    """La base rechaza duplicados aunque no pasen por el repositorio"""
+    db_session.add(models.LikedSong(user_id="u1", song_id="A", position=1))
+    db_session.add(models.LikedSong(user_id="u1", song_id="A", position=2))
+    
+    with pytest.raises(IntegrityError):
+        db_session.commit()
+    db_session.rollback()
+
 # --- TEST REMOVE & REORDER ---
 
 def test_remove_liked_song_reorders(db_session: Session):
@@ -48,14 +99,14 @@ def test_remove_liked_song_reorders(db_session: Session):
     assert res is True
     
     # Verificar posiciones
-    songs = liked_song_repository.get_user_liked_songs(db_session, user_id)
+    songs = liked_song_repository.get_user_liked_songs_page(db_session, user_id)["songs"]
     
     assert len(songs) == 2
-    assert songs[0].song_id == "A"
-    assert songs[0].position == 1
+    assert songs[0]["song_id"] == "A"
+    assert songs[0]["position"] == 1
     
-    assert songs[1].song_id == "C"
-    assert songs[1].position == 2 # <-- Reordenado
+    assert songs[1]["song_id"] == "C"
+    assert songs[1]["position"] == 2 # <-- Reordenado
 
 def test_remove_non_existent(db_session: Session):
     res = liked_song_repository.remove_liked_song(db_session, "u1", "ghost")
@@ -63,16 +114,16 @@ def test_remove_non_existent(db_session: Session):
 
 # --- TEST GET ---
 
-def test_get_user_liked_songs(db_session: Session):
+def test_get_user_liked_songs_page(db_session: Session):
     # Usuario 1
     liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="A"))
     # Usuario 2
     liked_song_repository.add_liked_song(db_session, "u2", LikedSongCreate(song_id="B"))
     
     # Fetch u1
-    songs_u1 = liked_song_repository.get_user_liked_songs(db_session, "u1")
+    songs_u1 = liked_song_repository.get_user_liked_songs_page(db_session, "u1")["songs"]
     assert len(songs_u1) == 1
-    assert songs_u1[0].song_id == "A"
+    assert songs_u1[0]["song_id"] == "A"
 
 # --- TEST IS LIKED ---
 
@@ -82,9 +133,9 @@ def test_is_song_liked_by_user(db_session: Session):
     assert liked_song_repository.is_song_liked_by_user(db_session, "u1", "A") is True
     assert liked_song_repository.is_song_liked_by_user(db_session, "u1", "B") is False
 
-# --- TEST MANUAL REORDER (update_position y reorder_songs) ---
+# --- TEST MANUAL REORDER (reorder_songs) ---
 
-def test_update_position_move_down(db_session: Session):
+def test_reorder_songs_move_down(db_session: Session):
     """Mover Pos 1 a Pos 3: [A, B, C] -> [B, C, A]"""
     user_id = "u1"
     liked_song_repository.add_liked_song(db_session, user_id, LikedSongCreate(song_id="A")) # 1
@@ -101,7 +152,104 @@ def test_update_position_move_down(db_session: Session):
     res = liked_song_repository.reorder_songs(db_session, user_id, updates)
     assert res is True
     
-    songs = liked_song_repository.get_user_liked_songs(db_session, user_id)
-    assert songs[0].song_id == "B"
-    assert songs[1].song_id == "C"
-    assert songs[2].song_id == "A"
\ No newline at end of file
+    songs = liked_song_repository.get_user_liked_songs_page(db_session, user_id)["songs"]
+    assert [s["song_id"] for s in songs] == ["B", "C", "A"]
+
+def test_get_user_liked_songs_page_with_cursor(db_session: Session):
+    for song_id in ["A", "B", "C"]:
+        liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id=song_id))
+    
+    first = liked_song_repository.get_user_liked_songs_page(db_session, "u1", limit=2)
+    second = liked_song_repository.get_user_liked_songs_page(db_session, "u1", limit=2, cursor=first["next_cursor"])
+    
+    assert [s["song_id"] for s in first["songs"]] == ["A", "B"]
+    assert [s["song_id"] for s in second["songs"]] == ["C"]
+    assert second["next_cursor"] is None
+
+def test_liked_songs_cursor_survives_deleted_anchor(db_session: Session):
+    for song_id in ["A", "B", "C", "D"]:
+        liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id=song_id))
+    first = liked_song_repository.get_user_liked_songs_page(db_session, "u1", limit=2)
+    
+    liked_song_repository.remove_liked_song(db_session, "u1", "B")
+    second = liked_song_repository.get_user_liked_songs_page(db_session, "u1", limit=2, cursor=first["next_cursor"])
+    
+    assert [s["song_id"] for s in second["songs"]] == ["C", "D"]
+
+def test_get_liked_song_ids(db_session: Session):
+    for song_id in ["A", "C"]:
+        liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id=song_id))
+    liked_song_repository.add_liked_song(db_session, "u2", LikedSongCreate(song_id="B"))
+    
+    with count_statements() as statements:
+        liked = liked_song_repository.get_liked_song_ids(db_session, "u1", ["A", "B", "C", "D"])
+    
+    assert liked == {"A", "C"}
+    assert len(statements) == 1
+
+def test_load_liked_ids_skips_large_sets(db_session: Session, monkeypatch):
+    monkeypatch.setattr(liked_song_repository, "LIKED_IDS_CACHE_MAX_SET", 2)
+    for song_id in ["A", "B"]:
+        liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id=song_id))
+    
+    assert liked_song_repository.load_liked_ids(db_session, "u1") == frozenset({"A", "B"})
+    
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="C"))
+    assert liked_song_repository.load_liked_ids(db_session, "u1") is None
+
+def test_liked_ids_cache_rejects_refill_started_before_write():
+    async def main():
+        generation, liked_ids = await liked_song_repository.cached_liked_ids("u1")
+        assert liked_ids is None
+        await liked_song_repository.store_liked_ids("u1", generation, frozenset({"A"}))
+        assert await liked_song_repository.cached_liked_ids("u1") == (generation, frozenset({"A"}))
+        
+        # Una recarga que vio la generación anterior a la escritura no se guarda
+        await liked_song_repository.invalidate_liked_ids("u1")
+        await liked_song_repository.store_liked_ids("u1", generation, frozenset({"A"}))
+        generation, liked_ids = await liked_song_repository.cached_liked_ids("u1")
+        assert liked_ids is None
+        
+        await liked_song_repository.store_liked_ids("u1", generation, frozenset({"A", "B"}))
+        assert await liked_song_repository.cached_liked_ids("u1") == (generation, frozenset({"A", "B"}))
+    
+    asyncio.run(main())
+
+def test_reorder_songs_keeps_positions_dense(db_session: Session):
+    """Mover solo C al inicio: [A, B, C, D] -> [C, A, B, D], sin posiciones repetidas"""
+    for song_id in ["A", "B", "C", "D"]:
+        liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id=song_id))
+    
+    with count_statements() as statements:
+        res = liked_song_repository.reorder_songs(db_session, "u1", [LikedSongPosition(song_id="C", position=1)])
+    assert res is True
+    assert len([s for s in statements if s.lstrip().upper().startswith(("SELECT", "UPDATE"))]) == 2
+    
+    songs = liked_song_repository.get_user_liked_songs_page(db_session, "u1")["songs"]
+    assert [(s["song_id"], s["position"]) for s in songs] == [("C", 1), ("A", 2), ("B", 3), ("D", 4)]
+
+def test_reorder_songs_statement_count_is_constant(db_session: Session):
+    song_ids = [f"s{i:03d}" for i in range(200)]
+    for song_id in song_ids:
+        liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id=song_id))
+    
+    updates = [LikedSongPosition(song_id=song_id, position=i) for i, song_id in enumerate(reversed(song_ids), start=1)]
+    with count_statements() as statements:
+        assert liked_song_repository.reorder_songs(db_session, "u1", updates) is True
+    assert len([s for s in statements if s.lstrip().upper().startswith(("SELECT", "UPDATE"))]) == 2
+    
+    songs = liked_song_repository.get_user_liked_songs_page(db_session, "u1", limit=200)["songs"]
+    assert [s["song_id"] for s in songs] == list(reversed(song_ids))
+    assert [s["position"] for s in songs] == list(range(1, 201))
+
+def test_reorder_songs_rejects_unknown_or_duplicated(db_session: Session):
+    for song_id in ["A", "B"]:
+        liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id=song_id))
+    
+    assert liked_song_repository.reorder_songs(db_session, "u1", [LikedSongPosition(song_id="ghost", position=1)]) is False
+    assert liked_song_repository.reorder_songs(db_session, "u1", [
+        LikedSongPosition(song_id="A", position=1),
+        LikedSongPosition(song_id="A", position=2),
+    ]) is False
+    songs = liked_song_repository.get_user_liked_songs_page(db_session, "u1")["songs"]
+    assert [(s["song_id"], s["position"]) for s in songs] == [("A", 1), ("B", 2)]
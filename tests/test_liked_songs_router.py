@@ -1,5 +1,10 @@
 import pytest
 from fastapi.testclient import TestClient
+import asyncio
+from app import database
+from app.repositories import liked_song_repository
+from app.utils.read_your_writes import RecentWriters
+from tests.conftest import assert_statement_count
 
 PREFIX = "/liked-songs"
 
@@ -88,4 +93,92 @@ def test_reorder_songs(client):
     assert songs[0]["song_id"] == "B" # Primero B
     assert songs[0]["position"] == 1
     assert songs[1]["song_id"] == "A" # Segundo A
-    assert songs[1]["position"] == 2
\ No newline at end of file
+    assert songs[1]["position"] == 2
+
+def test_get_liked_songs_cursor_header(client):
+    headers = {"user-id": "u1"}
+    for song_id in ["A", "B", "C"]:
+        client.post(f"{PREFIX}/", json={"song_id": song_id}, headers=headers)
+    
+    first = client.get(f"{PREFIX}/?limit=2", headers=headers)
+    assert [s["song_id"] for s in first.json()] == ["A", "B"]
+    
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get(f"{PREFIX}/?limit=2&cursor={cursor}", headers=headers)
+    assert [s["song_id"] for s in second.json()] == ["C"]
+    assert "X-Next-Cursor" not in second.headers
+
+def test_get_liked_songs_invalid_cursor(client):
+    res = client.get(f"{PREFIX}/?cursor=not-a-cursor", headers={"user-id": "u1"})
+    assert res.status_code == 400
+
+def test_are_songs_liked_batch(client):
+    headers = {"user-id": "u1"}
+    client.post(f"{PREFIX}/", json={"song_id": "A"}, headers=headers)
+    client.post(f"{PREFIX}/", json={"song_id": "C"}, headers=headers)
+    
+    res = client.post(f"{PREFIX}/is-liked/batch", json={"song_ids": ["C", "B", "A", "C"]}, headers=headers)
+    
+    assert res.status_code == 200
+    assert res.json() == {"liked": ["C", "A"]}
+
+def test_is_liked_uses_cache_until_write(client, monkeypatch):
+    headers = {"user-id": "u1"}
+    client.post(f"{PREFIX}/", json={"song_id": "A"}, headers=headers)
+    assert client.get(f"{PREFIX}/is-liked", headers={**headers, "song-id": "A"}).json() is True
+    # Fuera de la ventana de lectura-de-lo-escrito
+    client.cookies.clear()
+    monkeypatch.setattr(database, "recent_writers", RecentWriters(window=0))
+    
+    # El conjunto del usuario quedó en la caché: ni /is-liked ni el batch van a la base
+    with assert_statement_count(0):
+        assert client.get(f"{PREFIX}/is-liked", headers={**headers, "song-id": "A"}).json() is True
+        assert client.post(f"{PREFIX}/is-liked/batch", json={"song_ids": ["A", "B"]}, headers=headers).json() == {"liked": ["A"]}
+    
+    client.post(f"{PREFIX}/", json={"song_id": "B"}, headers=headers)
+    assert client.get(f"{PREFIX}/is-liked", headers={**headers, "song-id": "B"}).json() is True
+    
+    client.delete(f"{PREFIX}/A", headers=headers)
+    assert client.get(f"{PREFIX}/is-liked", headers={**headers, "song-id": "A"}).json() is False
+
+def test_is_liked_writer_skips_stale_cache(client):
+    headers = {"user-id": "u1"}
+    client.post(f"{PREFIX}/", json={"song_id": "A"}, headers=headers)
+    assert client.get(f"{PREFIX}/is-liked", headers={**headers, "song-id": "A"}).json() is True
+    stale_entry = asyncio.run(liked_song_repository.liked_ids_cache.get("u1"))
+    
+    client.delete(f"{PREFIX}/A", headers=headers)
+    # Conjunto viejo que quedó en la caché compartida (otra instancia, invalidación perdida)
+    asyncio.run(liked_song_repository.liked_ids_cache.set("u1", stale_entry))
+    
+    assert client.get(f"{PREFIX}/is-liked", headers={**headers, "song-id": "A"}).json() is False
+
+def test_large_liked_sets_skip_cache(client, monkeypatch):
+    monkeypatch.setattr(liked_song_repository, "LIKED_IDS_CACHE_MAX_SET", 1)
+    headers = {"user-id": "u1"}
+    for song_id in ["A", "B"]:
+        client.post(f"{PREFIX}/", json={"song_id": song_id}, headers=headers)
+    
+    res = client.post(f"{PREFIX}/is-liked/batch", json={"song_ids": ["A", "C"]}, headers=headers)
+    
+    assert res.json() == {"liked": ["A"]}
+    assert client.get(f"{PREFIX}/is-liked", headers={**headers, "song-id": "B"}).json() is True
+    assert asyncio.run(liked_song_repository.cached_liked_ids("u1"))[1] is None
+
+def test_are_songs_liked_batch_limit(client):
+    payload = {"song_ids": [f"s{i}" for i in range(501)]}
+    res = client.post(f"{PREFIX}/is-liked/batch", json=payload, headers={"user-id": "u1"})
+    assert res.status_code == 422
+
+def test_write_endpoints_statement_count(client):
+    headers = {"user-id": "u1"}
+    
+    # Contador + INSERT + registro de cambios + evento
+    with assert_statement_count(4):
+        assert client.post(f"{PREFIX}/", json={"song_id": "A"}, headers=headers).status_code == 201
+    client.post(f"{PREFIX}/", json={"song_id": "B"}, headers=headers)
+    
+    # Contador + DELETE ... RETURNING + corrimiento de posiciones + tombstone + evento, en una transacción
+    with assert_statement_count(5):
+        assert client.delete(f"{PREFIX}/A", headers=headers).status_code == 204
+    assert [(s["song_id"], s["position"]) for s in client.get(f"{PREFIX}/", headers=headers).json()] == [("B", 1)]
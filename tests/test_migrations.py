@@ -0,0 +1,74 @@
+import pytest
+import uuid
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+from app import migrate
+from app.database import Base
+
+@pytest.fixture
+def migration_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+def test_upgrade_head_matches_models(migration_engine):
+    migrate.upgrade(migration_engine)
+    
+    with migration_engine.connect() as connection:
+        # SQLite no conserva los tipos de Postgres (UUID), se comparan tablas, columnas e índices
+        context = MigrationContext.configure(
+            connection, opts={"compare_type": False, "include_object": migrate.include_object}
+        )
+        diff = compare_metadata(context, Base.metadata)
+    
+    assert diff == []
+
+def test_autogenerate_ignores_ddl_only_constraints():
+    # En Postgres la restricción diferida se refleja, pero no está en la metadata
+    assert migrate.include_object(None, "uq_liked_songs_user_id_position", "unique_constraint", True, None) is False
+    assert migrate.include_object(None, "liked_songs", "table", True, None) is True
+    assert migrate.include_object(None, "uq_other", "unique_constraint", True, None) is True
+
+def test_upgrade_stamps_legacy_create_all_database(migration_engine):
+    """Una base creada con create_all (sin alembic_version) migra sus datos"""
+    with migration_engine.connect() as connection:
+        command.upgrade(migrate.alembic_config(connection), "0001")
+        connection.execute(text("DROP TABLE alembic_version"))
+        
+        playlist_id = uuid.uuid4().hex
+        connection.execute(text(
+            "INSERT INTO playlists (id, name, owner_id) VALUES (:id, 'Legacy', 'u1')"
+        ), {"id": playlist_id})
+        for song_id, position in [("A", 1), ("B", 2)]:
+            connection.execute(text(
+                "INSERT INTO playlist_songs (id, playlist_id, song_id, position) VALUES (:id, :pid, :song, :pos)"
+            ), {"id": uuid.uuid4().hex, "pid": playlist_id, "song": song_id, "pos": position})
+        # position 1 era la reproducción más reciente
+        for song_id, position in [("newest", 1), ("oldest", 2)]:
+            connection.execute(text(
+                "INSERT INTO history (id, user_id, song_id, position) VALUES (:id, 'u1', :song, :pos)"
+            ), {"id": uuid.uuid4().hex, "song": song_id, "pos": position})
+        connection.commit()
+    
+    migrate.upgrade(migration_engine)
+    
+    with migration_engine.connect() as connection:
+        songs = connection.execute(text("SELECT song_id FROM playlist_songs ORDER BY rank")).scalars().all()
+        history = connection.execute(text("SELECT song_id FROM history ORDER BY seq DESC")).scalars().all()
+        version = connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    
+    assert songs == ["A", "B"]
+    assert history == ["newest", "oldest"]
+    assert version == ScriptDirectory.from_config(migrate.alembic_config()).get_current_head()
+
+def test_downgrade_to_base(migration_engine):
+    migrate.upgrade(migration_engine)
+    
+    with migration_engine.connect() as connection:
+        command.downgrade(migrate.alembic_config(connection), "base")
+        tables = inspect(connection).get_table_names()
+    
+    assert set(tables) <= {"alembic_version"}
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app import database, models
+from app.repositories import history_repository, liked_song_repository, outbox_repository, playlist_repository
+from app.schemas.history import HistoryEntryCreate
+from app.schemas.liked_songs import LikedSongCreate
+from app.schemas.playlist import PlaylistCreate, PlaylistUpdate
+from app.schemas.playlist_songs import PlaylistSongCreate, PlaylistSongPositionUpdate
+from app.services import outbox_service
+from app.utils.pagination import InvalidCursorError
+
+def publish_pending(db: Session):
+    """Marca publicados los pendientes (lo que hace el relay) para que entren al feed"""
+    outbox_repository.claim_pending(db)
+    db.commit()
+
+def event_types(db: Session) -> list[str]:
+    publish_pending(db)
+    return [event["event_type"] for event in outbox_repository.get_events(db, limit=1000)["events"]]
+
+def dispatch(target, batch_size: int = 500) -> int:
+    async def main():
+        async with database.AsyncSessionLocal() as db:
+            return await outbox_service.dispatch_pending(db, batch_size, target)
+    return asyncio.run(main())
+
+def test_writes_record_domain_events(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Events"), "u1")
+    playlist_repository.add_song(db_session, p.id, PlaylistSongCreate(song_id="A"))
+    playlist_repository.add_songs(db_session, p.id, ["B", "C"])
+    playlist_repository.reorder_playlist_songs(db_session, p.id, [PlaylistSongPositionUpdate(song_id="C", position=1)])
+    playlist_repository.remove_song(db_session, p.id, "A")
+    playlist_repository.update_playlist(db_session, p.id, "u1", PlaylistUpdate(name="Renamed"))
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="A"))
+    liked_song_repository.remove_liked_song(db_session, "u1", "A")
+    history_repository.add_history_entry(db_session, "u1", HistoryEntryCreate(song_id="A", song_name="Song"))
+    playlist_repository.delete_playlist(db_session, p.id, "u1")
+    
+    assert event_types(db_session) == [
+        "playlist.created",
+        "playlist.song_added", "playlist.song_added", "playlist.song_added",
+        "playlist.song_moved",
+        "playlist.song_removed",
+        "playlist.updated",
+        "song.liked", "song.unliked",
+        "song.played",
+        "playlist.deleted",
+    ]
+    moved = outbox_repository.get_events(db_session, event_types=["playlist.song_moved"])["events"][0]
+    assert moved["user_id"] == "u1"
+    assert moved["payload"] == {"playlist_id": str(p.id), "entry_id": moved["payload"]["entry_id"], "song_id": "C", "position": 1}
+
+def test_failed_or_empty_writes_record_no_events(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Mine"), "u1")
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="A"))
+    before = event_types(db_session)
+    
+    # No es del usuario: se hace rollback y el evento no queda
+    assert playlist_repository.delete_playlist(db_session, p.id, "intruder") is False
+    # Sin cambios reales ni likes nuevos no hay eventos
+    playlist_repository.update_playlist(db_session, p.id, "u1", PlaylistUpdate())
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="A"))
+    
+    assert event_types(db_session) == before
+
+def test_dispatch_pending_publishes_once(db_session: Session):
+    for song_id in ["A", "B", "C"]:
+        liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id=song_id))
+    dispatcher = outbox_service.InMemoryDispatcher()
+    
+    assert dispatch(dispatcher, batch_size=2) == 2
+    assert dispatch(dispatcher, batch_size=2) == 1
+    assert dispatch(dispatcher, batch_size=2) == 0
+    
+    assert [event["payload"]["song_id"] for event in dispatcher.events] == ["A", "B", "C"]
+    assert [event["seq"] for event in dispatcher.events] == [1, 2, 3]
+    assert db_session.query(models.OutboxEvent).filter(models.OutboxEvent.published_at.is_(None)).count() == 0
+
+def test_blocking_dispatcher_runs_in_a_thread(db_session: Session):
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="A"))
+    
+    class BlockingDispatcher:
+        def __init__(self):
+            self.threads = []
+        
+        def publish(self, events):
+            self.threads.append(threading.current_thread())
+    
+    dispatcher = BlockingDispatcher()
+    assert dispatch(dispatcher) == 1
+    assert dispatcher.threads[0] is not threading.main_thread()
+
+def test_failed_publish_keeps_events_pending(db_session: Session):
+    liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id="A"))
+    
+    class BrokenDispatcher:
+        async def publish(self, events):
+            raise ConnectionError("broker caído")
+    
+    with pytest.raises(ConnectionError):
+        dispatch(BrokenDispatcher())
+    
+    assert outbox_repository.get_events(db_session)["events"] == []
+    assert dispatch(outbox_service.InMemoryDispatcher()) == 1
+
+def test_get_events_cursor_and_filter(db_session: Session):
+    for song_id in ["A", "B"]:
+        liked_song_repository.add_liked_song(db_session, "u1", LikedSongCreate(song_id=song_id))
+    history_repository.add_history_entry(db_session, "u1", HistoryEntryCreate(song_id="A"))
+    publish_pending(db_session)
+    
+    first = outbox_repository.get_events(db_session, limit=1)
+    rest = outbox_repository.get_events(db_session, first["cursor"])
+    played = outbox_repository.get_events(db_session, event_types=["song.played"])
+    
+    assert [e["payload"]["song_id"] for e in first["events"] + rest["events"]] == ["A", "B", "A"]
+    assert outbox_repository.get_events(db_session, rest["cursor"]) == {"events": [], "cursor": rest["cursor"]}
+    assert [e["event_type"] for e in played["events"]] == ["song.played"]
+    with pytest.raises(InvalidCursorError):
+        outbox_repository.get_events(db_session, "abc")
+
+def test_late_commit_is_not_skipped_by_feed(db_session: Session):
+    """Un evento con id menor que confirma tarde igual llega a quien ya leyó el feed"""
+    db_session.execute(insert(models.OutboxEvent).values(id=10, event_type="song.liked", user_id="u1", payload={}))
+    db_session.commit()
+    publish_pending(db_session)
+    cursor = outbox_repository.get_events(db_session)["cursor"]
+    
+    # La transacción que tomó id=5 confirma después
+    db_session.execute(insert(models.OutboxEvent).values(id=5, event_type="song.played", user_id="u1", payload={}))
+    db_session.commit()
+    publish_pending(db_session)
+    
+    assert [e["id"] for e in outbox_repository.get_events(db_session, cursor)["events"]] == [5]
+
+def test_event_signal_wakes_waiters():
+    signal = outbox_service.EventSignal()
+    
+    async def main():
+        waiter = asyncio.create_task(signal.wait(5))
+        await asyncio.sleep(0)
+        signal.notify()
+        await asyncio.wait_for(waiter, 1)
+        # Sin aviso, la espera termina al vencer el plazo
+        await signal.wait(0.01)
+    
+    asyncio.run(main())
@@ -1,9 +1,14 @@
+import asyncio
+import json
+import uuid
 import pytest
 from sqlalchemy.orm import Session
 from app.repositories import playlist_repository
 from app import models
+from tests.conftest import count_statements
+from app.utils.pagination import InvalidCursorError, encode_cursor
 # Importamos tus schemas reales
-from app.schemas.playlist import PlaylistCreate
+from app.schemas.playlist import PlaylistCreate, PlaylistUpdate
 from app.schemas.playlist_songs import PlaylistSongCreate, PlaylistSongPositionUpdate
 
 # --- TEST DE CREACIÓN Y LECTURA ---
@@ -29,9 +34,9 @@ def test_get_playlists_filter(db_session: Session):
     playlist_repository.create_playlist(db_session, p2_data, "u2")
     
     # Test filtro por usuario
-    user_p = playlist_repository.get_playlists(db_session, user_id="u1")
+    user_p = playlist_repository.get_playlists_page(db_session, user_id="u1")["playlists"]
     assert len(user_p) == 1
-    assert user_p[0].name == "P1"
+    assert user_p[0]["name"] == "P1"
 
 def test_update_cover(db_session: Session):
     p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="P1"), "u1")
@@ -51,9 +56,10 @@ def test_delete_playlist(db_session: Session):
     song_data = PlaylistSongCreate(song_id="s1")
     playlist_repository.add_song(db_session, p.id, song_data)
     
-    # Borrar
+    # Borrar: devuelve la versión que queda como piso de la caché
+    version = playlist_repository.get_playlist_version(db_session, p.id)
     result = playlist_repository.delete_playlist(db_session, p.id, "u1")
-    assert result is True
+    assert result == version + 1
     
     # Verificar que ya no existe
     found = playlist_repository.get_playlist(db_session, p.id)
@@ -84,7 +90,7 @@ def test_remove_song_reorders_remaining(db_session: Session):
     # Borramos canción B
     playlist_repository.remove_song(db_session, p.id, "B")
     
-    songs = db_session.query(models.PlaylistSong).filter_by(playlist_id=p.id).order_by(models.PlaylistSong.position).all()
+    songs = playlist_repository.get_playlist_songs(db_session, p.id)
     
     assert len(songs) == 2
     assert songs[0].song_id == "A"
@@ -106,11 +112,63 @@ def test_reorder_move_down(db_session: Session):
     
     playlist_repository.reorder_playlist_songs(db_session, p.id, updates)
     
-    songs = db_session.query(models.PlaylistSong).filter_by(playlist_id=p.id).order_by(models.PlaylistSong.position).all()
+    songs = playlist_repository.get_playlist_songs(db_session, p.id)
     
-    assert songs[0].song_id == "B"
-    assert songs[1].song_id == "C"
-    assert songs[2].song_id == "A"
+    assert [s.song_id for s in songs] == ["B", "C", "A"]
+    assert [s.position for s in songs] == [1, 2, 3]
+
+def test_reorder_move_up(db_session: Session):
+    """Mover Pos 3 a Pos 1: [A, B, C] -> [C, A, B]"""
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Reorder Up"), "u1")
+    
+    for song_id in ["A", "B", "C"]:
+        playlist_repository.add_song(db_session, p.id, PlaylistSongCreate(song_id=song_id))
+    
+    updates = [PlaylistSongPositionUpdate(song_id="C", position=1)]
+    assert playlist_repository.reorder_playlist_songs(db_session, p.id, updates)
+    
+    songs = playlist_repository.get_playlist_songs(db_session, p.id)
+    assert [s.song_id for s in songs] == ["C", "A", "B"]
+
+def test_reorder_only_rewrites_moved_song(db_session: Session):
+    """Mover una canción no toca la clave de orden de las demás"""
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Sparse"), "u1")
+    
+    for song_id in ["A", "B", "C", "D"]:
+        playlist_repository.add_song(db_session, p.id, PlaylistSongCreate(song_id=song_id))
+    
+    before = {s.song_id: s.rank for s in playlist_repository.get_playlist_songs(db_session, p.id)}
+    
+    updates = [PlaylistSongPositionUpdate(song_id="D", position=2)]
+    playlist_repository.reorder_playlist_songs(db_session, p.id, updates)
+    
+    after = {s.song_id: s.rank for s in playlist_repository.get_playlist_songs(db_session, p.id)}
+    changed = [song_id for song_id in before if before[song_id] != after[song_id]]
+    assert changed == ["D"]
+
+def test_reorder_rebalances_when_gap_is_exhausted(db_session: Session):
+    """Moviendo siempre al mismo hueco se agota el espacio y se rebalancea"""
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Crowded"), "u1")
+    
+    song_ids = [f"s{i}" for i in range(15)]
+    for song_id in song_ids:
+        playlist_repository.add_song(db_session, p.id, PlaylistSongCreate(song_id=song_id))
+    
+    # Cada canción del final se mueve a la posición 2, partiendo el mismo hueco
+    for song_id in reversed(song_ids[2:]):
+        updates = [PlaylistSongPositionUpdate(song_id=song_id, position=2)]
+        assert playlist_repository.reorder_playlist_songs(db_session, p.id, updates)
+    
+    songs = playlist_repository.get_playlist_songs(db_session, p.id)
+    assert [s.song_id for s in songs] == ["s0"] + song_ids[2:] + ["s1"]
+    assert len({s.rank for s in songs}) == len(songs)
+
+def test_reorder_invalid_position(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Invalid"), "u1")
+    playlist_repository.add_song(db_session, p.id, PlaylistSongCreate(song_id="A"))
+    
+    updates = [PlaylistSongPositionUpdate(song_id="A", position=5)]
+    assert playlist_repository.reorder_playlist_songs(db_session, p.id, updates) is False
 
 # --- TESTS: BÚSQUEDA ---
 
@@ -130,4 +188,274 @@ def test_search_paginated(db_session: Session):
     
     # Buscar "Pop"
     result_pop = playlist_repository.search_playlists_paginated(db_session, search="Pop")
-    assert result_pop["total"] == 1
\ No newline at end of file
+    assert result_pop["total"] == 1
+
+def test_search_paginated_with_cursor(db_session: Session):
+    for i in range(5):
+        playlist_repository.create_playlist(db_session, PlaylistCreate(name=f"Jazz {i}"), "u1")
+    
+    seen = []
+    cursor = None
+    while True:
+        result = playlist_repository.search_playlists_paginated(
+            db_session, search="Jazz", limit=2, cursor=cursor, with_total=False
+        )
+        assert result["total"] is None
+        seen.extend(p["name"] for p in result["playlists"])
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+    
+    assert sorted(seen) == [f"Jazz {i}" for i in range(5)]
+
+def test_playlists_cursor_survives_deleted_anchor(db_session: Session):
+    for name in ["P1", "P2", "P3", "P4"]:
+        playlist_repository.create_playlist(db_session, PlaylistCreate(name=name), "pager")
+    first = playlist_repository.get_playlists_page(db_session, user_id="pager", limit=2)
+    
+    playlist_repository.delete_playlist(db_session, first["playlists"][-1]["id"], "pager")
+    second = playlist_repository.get_playlists_page(db_session, user_id="pager", limit=2, cursor=first["next_cursor"])
+    
+    names = [p["name"] for p in first["playlists"] + second["playlists"]]
+    assert sorted(names) == ["P1", "P2", "P3", "P4"]
+
+def test_search_by_relevance(db_session: Session):
+    for name in ["Best of Rock", "Rock", "Rocking Chair"]:
+        playlist_repository.create_playlist(db_session, PlaylistCreate(name=name), "u1")
+    
+    result = playlist_repository.search_playlists_paginated(db_session, search="rock", sort="relevance")
+    
+    # Exacta primero, luego prefijo, luego contiene
+    assert [p["name"] for p in result["playlists"]] == ["Rock", "Rocking Chair", "Best of Rock"]
+
+def test_search_escapes_wildcards(db_session: Session):
+    playlist_repository.create_playlist(db_session, PlaylistCreate(name="100% Hits"), "u1")
+    playlist_repository.create_playlist(db_session, PlaylistCreate(name="1000 Hits"), "u1")
+    
+    result = playlist_repository.search_playlists_paginated(db_session, search="100%")
+    
+    assert [p["name"] for p in result["playlists"]] == ["100% Hits"]
+
+# --- TESTS: DETALLE CON CANCIONES ---
+
+def test_get_playlist_loads_ordered_songs_in_one_query(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Eager"), "u1")
+    for song_id in ["A", "B", "C"]:
+        playlist_repository.add_song(db_session, p.id, PlaylistSongCreate(song_id=song_id))
+    playlist_repository.reorder_playlist_songs(db_session, p.id, [PlaylistSongPositionUpdate(song_id="C", position=1)])
+    playlist_id = p.id
+    db_session.expunge_all()
+    
+    with count_statements() as statements:
+        playlist = playlist_repository.get_playlist(db_session, playlist_id)
+        songs = [(s.song_id, s.position) for s in playlist.songs]
+    
+    assert len(statements) == 1
+    assert songs == [("C", 1), ("A", 2), ("B", 3)]
+
+def test_get_playlist_songs_page(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Paged"), "u1")
+    for song_id in ["A", "B", "C"]:
+        playlist_repository.add_song(db_session, p.id, PlaylistSongCreate(song_id=song_id))
+    
+    first = playlist_repository.get_playlist(db_session, p.id, songs_limit=2)
+    first_page = [(s.song_id, s.position) for s in first.songs]
+    cursor = first.songs_next_cursor
+    
+    second = playlist_repository.get_playlist(db_session, p.id, songs_limit=2, songs_cursor=cursor)
+    
+    assert first_page == [("A", 1), ("B", 2)]
+    assert [(s.song_id, s.position) for s in second.songs] == [("C", 3)]
+    assert second.songs_next_cursor is None
+    
+    # Una lectura completa posterior no queda con la página parcial
+    full = playlist_repository.get_playlist(db_session, p.id)
+    assert [s.song_id for s in full.songs] == ["A", "B", "C"]
+
+def test_songs_cursor_survives_deleted_anchor(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Paged"), "u1")
+    playlist_repository.add_songs(db_session, p.id, ["A", "B", "C", "D"])
+    first = playlist_repository.get_playlist(db_session, p.id, songs_limit=2)
+    cursor = first.songs_next_cursor
+    
+    # Se borra la canción que el cliente acaba de pasar
+    playlist_repository.remove_song(db_session, p.id, "B")
+    second = playlist_repository.get_playlist(db_session, p.id, songs_limit=2, songs_cursor=cursor)
+    
+    assert [s.song_id for s in second.songs] == ["C", "D"]
+
+def test_songs_with_equal_rank_keep_one_order(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Ties"), "u1")
+    playlist_repository.add_songs(db_session, p.id, ["A", "B", "C"])
+    # Claves repetidas: el id desempata en todas las lecturas
+    db_session.query(models.PlaylistSong).filter(models.PlaylistSong.playlist_id == p.id).update({"rank": 1000})
+    db_session.commit()
+    expected = [s.song_id for s in sorted(playlist_repository.get_playlist_songs(db_session, p.id), key=lambda s: s.id)]
+    
+    full = [s.song_id for s in playlist_repository.get_playlist(db_session, p.id).songs]
+    paged, cursor = [], None
+    for _ in range(3):
+        page = playlist_repository.get_playlist(db_session, p.id, songs_limit=1, songs_cursor=cursor)
+        paged += [s.song_id for s in page.songs]
+        cursor = page.songs_next_cursor
+    
+    assert full == expected
+    assert [s.song_id for s in playlist_repository.get_playlist_songs(db_session, p.id)] == expected
+    assert paged == expected
+    
+    # Mover a una posición entre claves iguales rebalancea siguiendo ese orden
+    assert playlist_repository.reorder_playlist_songs(
+        db_session, p.id, [PlaylistSongPositionUpdate(song_id=expected[2], position=2)]
+    )
+    reordered = [s.song_id for s in playlist_repository.get_playlist_songs(db_session, p.id)]
+    assert reordered == [expected[0], expected[2], expected[1]]
+
+@pytest.mark.parametrize("position", [-5, "3", 1.5])
+def test_songs_cursor_rejects_invalid_position(db_session: Session, position):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Forged"), "u1")
+    songs = playlist_repository.add_songs(db_session, p.id, ["A", "B"])
+    cursor = encode_cursor({"id": songs[0].id, "key": songs[0].rank, "position": position})
+    
+    with pytest.raises(InvalidCursorError):
+        playlist_repository.get_playlist(db_session, p.id, songs_limit=1, songs_cursor=cursor)
+
+def test_add_songs_appends_in_one_insert(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Album"), "u1")
+    playlist_repository.add_song(db_session, p.id, PlaylistSongCreate(song_id="A"))
+    
+    with count_statements() as statements:
+        new_songs = playlist_repository.add_songs(db_session, p.id, ["B", "C", "D"])
+    
+    assert [(s.song_id, s.position) for s in new_songs] == [("B", 2), ("C", 3), ("D", 4)]
+    assert len([s for s in statements if s.startswith("INSERT INTO playlist_songs")]) == 1
+    songs = playlist_repository.get_playlist_songs(db_session, p.id)
+    assert [s.song_id for s in songs] == ["A", "B", "C", "D"]
+
+def test_add_songs_at_position(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Insert"), "u1")
+    playlist_repository.add_songs(db_session, p.id, ["A", "B", "C"])
+    
+    new_songs = playlist_repository.add_songs(db_session, p.id, ["X", "Y"], position=2)
+    assert [(s.song_id, s.position) for s in new_songs] == [("X", 2), ("Y", 3)]
+    
+    playlist_repository.add_songs(db_session, p.id, ["Z"], position=1)
+    songs = playlist_repository.get_playlist_songs(db_session, p.id)
+    assert [s.song_id for s in songs] == ["Z", "A", "X", "Y", "B", "C"]
+
+def test_add_songs_shifts_when_gap_is_too_small(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Tight"), "u1")
+    playlist_repository.add_songs(db_session, p.id, ["A", "B"])
+    
+    song_ids = [f"s{i}" for i in range(playlist_repository.RANK_GAP + 5)]
+    playlist_repository.add_songs(db_session, p.id, song_ids, position=2)
+    
+    songs = playlist_repository.get_playlist_songs(db_session, p.id)
+    assert [s.song_id for s in songs] == ["A", *song_ids, "B"]
+
+def test_add_songs_playlist_not_found(db_session: Session):
+    assert playlist_repository.add_songs(db_session, uuid.uuid4(), ["A"]) is None
+
+def test_song_counters_follow_writes(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Counted"), "u1")
+    assert (p.song_count, p.next_position) == (0, 1)
+    
+    with count_statements() as statements:
+        playlist_repository.add_song(db_session, p.id, PlaylistSongCreate(song_id="A"))
+    assert not any("max(" in s.lower() or "count(" in s.lower() for s in statements)
+    
+    playlist_repository.add_songs(db_session, p.id, ["B", "C"])
+    playlist_repository.add_songs(db_session, p.id, ["Z"], position=1)
+    playlist_repository.remove_song(db_session, p.id, "B")
+    
+    db_session.expire_all()
+    playlist = db_session.get(models.Playlist, p.id)
+    assert playlist.song_count == 3
+    assert playlist.next_position == 4
+    max_rank = max(s.rank for s in playlist_repository.get_playlist_songs(db_session, p.id))
+    assert playlist.last_rank >= max_rank
+
+def test_last_rank_covers_reordered_songs(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Bound"), "u1")
+    playlist_repository.add_songs(db_session, p.id, ["A", "B", "C"])
+    playlist_repository.remove_song(db_session, p.id, "C")
+    playlist_repository.reorder_playlist_songs(db_session, p.id, [PlaylistSongPositionUpdate(song_id="A", position=2)])
+    
+    playlist_repository.add_song(db_session, p.id, PlaylistSongCreate(song_id="D"))
+    songs = playlist_repository.get_playlist_songs(db_session, p.id)
+    assert [s.song_id for s in songs] == ["B", "A", "D"]
+
+def test_get_playlists_page_projects_rows(db_session: Session):
+    for name in ["P1", "P2", "P3"]:
+        playlist_repository.create_playlist(db_session, PlaylistCreate(name=name), "pager")
+    playlist_repository.create_playlist(db_session, PlaylistCreate(name="Other"), "someone")
+    db_session.expunge_all()
+    
+    first = playlist_repository.get_playlists_page(db_session, user_id="pager", limit=2)
+    second = playlist_repository.get_playlists_page(db_session, user_id="pager", limit=2, cursor=first["next_cursor"])
+    
+    assert len(first["playlists"]) == 2
+    names = [p["name"] for p in first["playlists"]] + [p["name"] for p in second["playlists"]]
+    assert sorted(names) == ["P1", "P2", "P3"]
+    assert second["next_cursor"] is None
+    assert first["playlists"][0]["next_position"] == 1
+    # Filas planas: nada quedó en el identity map
+    assert len(db_session.identity_map) == 0
+
+def test_get_playlist_detail_json(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Serialized"), "u1")
+    playlist_repository.add_songs(db_session, p.id, ["A", "B"])
+    
+    version, body = playlist_repository.get_playlist_detail_json(db_session, p.id)
+    detail = json.loads(body)
+    assert detail["version"] == version
+    assert detail["name"] == "Serialized"
+    assert [s["song_id"] for s in detail["songs"]] == ["A", "B"]
+    
+    playlist_repository.delete_playlist(db_session, p.id, "u1")
+    assert playlist_repository.get_playlist_detail_json(db_session, p.id) is None
+
+def test_playlist_detail_cache_respects_versions():
+    playlist_id = uuid.uuid4()
+    
+    async def main():
+        await playlist_repository.store_playlist_detail(playlist_id, 2, b"{}")
+        assert await playlist_repository.cached_playlist_detail(playlist_id) == (2, b"{}")
+        assert await playlist_repository.cached_playlist_detail(playlist_id, min_version=2) == (2, b"{}")
+        # Más vieja que la versión recién leída de la base: se ignora
+        assert await playlist_repository.cached_playlist_detail(playlist_id, min_version=3) is None
+        
+        # Un refill con una versión anterior no pisa una entrada más nueva
+        await playlist_repository.store_playlist_detail(playlist_id, 1, b"old")
+        assert await playlist_repository.cached_playlist_detail(playlist_id) == (2, b"{}")
+        await playlist_repository.store_playlist_detail(playlist_id, 3, b"new")
+        assert await playlist_repository.cached_playlist_detail(playlist_id) == (3, b"new")
+        
+        # La invalidación deja la versión de la escritura como piso: un
+        # refill que leyó antes de ella ya no entra
+        await playlist_repository.invalidate_playlist_detail(playlist_id, 4)
+        assert await playlist_repository.cached_playlist_detail(playlist_id) is None
+        await playlist_repository.store_playlist_detail(playlist_id, 3, b"new")
+        assert await playlist_repository.cached_playlist_detail(playlist_id) is None
+        await playlist_repository.store_playlist_detail(playlist_id, 4, b"newer")
+        assert await playlist_repository.cached_playlist_detail(playlist_id) == (4, b"newer")
+    
+    asyncio.run(main())
+
+def test_playlist_version_bumps_on_every_mutation(db_session: Session):
+    p = playlist_repository.create_playlist(db_session, PlaylistCreate(name="Versioned"), "u1")
+    versions = [playlist_repository.get_playlist_version(db_session, p.id)]
+    
+    mutations = [
+        lambda: playlist_repository.add_song(db_session, p.id, PlaylistSongCreate(song_id="A")),
+        lambda: playlist_repository.add_songs(db_session, p.id, ["B", "C"], position=1),
+        lambda: playlist_repository.reorder_playlist_songs(db_session, p.id, [PlaylistSongPositionUpdate(song_id="A", position=1)]),
+        lambda: playlist_repository.remove_song(db_session, p.id, "B"),
+        lambda: playlist_repository.update_playlist(db_session, p.id, "u1", PlaylistUpdate(is_public=True)),
+        lambda: playlist_repository.update_playlist_cover(db_session, p.id, "u1", "http://img"),
+    ]
+    for mutate in mutations:
+        mutate()
+        versions.append(playlist_repository.get_playlist_version(db_session, p.id))
+    
+    assert versions == sorted(set(versions))
+    assert len(versions) == len(mutations) + 1
@@ -1,6 +1,11 @@
+import asyncio
 import pytest
 from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
+from app import database
+from app.repositories import playlist_repository
+from app.utils.read_your_writes import RecentWriters
+from tests.conftest import assert_statement_count
 
 # Asumo que en main.py el prefix es "/playlists" como dice tu router
 # Si en main.py haces include_router(..., prefix="/api/playlists"), ajusta esto.
@@ -87,6 +92,10 @@ def test_reorder_songs(client):
     
     assert res_reorder.status_code == 200
     assert res_reorder.json()["message"] == "Canciones reordenadas correctamente"
+    
+    # 4. El detalle expone posiciones densas en el nuevo orden
+    songs = client.get(f"{PREFIX}/{pid}").json()["songs"]
+    assert [(s["song_id"], s["position"]) for s in songs] == [("B", 1), ("A", 2)]
 
 def test_delete_playlist(client):
     # 1. Crear
@@ -146,4 +155,214 @@ def test_update_playlist_cover_invalid_file(client):
     
     # CORRECCIÓN: Buscamos el texto dentro de la respuesta cruda para evitar KeyError
     # Esto funcionará si la respuesta es {"detail": ...} o {"message": ...}
-    assert "imagen" in response.text
\ No newline at end of file
+    assert "imagen" in response.text
+
+def test_get_playlist_songs_limit(client):
+    pid = client.post(f"{PREFIX}/?user_id=u1", json={"name": "Big"}).json()["id"]
+    for song_id in ["A", "B", "C"]:
+        client.post(f"{PREFIX}/{pid}/songs", json={"song_id": song_id})
+    
+    first = client.get(f"{PREFIX}/{pid}?songs_limit=2").json()
+    assert [s["position"] for s in first["songs"]] == [1, 2]
+    
+    second = client.get(f"{PREFIX}/{pid}?songs_limit=2&songs_cursor={first['songs_next_cursor']}").json()
+    assert [s["song_id"] for s in second["songs"]] == ["C"]
+    assert second["songs_next_cursor"] is None
+
+def test_add_song_playlist_not_found(client):
+    res = client.post(f"{PREFIX}/00000000-0000-0000-0000-000000000000/songs", json={"song_id": "A"})
+    assert res.status_code == 404
+
+def test_add_songs_batch(client):
+    pid = client.post(f"{PREFIX}/?user_id=u1", json={"name": "Queue"}).json()["id"]
+    client.post(f"{PREFIX}/{pid}/songs", json={"song_id": "A"})
+    
+    res = client.post(f"{PREFIX}/{pid}/songs/batch", json={"song_ids": ["X", "Y"], "position": 1})
+    assert res.status_code == 201
+    assert [(s["song_id"], s["position"]) for s in res.json()] == [("X", 1), ("Y", 2)]
+    
+    detail = client.get(f"{PREFIX}/{pid}").json()
+    assert [s["song_id"] for s in detail["songs"]] == ["X", "Y", "A"]
+
+def test_add_songs_batch_validation(client):
+    pid = client.post(f"{PREFIX}/?user_id=u1", json={"name": "Empty"}).json()["id"]
+    assert client.post(f"{PREFIX}/{pid}/songs/batch", json={"song_ids": []}).status_code == 422
+    missing = client.post(f"{PREFIX}/00000000-0000-0000-0000-000000000000/songs/batch", json={"song_ids": ["A"]})
+    assert missing.status_code == 404
+
+def test_list_and_search_include_song_count(client):
+    pid = client.post(f"{PREFIX}/?user_id=counter", json={"name": "Counted"}).json()["id"]
+    client.post(f"{PREFIX}/{pid}/songs/batch", json={"song_ids": ["A", "B"]})
+    
+    listed = client.get(f"{PREFIX}/?user_id=counter").json()
+    assert (listed[0]["song_count"], listed[0]["next_position"]) == (2, 3)
+    
+    found = client.get(f"{PREFIX}/search?search=Counted").json()["playlists"]
+    assert found[0]["song_count"] == 2
+
+def test_write_endpoints_statement_count(client):
+    # Cada escritura suma los INSERT de su registro de cambios y de su evento
+    with assert_statement_count(3):
+        pid = client.post(f"{PREFIX}/?user_id=u1", json={"name": "Lean"}).json()["id"]
+    
+    # Contadores (UPDATE ... RETURNING) + INSERT
+    with assert_statement_count(4):
+        added = client.post(f"{PREFIX}/{pid}/songs", json={"song_id": "A"})
+    assert added.json()["position"] == 1
+    
+    # UPDATE ... RETURNING + canciones para la respuesta
+    with assert_statement_count(4):
+        patched = client.patch(f"{PREFIX}/{pid}", json={"name": "Renamed"}, headers={"user-id": "u1"})
+    assert patched.json()["name"] == "Renamed"
+    assert [s["song_id"] for s in patched.json()["songs"]] == ["A"]
+    
+    # DELETE ... RETURNING + contador
+    with assert_statement_count(4):
+        assert client.delete(f"{PREFIX}/{pid}/songs/A").status_code == 204
+
+def test_list_playlists_paginated(client):
+    for name in ["P1", "P2", "P3"]:
+        client.post(f"{PREFIX}/?user_id=lister", json={"name": name})
+    
+    first = client.get(f"{PREFIX}/?user_id=lister&limit=2")
+    assert len(first.json()) == 2
+    
+    second = client.get(f"{PREFIX}/?user_id=lister&limit=2&cursor={first.headers['X-Next-Cursor']}")
+    assert sorted(p["name"] for p in first.json() + second.json()) == ["P1", "P2", "P3"]
+    assert "X-Next-Cursor" not in second.headers
+    
+    assert client.get(f"{PREFIX}/?limit=1000").status_code == 422
+
+def test_playlist_detail_served_from_cache(client, monkeypatch):
+    pid = client.post(f"{PREFIX}/?user_id=u1", json={"name": "Hot"}).json()["id"]
+    client.post(f"{PREFIX}/{pid}/songs", json={"song_id": "A"})
+    
+    assert [s["song_id"] for s in client.get(f"{PREFIX}/{pid}").json()["songs"]] == ["A"]
+    # Quien escribió lee del primario; la caché sirve al resto de los clientes
+    client.cookies.clear()
+    monkeypatch.setattr(database, "recent_writers", RecentWriters(window=0))
+    with assert_statement_count(0):
+        cached = client.get(f"{PREFIX}/{pid}")
+    assert cached.headers["content-type"] == "application/json"
+    
+    client.post(f"{PREFIX}/{pid}/songs", json={"song_id": "B"})
+    client.cookies.clear()
+    assert [s["song_id"] for s in client.get(f"{PREFIX}/{pid}").json()["songs"]] == ["A", "B"]
+    
+    stats = client.get("/metrics/caches").json()["playlist_detail"]
+    assert stats["hits"] >= 1 and stats["misses"] >= 2
+
+@patch("app.routers.playlist.upload_playlist_cover", return_value="http://img")
+def test_playlist_writes_invalidate_cached_detail(mock_upload, client):
+    pid = client.post(f"{PREFIX}/?user_id=u1", json={"name": "Cached"}).json()["id"]
+    client.post(f"{PREFIX}/{pid}/songs", json={"song_id": "A"})
+    headers = {"user-id": "u1"}
+    
+    writes = [
+        lambda: client.post(f"{PREFIX}/{pid}/songs", json={"song_id": "B"}),
+        lambda: client.post(f"{PREFIX}/{pid}/songs/batch", json={"song_ids": ["C"]}),
+        lambda: client.put(f"{PREFIX}/{pid}/songs/reorder", json=[{"song_id": "C", "position": 1}]),
+        lambda: client.delete(f"{PREFIX}/{pid}/songs/A"),
+        lambda: client.patch(f"{PREFIX}/{pid}", json={"name": "Renamed"}, headers=headers),
+        lambda: client.put(f"{PREFIX}/{pid}/cover", headers=headers, files={"file": ("c.jpg", b"img", "image/jpeg")}),
+    ]
+    for write in writes:
+        client.get(f"{PREFIX}/{pid}")
+        assert write().status_code < 300
+        assert asyncio.run(playlist_repository.cached_playlist_detail(pid)) is None
+    
+    detail = client.get(f"{PREFIX}/{pid}").json()
+    assert detail["name"] == "Renamed"
+    assert detail["cover_url"] == "http://img"
+    assert [s["song_id"] for s in detail["songs"]] == ["C", "B"]
+    
+    client.delete(f"{PREFIX}/{pid}", headers=headers)
+    assert client.get(f"{PREFIX}/{pid}").status_code == 404
+
+def test_playlist_detail_conditional_get(client):
+    pid = client.post(f"{PREFIX}/?user_id=u1", json={"name": "Etag"}).json()["id"]
+    client.post(f"{PREFIX}/{pid}/songs", json={"song_id": "A"})
+    
+    first = client.get(f"{PREFIX}/{pid}")
+    etag = first.headers["ETag"]
+    assert etag == f'"{first.json()["version"]}"'
+    
+    # Solo la consulta de versión, sin canciones ni serialización
+    with assert_statement_count(1):
+        cached = client.get(f"{PREFIX}/{pid}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    
+    paged = client.get(f"{PREFIX}/{pid}?songs_limit=1", headers={"If-None-Match": f'W/{etag}'})
+    assert paged.status_code == 304
+    
+    client.post(f"{PREFIX}/{pid}/songs", json={"song_id": "B"})
+    changed = client.get(f"{PREFIX}/{pid}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert client.get(f"{PREFIX}/{pid}?songs_limit=1").headers["ETag"] == changed.headers["ETag"]
+
+def test_playlist_detail_conditional_get_skips_stale_cache(client):
+    pid = client.post(f"{PREFIX}/?user_id=u1", json={"name": "Etag"}).json()["id"]
+    stale = client.get(f"{PREFIX}/{pid}")
+    stale_entry = asyncio.run(playlist_repository.playlist_detail_cache.get(pid))
+    
+    client.post(f"{PREFIX}/{pid}/songs", json={"song_id": "A"})
+    # Refill tardío: una lectura que empezó antes de la escritura vuelve a guardar el detalle viejo
+    asyncio.run(playlist_repository.playlist_detail_cache.set(pid, stale_entry))
+    
+    fresh = client.get(f"{PREFIX}/{pid}", headers={"If-None-Match": stale.headers["ETag"]})
+    
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != stale.headers["ETag"]
+    assert [s["song_id"] for s in fresh.json()["songs"]] == ["A"]
+
+def test_playlist_detail_rejects_refill_older_than_write(client, monkeypatch):
+    pid = client.post(f"{PREFIX}/?user_id=u1", json={"name": "Before"}).json()["id"]
+    client.get(f"{PREFIX}/{pid}")
+    stale = asyncio.run(playlist_repository.cached_playlist_detail(pid))
+    
+    client.patch(f"{PREFIX}/{pid}", json={"name": "After"}, headers={"user-id": "u1"})
+    # Refill tardío de una lectura que empezó antes del PATCH: queda bajo el piso
+    asyncio.run(playlist_repository.store_playlist_detail(pid, *stale))
+    
+    # GET simple de otro cliente, sin cookie ni escritura reciente
+    client.cookies.clear()
+    monkeypatch.setattr(database, "recent_writers", RecentWriters(window=0))
+    assert client.get(f"{PREFIX}/{pid}").json()["name"] == "After"
+
+def test_playlist_detail_writer_skips_cache(client):
+    pid = client.post(f"{PREFIX}/?user_id=u1", json={"name": "Before"}).json()["id"]
+    client.get(f"{PREFIX}/{pid}")
+    stale_entry = asyncio.run(playlist_repository.playlist_detail_cache.get(pid))
+    
+    client.patch(f"{PREFIX}/{pid}", json={"name": "After"}, headers={"user-id": "u1"})
+    # Entrada vieja que quedó en la caché compartida (otra instancia, invalidación perdida)
+    asyncio.run(playlist_repository.playlist_detail_cache.set(pid, stale_entry))
+    
+    assert client.get(f"{PREFIX}/{pid}").json()["name"] == "After"
+
+def test_list_playlists_conditional_get(client):
+    pid = client.post(f"{PREFIX}/?user_id=etags", json={"name": "One"}).json()["id"]
+    
+    first = client.get(f"{PREFIX}/?user_id=etags")
+    etag = first.headers["ETag"]
+    assert client.get(f"{PREFIX}/?user_id=etags", headers={"If-None-Match": etag}).status_code == 304
+    
+    client.patch(f"{PREFIX}/{pid}", json={"name": "Renamed"}, headers={"user-id": "etags"})
+    assert client.get(f"{PREFIX}/?user_id=etags", headers={"If-None-Match": etag}).status_code == 200
+
+def test_singleflight_metrics(client, monkeypatch):
+    pid = client.post(f"{PREFIX}/?user_id=u1", json={"name": "Coalesced"}).json()["id"]
+    # Lecturas de otro cliente, sin escrituras recientes: esas sí se agrupan
+    client.cookies.clear()
+    monkeypatch.setattr(database, "recent_writers", RecentWriters(window=0))
+    client.get(f"{PREFIX}/{pid}")
+    client.get(f"{PREFIX}/search", params={"search": "Coal"})
+    
+    res = client.get("/metrics/singleflight")
+    
+    assert res.status_code == 200
+    report = res.json()
+    assert report["playlist_detail"]["executed"] >= 1
+    assert report["search_playlists"]["in_flight"] == 0
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+from app.pool_metrics import PoolMetrics, instrumented_pool
+
+@pytest.fixture
+def pooled_engine(tmp_path):
+    metrics = PoolMetrics()
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool(QueuePool, metrics),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    yield engine, metrics
+    engine.dispose()
+
+def test_checkouts_are_measured(pooled_engine):
+    engine, metrics = pooled_engine
+    
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        snapshot = metrics.snapshot(engine.pool)
+        assert snapshot["checked_out"] == 1
+        assert snapshot["size"] == 1
+    
+    snapshot = metrics.snapshot(engine.pool)
+    assert snapshot["checkouts"] == 1
+    assert snapshot["checked_out"] == 0
+    assert snapshot["idle"] == 1
+
+def test_pool_timeout_is_counted(pooled_engine):
+    engine, metrics = pooled_engine
+    
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    
+    snapshot = metrics.snapshot(engine.pool)
+    assert snapshot["timeouts"] == 1
+    assert snapshot["wait_max_ms"] >= 50
+
+def test_db_pool_endpoint(client):
+    response = client.get("/metrics/db-pool")
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert "pid" in data
+    assert "primary" in data["pools"]
+    assert set(data["pools"]["primary"]) >= {"checked_out", "idle", "overflow", "wait_avg_ms"}
@@ -0,0 +1,99 @@
+import pytest
+import time
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app import database
+from app.utils.read_your_writes import PRIMARY_UNTIL_COOKIE, RecentWriters
+from tests.conftest import test_async_engine
+
+class CountingSessionMaker:
+    """Réplica de prueba: abre sesiones sobre la base de test y cuenta cuántas"""
+
+    def __init__(self):
+        self.opened = 0
+        self._maker = async_sessionmaker(test_async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    def __call__(self):
+        self.opened += 1
+        return self._maker()
+
+@pytest.fixture
+def replica(monkeypatch):
+    replica = CountingSessionMaker()
+    monkeypatch.setattr(database, "replica_session_makers", [replica])
+    monkeypatch.setattr(database, "recent_writers", RecentWriters(window=60))
+    return replica
+
+def test_recent_writers_window():
+    writers = RecentWriters(window=60)
+    writers.mark(["user:u1"])
+    
+    assert writers.is_recent(["user:u1"]) is True
+    assert writers.is_recent(["user:u2"]) is False
+    assert RecentWriters(window=0).is_recent(["user:u1"]) is False
+
+def test_reads_go_to_replica(client, replica):
+    response = client.get("/liked-songs/", headers={"user-id": "reader"})
+    
+    assert response.status_code == 200
+    assert replica.opened == 1
+
+def test_reads_after_own_write_stay_on_primary(client, replica):
+    headers = {"user-id": "writer"}
+    client.post("/liked-songs/", json={"song_id": "A"}, headers=headers)
+    
+    response = client.get("/liked-songs/", headers=headers)
+    
+    # Lee su propio like aunque la réplica todavía no lo tenga
+    assert [s["song_id"] for s in response.json()] == ["A"]
+    assert replica.opened == 0
+    
+    # Otro usuario (otro cliente, sin la cookie) sí lee de la réplica
+    client.cookies.clear()
+    client.get("/liked-songs/", headers={"user-id": "someone-else"})
+    assert replica.opened == 1
+
+def test_playlist_write_pins_playlist_reads(client, replica):
+    pid = client.post("/playlists/?user_id=u1", json={"name": "Pinned"}).json()["id"]
+    client.post(f"/playlists/{pid}/songs", json={"song_id": "A"})
+    
+    response = client.get(f"/playlists/{pid}")
+    
+    assert [s["song_id"] for s in response.json()["songs"]] == ["A"]
+    assert replica.opened == 0
+
+def test_created_playlist_reads_stay_on_primary(client, replica):
+    """El GET de una playlist recién creada no cae en una réplica que no la tiene"""
+    pid = client.post("/playlists/?user_id=u1", json={"name": "Fresh"}).json()["id"]
+    # Solo la marca del worker, sin la cookie del cliente
+    client.cookies.clear()
+    
+    assert client.get(f"/playlists/{pid}").status_code == 200
+    assert replica.opened == 0
+
+def test_write_cookie_pins_reads_on_any_worker(client, replica, monkeypatch):
+    response = client.post("/liked-songs/", json={"song_id": "A"}, headers={"user-id": "writer"})
+    assert PRIMARY_UNTIL_COOKIE in response.cookies
+    
+    # Otro worker: no vio la escritura, pero el cliente trae la cookie
+    monkeypatch.setattr(database, "recent_writers", RecentWriters(window=60))
+    reads = client.get("/liked-songs/", headers={"user-id": "writer"})
+    
+    assert [s["song_id"] for s in reads.json()] == ["A"]
+    assert replica.opened == 0
+
+def test_reads_without_writes_get_no_cookie(client, replica):
+    response = client.post("/liked-songs/is-liked/batch", json={"song_ids": ["A"]}, headers={"user-id": "u1"})
+    
+    assert response.status_code == 200
+    assert PRIMARY_UNTIL_COOKIE not in response.cookies
+    # La recarga de la caché de favoritos lee del primario
+    assert replica.opened == 0
+    assert client.get("/liked-songs/", headers={"user-id": "u1"}).status_code == 200
+    assert replica.opened == 1
+
+def test_forged_write_cookie_is_ignored(client, replica):
+    client.cookies.set(PRIMARY_UNTIL_COOKIE, str(time.time() + 86_400))
+    
+    client.get("/liked-songs/", headers={"user-id": "reader"})
+    
+    assert replica.opened == 1
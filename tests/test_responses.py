@@ -0,0 +1,36 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from pydantic import TypeAdapter
+from app import schemas
+from app.repositories import history_repository, liked_song_repository, playlist_repository
+from app.utils.responses import FastJSONResponse, next_cursor_header
+
+def test_fast_json_matches_response_model_encoding():
+    row = {
+        "id": uuid.uuid4(),
+        "played_at": datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc),
+        "naive": datetime(2026, 10, 18, 12, 30),
+        "name": "Canción",
+        "count": 3,
+        "missing": None,
+    }
+    
+    body = FastJSONResponse(None).render([row])
+    
+    # Mismo formato que la serialización de pydantic que usa response_model
+    assert json.loads(body) == json.loads(TypeAdapter(list[dict]).dump_json([row]))
+    assert b'"2026-10-18T12:30:00Z"' in body
+
+def test_projections_match_response_schemas():
+    """Las filas se codifican sin validar: sus columnas tienen que ser las del schema"""
+    def columns(projection):
+        return {column.key for column in projection}
+    
+    assert columns(playlist_repository.PLAYLIST_SUMMARY_COLUMNS) == set(schemas.PlaylistWithoutSongs.model_fields)
+    assert columns(history_repository.HISTORY_COLUMNS) | {"position"} == set(schemas.HistoryEntry.model_fields)
+    assert columns(liked_song_repository.LIKED_SONG_COLUMNS) == set(schemas.LikedSong.model_fields)
+
+def test_next_cursor_header():
+    assert next_cursor_header(None) == {}
+    assert next_cursor_header("abc") == {"X-Next-Cursor": "abc"}
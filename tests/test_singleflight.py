@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from app.utils.singleflight import SingleFlight
+
+def test_concurrent_calls_share_one_fetch():
+    group = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "resultado"
+
+    async def main():
+        return await asyncio.gather(*(group.do("k", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["resultado"] * 5
+    assert len(calls) == 1
+    assert group.stats() == {"executed": 1, "collapsed": 4, "in_flight": 0}
+
+def test_different_keys_run_separately():
+    group = SingleFlight()
+
+    async def main():
+        async def fetch(value):
+            await asyncio.sleep(0)
+            return value
+        return await asyncio.gather(group.do("a", lambda: fetch(1)), group.do("b", lambda: fetch(2)))
+
+    assert asyncio.run(main()) == [1, 2]
+    assert group.stats()["collapsed"] == 0
+
+def test_key_is_released_after_completion():
+    group = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        first = await group.do("k", fetch)
+        second = await group.do("k", fetch)
+        return first, second
+
+    # Una llamada posterior no reutiliza un resultado viejo
+    assert asyncio.run(main()) == (1, 2)
+    assert group.stats()["executed"] == 2
+
+def test_exception_reaches_every_waiter():
+    group = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("falló")
+
+    async def main():
+        return await asyncio.gather(*(group.do("k", fetch) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert group.stats()["in_flight"] == 0
+
+def test_cancelled_leader_does_not_cancel_followers():
+    group = SingleFlight()
+    release = None
+
+    async def fetch():
+        await release.wait()
+        return "ok"
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.create_task(group.do("k", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(group.do("k", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "ok"
+    assert group.stats()["collapsed"] == 1
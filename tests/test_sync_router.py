@@ -0,0 +1,26 @@
+from app.repositories import library_change_repository
+from tests.conftest import assert_statement_count
+
+PREFIX = "/sync"
+
+def test_sync_returns_changes_since_token(client, db_session):
+    headers = {"user-id": "u1"}
+    token = client.get(f"{PREFIX}/", headers=headers).json()["token"]
+    
+    client.post("/liked-songs/", json={"song_id": "A"}, headers=headers)
+    client.delete("/liked-songs/A", headers=headers)
+    library_change_repository.sequence_changes(db_session)
+    
+    res = client.get(f"{PREFIX}/", params={"since": token}, headers=headers)
+    assert res.status_code == 200
+    body = res.json()
+    assert [(c["action"], c["song_id"], c["position"]) for c in body["changes"]] == [("insert", "A", 1), ("delete", "A", 1)]
+    
+    # Sin cambios nuevos: mismo token, una sola consulta
+    with assert_statement_count(1):
+        again = client.get(f"{PREFIX}/", params={"since": body["token"]}, headers=headers).json()
+    assert again == {"changes": [], "token": body["token"], "has_more": False}
+
+def test_sync_invalid_token(client):
+    res = client.get(f"{PREFIX}/", params={"since": "nope"}, headers={"user-id": "u1"})
+    assert res.status_code == 400